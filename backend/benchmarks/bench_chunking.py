@@ -0,0 +1,143 @@
+"""
+Benchmark del chunking de CVs
+
+Genera un corpus sintético de CVs con secciones (perfil, experiencia, formación,
+habilidades, idiomas) y compara el splitter anterior por caracteres
+(RecursiveCharacterTextSplitter 1000/200) con CVChunker: número de chunks,
+tokens enviados a embeddings y tasa de acierto de la recuperación (el CV que
+contiene el dato preguntado aparece entre los k primeros chunks).
+
+La recuperación usa embeddings léxicos deterministas (bolsa de palabras con
+hashing y pesos IDF) para que el benchmark funcione sin red; los tokens se cuentan con
+tiktoken si cl100k_base está disponible y con una estimación si no.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_chunking --cvs 300
+"""
+import argparse
+import random
+import re
+import time
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from services.cv_chunker import CVChunker
+from services.profile_extractor import fold
+
+CITIES = ["Madrid", "Barcelona", "Valencia", "Sevilla", "Bilbao", "Málaga", "Zaragoza"]
+ROLES = ["Desarrollador backend", "Ingeniera de datos", "Desarrollador frontend", "DevOps", "Tech lead", "QA"]
+SKILLS = ["Python", "Java", "React", "AWS", "Docker", "Kubernetes", "SQL", "Django", "Spring", "Kafka", "Terraform"]
+TASKS = [
+    "Diseño de APIs REST y microservicios con {skill}",
+    "Migración de la plataforma a {skill} reduciendo costes",
+    "Automatización de despliegues y pruebas con {skill}",
+    "Mentoría de un equipo de cuatro personas en {skill}",
+    "Optimización de consultas y rendimiento en {skill}",
+]
+DEGREES = ["Grado en Ingeniería Informática", "Máster en Ciencia de Datos", "Ciclo superior de DAW"]
+
+
+def synthetic_cv(rng: random.Random, index: int) -> Tuple[str, str]:
+    """
+    CV sintético con un nombre de empresa único
+
+    Returns:
+        Tupla (texto del CV, empresa única sobre la que se pregunta)
+    """
+    company = f"Nortek{index}"
+    lines = [f"Candidato {index}", f"candidato{index}@example.com · {rng.choice(CITIES)}", "PERFIL PROFESIONAL"]
+    lines.append(f"{rng.choice(ROLES)} con experiencia en " + ", ".join(rng.sample(SKILLS, 3)) + ".")
+    lines.append("EXPERIENCIA PROFESIONAL")
+    jobs = [company] + [f"Empresa{rng.randrange(40)}" for _ in range(rng.randint(2, 5))]
+    rng.shuffle(jobs)
+    year = 2024
+    for job in jobs:
+        start = year - rng.randint(1, 4)
+        lines.append(f"{rng.choice(ROLES)} en {job} ({start} - {year})")
+        for _ in range(rng.randint(2, 4)):
+            lines.append("- " + rng.choice(TASKS).format(skill=rng.choice(SKILLS)))
+        year = start
+    lines.append("FORMACIÓN")
+    lines.append(rng.choice(DEGREES))
+    lines.append("HABILIDADES TÉCNICAS")
+    lines.append(", ".join(rng.sample(SKILLS, 6)))
+    lines.append("IDIOMAS")
+    lines.append("Español (nativo), Inglés (" + rng.choice(["B2", "C1", "C2"]) + ")")
+    return "\n".join(lines), company
+
+
+def embed(texts: List[str], idf: Optional[np.ndarray] = None, dimension: int = 4096) -> np.ndarray:
+    """Embeddings léxicos: palabras con hashing a una dimensión fija, ponderadas por IDF y normalizadas"""
+    matrix = np.zeros((len(texts), dimension), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"\w+", fold(text)):
+            matrix[row, zlib.crc32(word.encode()) % dimension] += 1.0
+    if idf is not None:
+        matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def inverse_document_frequency(matrix: np.ndarray) -> np.ndarray:
+    documents = (matrix > 0).sum(axis=0)
+    return np.log((1 + len(matrix)) / (1 + documents)).astype(np.float32) + 1.0
+
+
+def load_tokenizer():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base"), "tiktoken cl100k_base"
+    except Exception:
+        return None, "estimación (4 caracteres por token)"
+
+
+def evaluate(name: str, split: Callable[[str], List[str]], corpus: List[Tuple[str, str]], counter: CVChunker, k: int) -> None:
+    start = time.perf_counter()
+    chunk_texts, owners = [], []
+    for owner, (text, _) in enumerate(corpus):
+        for chunk_text in split(text):
+            chunk_texts.append(chunk_text)
+            owners.append(owner)
+    elapsed = time.perf_counter() - start
+
+    tokens = sum(counter.count_tokens(chunk_text) for chunk_text in chunk_texts)
+    idf = inverse_document_frequency(embed(chunk_texts))
+    vectors = embed(chunk_texts, idf)
+    owners = np.array(owners)
+    questions = embed([f"¿Qué candidato trabajó en {company}?" for _, company in corpus], idf)
+    scores = questions @ vectors.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    hits = sum(owner in owners[top[owner]] for owner in range(len(corpus)))
+
+    print(
+        f"{name:<28} chunks {len(chunk_texts):>6} ({len(chunk_texts) / len(corpus):.1f}/CV)  "
+        f"tokens {tokens:>8}  acierto@{k} {hits / len(corpus):.1%}  chunking {elapsed * 1000:.0f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cvs", type=int, default=300, help="CVs del corpus sintético")
+    parser.add_argument("-k", type=int, default=5, help="Chunks recuperados por pregunta")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    corpus = [synthetic_cv(rng, i) for i in range(args.cvs)]
+    tokenizer, tokenizer_name = load_tokenizer()
+    print(f"{args.cvs} CVs, tokens contados con {tokenizer_name}")
+
+    chunker = CVChunker(tokenizer=tokenizer)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    evaluate("caracteres 1000/200", splitter.split_text, corpus, chunker, args.k)
+    evaluate(
+        f"secciones {chunker.chunk_tokens}/{chunker.overlap_tokens} tokens",
+        lambda text: [chunk_text for chunk_text, _ in chunker.chunk(text)],
+        corpus, chunker, args.k
+    )
+
+
+if __name__ == "__main__":
+    main()
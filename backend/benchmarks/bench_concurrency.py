@@ -0,0 +1,110 @@
+"""
+Benchmark de concurrencia del pipeline RAG
+
+Lanza N consultas de chat simultáneas contra un RAGPipeline con retriever y LLM
+simulados (llamadas bloqueantes con latencia fija) y reporta p50/p99 por nivel de
+concurrencia, comparando la ejecución en línea (bloqueando el event loop) con el
+pool de hilos de BlockingExecutor.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_concurrency
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Callable, List
+
+from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.retrievers import BaseRetriever
+
+from services.executor import BlockingExecutor
+from services.rag_pipeline import RAGPipeline
+
+
+class SlowRetriever(BaseRetriever):
+    """Retriever que simula el embedding y la consulta a Pinecone"""
+    latency: float = 0.02
+
+    def _get_relevant_documents(self, query: str, *, run_manager: Any) -> List[Document]:
+        time.sleep(self.latency)
+        return [Document(page_content="Python", metadata={"uuid": "bench", "filename": "bench.pdf"})]
+
+
+class SlowLLM(FakeListLLM):
+    """LLM falso que simula el tiempo de generación"""
+    latency: float = 0.1
+
+    def _call(self, *args: Any, **kwargs: Any) -> str:
+        time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+
+
+class InlineExecutor:
+    """Ejecuta en el propio event loop (comportamiento anterior)"""
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return func(*args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass
+
+
+def build_pipeline(executor: Any, retrieval_latency: float, llm_latency: float) -> RAGPipeline:
+    rag = RAGPipeline()
+    rag.executor = executor
+    rag.retriever = SlowRetriever(latency=retrieval_latency)
+    rag.qa_chain = RetrievalQA.from_chain_type(
+        llm=SlowLLM(responses=["ok"], latency=llm_latency),
+        chain_type="stuff",
+        retriever=rag.retriever
+    )
+    return rag
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(rag: RAGPipeline, concurrency: int) -> List[float]:
+    # Todas las peticiones "llegan" a la vez: la latencia se mide desde ese instante
+    start = time.perf_counter()
+
+    async def timed() -> float:
+        await rag.query_with_sources("¿Quién sabe Python?")
+        return time.perf_counter() - start
+
+    return list(await asyncio.gather(*(timed() for _ in range(concurrency))))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Niveles de concurrencia")
+    parser.add_argument("--workers", type=int, default=32, help="Tamaño del pool de hilos")
+    parser.add_argument("--retrieval-ms", type=float, default=20.0)
+    parser.add_argument("--llm-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    modes = {
+        "inline": InlineExecutor(),
+        "pool": BlockingExecutor(max_workers=args.workers)
+    }
+
+    print(f"{'modo':<8}{'concurrencia':>14}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for mode, executor in modes.items():
+        rag = build_pipeline(executor, args.retrieval_ms / 1000, args.llm_ms / 1000)
+        for level in levels:
+            latencies = await run_level(rag, level)
+            p50 = statistics.median(latencies) * 1000
+            p99 = percentile(latencies, 99) * 1000
+            print(f"{mode:<8}{level:>14}{p50:>12.1f}{p99:>12.1f}")
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Benchmark de extracción de texto de PDFs
+
+Genera un corpus de PDFs de 1 a 50 páginas y mide las páginas por segundo
+(totales y por núcleo) con el pool de procesos de PdfExtractor para distintos
+números de workers, comparado con la lectura secuencial en un solo hilo.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_pdf_extraction --files 40
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import pypdf
+
+from benchmarks.pdf_corpus import generate_corpus
+from services.pdf_extractor import PdfExtractor
+
+
+def sequential_pages(paths: List[Path]) -> int:
+    """Extracción secuencial en el proceso actual (comportamiento anterior)"""
+    pages = 0
+    for path in paths:
+        with open(path, "rb") as file:
+            for page in pypdf.PdfReader(file).pages:
+                page.extract_text()
+                pages += 1
+    return pages
+
+
+async def pool_pages(paths: List[Path], workers: int) -> Tuple[int, float]:
+    extractor = PdfExtractor(max_workers=workers, max_pages=1000)
+    try:
+        # Calentar los procesos del pool antes de medir
+        await asyncio.gather(*(extractor.extract_text(str(paths[0])) for _ in range(workers)))
+
+        async def count(path: Path) -> int:
+            return len([page async for page in extractor.iter_pages(str(path))])
+
+        start = time.perf_counter()
+        pages = sum(await asyncio.gather(*(count(path) for path in paths)))
+        return pages, time.perf_counter() - start
+    finally:
+        extractor.shutdown()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40, help="Número de PDFs del corpus")
+    parser.add_argument("--workers", default=None, help="Lista de workers, p. ej. 1,2,4")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    levels = [int(w) for w in args.workers.split(",")] if args.workers else sorted({1, 2, 4, cpu_count})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate_corpus(Path(tmp), args.files)
+
+        print(f"{'modo':<14}{'workers':>8}{'páginas':>10}{'seg':>8}{'pág/s':>10}{'pág/s/núcleo':>14}")
+
+        start = time.perf_counter()
+        pages = sequential_pages(paths)
+        elapsed = time.perf_counter() - start
+        print(f"{'secuencial':<14}{1:>8}{pages:>10}{elapsed:>8.2f}{pages / elapsed:>10.1f}{pages / elapsed:>14.1f}")
+
+        for workers in levels:
+            pages, elapsed = await pool_pages(paths, workers)
+            rate = pages / elapsed
+            cores = min(workers, cpu_count)
+            print(f"{'pool':<14}{workers:>8}{pages:>10}{elapsed:>8.2f}{rate:>10.1f}{rate / cores:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
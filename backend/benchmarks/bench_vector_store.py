@@ -0,0 +1,57 @@
+"""
+Benchmark del vector store local
+
+Carga N chunks aleatorios de dimensión 1536 en LocalVectorStore y mide la
+latencia de búsqueda top-k (p50/p99) y el tiempo de recarga tras un reinicio.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_vector_store --chunks 30000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from store.local_vector_store import LocalVectorStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=30000, help="Número de vectores del índice")
+    parser.add_argument("--dimension", type=int, default=1536, help="Dimensión de los vectores")
+    parser.add_argument("--queries", type=int, default=200, help="Consultas a medir")
+    parser.add_argument("-k", type=int, default=10, help="Resultados por consulta")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(embedding=None, data_dir=tmp)
+        start = time.perf_counter()
+        for offset in range(0, args.chunks, 1000):
+            count = min(1000, args.chunks - offset)
+            vectors = rng.standard_normal((count, args.dimension), dtype=np.float32)
+            store.upsert([
+                {"id": f"v{offset + i}", "values": vector, "metadata": {"uuid": f"cv{(offset + i) // 20}", "text": "x"}}
+                for i, vector in enumerate(vectors)
+            ])
+        print(f"carga: {args.chunks} vectores en {time.perf_counter() - start:.2f}s")
+        store.close()
+
+        start = time.perf_counter()
+        store = LocalVectorStore(embedding=None, data_dir=tmp)
+        print(f"recarga: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        queries = rng.standard_normal((args.queries, args.dimension), dtype=np.float32)
+        store.similarity_search_by_vector_with_score(queries[0], k=args.k)
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            store.similarity_search_by_vector_with_score(query, k=args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"búsqueda top-{args.k}: p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
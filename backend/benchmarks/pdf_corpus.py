@@ -0,0 +1,94 @@
+"""
+Generación de PDFs de texto sintéticos para benchmarks y tests
+"""
+import random
+from pathlib import Path
+from typing import List
+
+WORDS = (
+    "python fastapi django kubernetes docker aws azure react typescript java spring "
+    "experiencia proyecto equipo liderazgo desarrollo backend frontend datos machine "
+    "learning pinecone langchain sql postgres redis microservicios api rest cloud"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: Path, pages: List[List[str]]) -> None:
+    """
+    Escribe un PDF mínimo con una fuente estándar (Helvetica) y texto extraíble
+
+    Args:
+        path: Ruta del PDF a crear
+        pages: Lista de páginas, cada una como lista de líneas
+    """
+    objects = []
+    page_ids = []
+    first_page_id = 4
+    for i, lines in enumerate(pages):
+        page_id = first_page_id + i * 2
+        page_ids.append(page_id)
+        body = "\n".join(f"({_escape(line)}) Tj T*" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 790 Td\n{body}\nET".encode("latin-1", "replace")
+        objects.append((
+            page_id,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        ))
+        objects.append((
+            page_id + 1,
+            b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream"
+        ))
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects = [
+        (1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        (2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()),
+        (3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"),
+    ] + objects
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id, content in objects:
+        offsets[object_id] = len(output)
+        output += f"{object_id} 0 obj\n".encode() + content + b"\nendobj\n"
+
+    xref_offset = len(output)
+    size = len(objects) + 1
+    output += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for object_id in range(1, size):
+        output += f"{offsets[object_id]:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    Path(path).write_bytes(bytes(output))
+
+
+def random_page(rng: random.Random, lines: int = 60, words_per_line: int = 12) -> List[str]:
+    """Genera una página de líneas con palabras aleatorias"""
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_line)) for _ in range(lines)]
+
+
+def generate_corpus(directory: Path, count: int, min_pages: int = 1, max_pages: int = 50, seed: int = 42) -> List[Path]:
+    """
+    Genera un corpus de PDFs con un número aleatorio de páginas
+
+    Args:
+        directory: Directorio destino
+        count: Número de PDFs
+        min_pages: Mínimo de páginas por PDF
+        max_pages: Máximo de páginas por PDF
+        seed: Semilla para reproducibilidad
+
+    Returns:
+        Lista de rutas generadas
+    """
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = directory / f"cv_{i:04d}.pdf"
+        write_text_pdf(path, [random_page(rng) for _ in range(rng.randint(min_pages, max_pages))])
+        paths.append(path)
+    return paths
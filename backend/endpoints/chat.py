@@ -1,17 +1,23 @@
 """
 Endpoints para el chat con IA
 """
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, AsyncIterator
+import json
 from pydantic import BaseModel
 from services.rag_pipeline import RAGPipeline
 from services.file_manager import FileManager
+from services.cv_chunker import SECTIONS
+from endpoints.dependencies import get_file_manager, get_rag_pipeline, parse_pool
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     """Modelo para solicitud de chat"""
     message: str
+    sections: Optional[List[str]] = None  # Limitar la búsqueda a secciones del CV (experience, skills...)
+    pool: Optional[str] = None  # Pool de CVs (oferta o cliente) en la que se busca
 
 class ChatResponse(BaseModel):
     """Modelo para respuesta de chat"""
@@ -19,38 +25,38 @@ class ChatResponse(BaseModel):
     sources: List[str]  # UUIDs de archivos
     source_files: List[str]  # Nombres originales
     confidence: float
+    cached: bool = False  # Servida desde la caché de respuestas
+    context: Optional[Dict[str, int]] = None  # Tokens de contexto antes y después del empaquetado
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest) -> ChatResponse:
+async def chat(
+    request: ChatRequest,
+    rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline),
+    file_manager: FileManager = Depends(get_file_manager)
+) -> ChatResponse:
     """
     Realizar consulta de chat con el sistema RAG
     """
     try:
-        # Obtener pipeline RAG
-        from main import rag_pipeline
-        
         if not rag_pipeline:
             raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
         
+        _check_sections(request.sections)
+        pool = parse_pool(request.pool)
+        
         # Realizar consulta con fuentes
-        result = await rag_pipeline.query_with_sources(request.message)
+        result = await rag_pipeline.query_with_sources(request.message, request.sections, pool)
         
         # Resolver nombres de archivos originales desde UUIDs
-        source_files = []
-        if result["sources"]:
-            file_manager = FileManager()
-            for uuid in result["sources"]:
-                metadata = await file_manager.get_file_metadata(uuid)
-                if metadata:
-                    source_files.append(metadata.get("original_filename", f"Archivo {uuid[:8]}"))
-                else:
-                    source_files.append(f"Archivo {uuid[:8]}")
+        source_files = await _source_filenames(file_manager, result["sources"])
         
         return ChatResponse(
             response=result["response"],
             sources=result["sources"],
             source_files=source_files,
-            confidence=result["confidence"]
+            confidence=result["confidence"],
+            cached=result.get("cached", False),
+            context=result.get("context")
         )
         
     except HTTPException:
@@ -59,15 +65,79 @@ async def chat(request: ChatRequest) -> ChatResponse:
         print(f"Error en chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error en consulta de chat: {str(e)}")
 
+def _check_sections(sections: Optional[List[str]]) -> None:
+    """Rechaza secciones que el chunker no asigna"""
+    unknown = [section for section in sections or [] if section not in SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Secciones no válidas: {', '.join(unknown)}. Usar: {', '.join(SECTIONS)}"
+        )
+
+async def _source_filenames(file_manager: FileManager, uuids: List[str]) -> List[str]:
+    """Nombres originales de los archivos fuente a partir de sus UUIDs"""
+    source_files = []
+    for uuid in uuids:
+        metadata = await file_manager.get_file_metadata(uuid)
+        if metadata:
+            source_files.append(metadata.get("original_filename", f"Archivo {uuid[:8]}"))
+        else:
+            source_files.append(f"Archivo {uuid[:8]}")
+    return source_files
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Serializa un evento server-sent events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline),
+    file_manager: FileManager = Depends(get_file_manager)
+) -> StreamingResponse:
+    """
+    Consulta de chat en streaming (server-sent events): evento "sources" tras la
+    recuperación, eventos "token" con la respuesta y un evento final "done" con la
+    confianza y los tiempos. Si el cliente se desconecta se cancela la llamada al LLM.
+    """
+    if not rag_pipeline:
+        raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
+    _check_sections(request.sections)
+    pool = parse_pool(request.pool)
+    
+    async def events() -> AsyncIterator[str]:
+        stream = rag_pipeline.stream_with_sources(request.message, request.sections, pool)
+        try:
+            async for event in stream:
+                if await http_request.is_disconnected():
+                    break
+                data = event["data"]
+                if event["event"] == "sources":
+                    data = {**data, "source_files": await _source_filenames(file_manager, data["sources"])}
+                yield _sse(event["event"], data)
+        except Exception as e:
+            print(f"Error en chat_stream: {str(e)}")
+            yield _sse("error", {"detail": f"Error en consulta de chat: {str(e)}"})
+        finally:
+            # Cerrar el generador cancela la petición en curso al LLM
+            await stream.aclose()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/chat/stats")
-async def get_chat_stats() -> Dict[str, Any]:
+async def get_chat_stats(
+    rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline),
+    file_manager: FileManager = Depends(get_file_manager)
+) -> Dict[str, Any]:
     """
     Obtener estadísticas del sistema de chat
     """
     try:
-        # Obtener pipeline RAG
-        from main import rag_pipeline
-        
         if not rag_pipeline:
             raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
         
@@ -75,12 +145,21 @@ async def get_chat_stats() -> Dict[str, Any]:
         vector_stats = await rag_pipeline.get_vector_stats()
         
         # Obtener estadísticas de archivos
-        file_manager = FileManager()
-        file_stats = file_manager.get_stats()
+        file_stats = await file_manager.executor.run(file_manager.get_stats)
+        
+        # Aciertos y fallos de la caché de embeddings
+        embedding_cache_stats = await rag_pipeline.executor.run(rag_pipeline.embedding_cache.stats)
         
         return {
             "vectorstore": vector_stats,
             "files": file_stats,
+            "embedding_cache": embedding_cache_stats,
+            "answer_cache": rag_pipeline.answer_cache.stats(),
+            "context_packing": rag_pipeline.context_packer.stats(),
+            "coalescing": {
+                "chat": rag_pipeline.chat_flight.stats(),
+                "embeddings": getattr(rag_pipeline.embeddings, "coalesced", 0)
+            },
             "status": "operational"
         }
         
@@ -89,14 +168,11 @@ async def get_chat_stats() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
 
 @router.post("/chat/test")
-async def test_chat() -> Dict[str, str]:
+async def test_chat(rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline)) -> Dict[str, str]:
     """
     Endpoint de prueba para verificar que el chat funciona
     """
     try:
-        # Obtener pipeline RAG
-        from main import rag_pipeline
-        
         if not rag_pipeline:
             return {"status": "error", "message": "Pipeline RAG no disponible"}
         
@@ -1,21 +1,47 @@
 """
 Endpoints para el screening de CVs
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import List, Dict, Any
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field
 import os
-from services.file_manager import FileManager
+import hashlib
+import zipfile
+from pathlib import PurePosixPath
+from services.candidate_ranker import CandidateRanker
+from services.file_manager import FileManager, FileTooLargeError
+from services.ingestion_queue import IngestionQueue
+from services.profile_extractor import (
+    EDUCATION_PATTERNS, LANGUAGE_PATTERNS, LOCATION_PATTERNS, SKILL_PATTERNS, find_terms, fold
+)
 from services.rag_pipeline import RAGPipeline
+from endpoints.dependencies import (
+    get_candidate_ranker, get_file_manager, get_ingestion_queue, get_rag_pipeline, parse_pool
+)
 
 router = APIRouter()
 
+# Límites de la importación masiva
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "1000"))
+BULK_MAX_ENTRY_BYTES = int(os.getenv("BULK_MAX_ENTRY_MB", "20")) * 1024 * 1024
+
 class CVScreeningRequest(BaseModel):
     """Modelo para solicitud de screening de CV"""
     job_description: str
     cv_text: str
     screening_criteria: List[str] = []
 
+class RankRequest(BaseModel):
+    """Modelo para solicitud de ranking de candidatos"""
+    job_description: str
+    top_n: int = Field(10, ge=1, le=100)
+    analyze: bool = True  # False: solo preselección por similitud, sin llamadas al LLM
+    pool: Optional[str] = None  # Pool de CVs (oferta o cliente) que se rankea
+
+class BulkDeleteRequest(BaseModel):
+    """Modelo para solicitud de eliminación masiva de CVs"""
+    uuids: List[str]
+
 class CVScreeningResponse(BaseModel):
     """Modelo para respuesta de screening de CV"""
     score: float
@@ -26,135 +52,344 @@ class CVScreeningResponse(BaseModel):
     detailed_analysis: Dict[str, Any]
 
 @router.post("/screening/analyze", response_model=CVScreeningResponse)
-async def analyze_cv(request: CVScreeningRequest) -> CVScreeningResponse:
+async def analyze_cv(
+    request: CVScreeningRequest,
+    rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline)
+) -> CVScreeningResponse:
     """
     Analizar un CV contra una descripción de trabajo específica
     """
     try:
-        # Aquí se implementaría la lógica de análisis usando el pipeline RAG
-        # Por ahora, devolvemos una respuesta de ejemplo
-        return CVScreeningResponse(
-            score=8.5,
-            match_percentage=85.0,
-            strengths=[
-                "Experiencia relevante en Python y FastAPI",
-                "Conocimientos sólidos en machine learning",
-                "Experiencia en proyectos de IA"
-            ],
-            weaknesses=[
-                "Falta de experiencia en Docker",
-                "No menciona experiencia con bases de datos vectoriales"
-            ],
-            recommendations=[
-                "Considerar agregar experiencia con contenedores",
-                "Destacar proyectos específicos de IA/ML"
-            ],
-            detailed_analysis={
-                "technical_skills_match": 0.9,
-                "experience_relevance": 0.8,
-                "education_match": 0.7
-            }
-        )
+        if not rag_pipeline:
+            raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
+        
+        job_description = request.job_description
+        if request.screening_criteria:
+            job_description += "\n\nCRITERIOS DE SCREENING:\n" + "\n".join(f"- {criterion}" for criterion in request.screening_criteria)
+        
+        analysis = await rag_pipeline.analyze_cv_match(request.cv_text, job_description)
+        return CVScreeningResponse(**analysis)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al analizar CV: {str(e)}")
 
+@router.post("/screening/rank")
+async def rank_candidates(
+    request: RankRequest,
+    candidate_ranker: Optional[CandidateRanker] = Depends(get_candidate_ranker)
+) -> Dict[str, Any]:
+    """
+    Ranking de todos los CVs procesados contra una descripción de trabajo: similitud
+    vectorial sobre el corpus completo y análisis del LLM solo de los top_n
+    """
+    try:
+        if not candidate_ranker:
+            raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
+        
+        return await candidate_ranker.rank(
+            request.job_description, top_n=request.top_n, analyze=request.analyze, pool=parse_pool(request.pool)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error en rank_candidates: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al rankear candidatos: {str(e)}")
+
+@router.get("/screening/profiles")
+async def list_profiles(
+    skill: List[str] = Query([], description="Tecnologías requeridas (todas)"),
+    language: List[str] = Query([], description="Idiomas requeridos (todos)"),
+    min_years: Optional[float] = Query(None, ge=0),
+    location: Optional[str] = None,
+    education: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    pool: Optional[str] = Query(None, description="Pool de los CVs (sin indicar: todas; 'default': la pool por defecto)"),
+    file_manager: FileManager = Depends(get_file_manager)
+) -> Dict[str, Any]:
+    """
+    Filtrar candidatos por su perfil estructurado (extraído en la ingesta, sin LLM)
+    """
+    if pool is not None:
+        pool = parse_pool(pool)
+    try:
+        profiles, total = await file_manager.executor.run(
+            file_manager.profile_store.query,
+            skills=[_canonical_term(value, SKILL_PATTERNS) for value in skill],
+            languages=[_canonical_term(value, LANGUAGE_PATTERNS) for value in language],
+            min_years=min_years,
+            location=_canonical_term(location, LOCATION_PATTERNS) if location else None,
+            education=_canonical_term(education, EDUCATION_PATTERNS) if education else None,
+            limit=limit,
+            offset=offset,
+            pool=pool
+        )
+        return {"profiles": profiles, "total": total, "limit": limit, "offset": offset}
+        
+    except Exception as e:
+        print(f"Error en list_profiles: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al consultar perfiles: {str(e)}")
+
+def _canonical_term(value: str, patterns) -> str:
+    """Término canónico del vocabulario de perfiles ("ingles" -> "inglés", "malaga" -> "Málaga")"""
+    found = find_terms(fold(value), patterns)
+    return found[0] if found else value
+
+@router.get("/screening/profiles/aggregate")
+async def aggregate_profiles(
+    field: str = Query(..., pattern="^(skill|language|location|education)$"),
+    limit: int = Query(20, ge=1, le=200),
+    pool: Optional[str] = Query(None, description="Pool de los CVs (sin indicar: todas; 'default': la pool por defecto)"),
+    file_manager: FileManager = Depends(get_file_manager)
+) -> Dict[str, Any]:
+    """
+    Número de candidatos por tecnología, idioma, ubicación o nivel de estudios
+    """
+    if pool is not None:
+        pool = parse_pool(pool)
+    try:
+        values = await file_manager.executor.run(file_manager.profile_store.aggregate, field, limit, pool)
+        return {"field": field, "values": values}
+        
+    except Exception as e:
+        print(f"Error en aggregate_profiles: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al agregar perfiles: {str(e)}")
+
 @router.post("/screening/upload")
-async def upload_cv(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def upload_cv(
+    file: UploadFile = File(...),
+    pool: Optional[str] = Form(None, description="Pool del CV (oferta o cliente); vacío para la pool por defecto"),
+    file_manager: FileManager = Depends(get_file_manager),
+    ingestion_queue: Optional[IngestionQueue] = Depends(get_ingestion_queue)
+) -> Dict[str, Any]:
     """
     Subir un archivo CV para procesamiento con UUID
     """
     # Verificar que sea un archivo PDF
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
+    pool = parse_pool(pool)
     
     try:
-        # Inicializar FileManager
-        file_manager = FileManager()
+        # La cola de ingesta se inicializa en el lifespan de la aplicación
+        if not ingestion_queue:
+            raise HTTPException(status_code=500, detail="Cola de ingesta no disponible")
         
-        # Guardar archivo y generar UUID
-        file_uuid = await file_manager.save_file_with_metadata(file)
+        # Guardar archivo y generar UUID (un duplicado exacto devuelve el UUID existente)
+        file_uuid, duplicate = await file_manager.save_file_deduplicated(file, pool)
         
-        # Obtener pipeline RAG (asumiendo que está inicializado globalmente)
-        # En una implementación real, esto vendría del contexto de la aplicación
-        from main import rag_pipeline
+        if duplicate:
+            existing = await _existing_upload_result(file_manager, file_uuid, file.filename)
+            if existing:
+                return existing
         
-        if not rag_pipeline:
-            # Si no está inicializado, actualizar estado de error
-            await file_manager.update_file_metadata(file_uuid, {
-                "status": "error",
-                "processing_errors": ["Pipeline RAG no inicializado"]
-            })
-            raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
+        # Encolar para procesamiento en segundo plano (extracción, chunking y embeddings)
+        await ingestion_queue.enqueue(file_uuid)
         
-        # Actualizar estado a procesando
-        await file_manager.update_file_metadata(file_uuid, {
-            "status": "processing"
-        })
-        
-        # Obtener ruta del archivo
-        file_path = await file_manager.get_file_path(file_uuid)
-        if not file_path:
-            raise HTTPException(status_code=500, detail="Archivo no encontrado")
+        return {
+            "message": "CV subido y encolado para procesamiento",
+            "uuid": file_uuid,
+            "filename": file.filename,
+            "pool": pool,
+            "status": "queued",
+            "duplicate": duplicate
+        }
+            
+    except HTTPException:
+        raise
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        print(f"Error en upload_cv: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al subir CV: {str(e)}")
+
+async def _existing_upload_result(file_manager: FileManager, file_uuid: str, filename: str) -> Optional[Dict[str, Any]]:
+    """
+    Resultado de subida para un duplicado que ya está procesado o en curso
+    (None si hay que volver a encolarlo, p. ej. porque terminó en error)
+    """
+    metadata = await file_manager.get_file_metadata(file_uuid) or {}
+    status = metadata.get("status")
+    if status not in ("queued", "processing", "processed"):
+        return None
+    return {
+        "message": "CV duplicado: ya existe un archivo con el mismo contenido",
+        "uuid": file_uuid,
+        "filename": filename,
+        "status": status,
+        "duplicate": True
+    }
+
+@router.post("/screening/upload/bulk")
+async def upload_cvs_bulk(
+    files: List[UploadFile] = File(...),
+    pool: Optional[str] = Form(None, description="Pool de los CVs (oferta o cliente); vacío para la pool por defecto"),
+    file_manager: FileManager = Depends(get_file_manager),
+    ingestion_queue: Optional[IngestionQueue] = Depends(get_ingestion_queue)
+) -> Dict[str, Any]:
+    """
+    Importación masiva de CVs: varios PDFs o un archivo ZIP con PDFs.
+    Los archivos se encolan y se procesan en lotes de embeddings y upserts.
+    """
+    pool = parse_pool(pool)
+    try:
+        if not ingestion_queue:
+            raise HTTPException(status_code=500, detail="Cola de ingesta no disponible")
         
-        # Procesar con RAG
-        chunks_count = await rag_pipeline.process_pdf_with_uuid(file_uuid, str(file_path))
+        results = []
+        queued_uuids = []
         
-        if chunks_count > 0:
-            # Actualizar estado a procesado con el número real de chunks
-            await file_manager.update_file_metadata(file_uuid, {
-                "status": "processed",
-                "chunks_count": chunks_count
-            })
-            
-            return {
-                "message": "CV subido y procesado exitosamente",
+        async def _save(filename: str, stream) -> None:
+            if len(queued_uuids) >= BULK_MAX_FILES:
+                results.append({
+                    "message": f"Límite de {BULK_MAX_FILES} archivos por importación alcanzado",
+                    "filename": filename,
+                    "status": "error"
+                })
+                return
+            try:
+                file_uuid, duplicate = await file_manager.save_stream_deduplicated(filename, stream, pool)
+            except FileTooLargeError:
+                results.append({"message": "Archivo demasiado grande", "filename": filename, "status": "error"})
+                return
+            if duplicate:
+                existing = await _existing_upload_result(file_manager, file_uuid, filename)
+                if existing or file_uuid in queued_uuids:
+                    results.append(existing or {
+                        "message": "CV duplicado dentro de la misma importación",
+                        "uuid": file_uuid,
+                        "filename": filename,
+                        "status": "queued",
+                        "duplicate": True
+                    })
+                    return
+            queued_uuids.append(file_uuid)
+            results.append({
+                "message": "CV subido y encolado para procesamiento",
                 "uuid": file_uuid,
-                "filename": file.filename,
-                "status": "processed",
-                "chunks_count": chunks_count
-            }
-        else:
-            # Actualizar estado a error
-            await file_manager.update_file_metadata(file_uuid, {
-                "status": "error",
-                "processing_errors": ["Error en procesamiento RAG"]
+                "filename": filename,
+                "status": "queued",
+                "duplicate": duplicate
             })
+        
+        for upload in files:
+            filename = upload.filename or ""
             
-            return {
-                "message": "CV subido pero error en procesamiento",
-                "uuid": file_uuid,
-                "filename": file.filename,
-                "status": "error"
-            }
-            
+            if filename.lower().endswith(".zip"):
+                # Recorrer las entradas del ZIP sin descomprimirlo entero en memoria: el directorio
+                # central y cada entrada se leen en el executor (la copia de _save también)
+                try:
+                    archive = await file_manager.executor.run(zipfile.ZipFile, upload.file)
+                except zipfile.BadZipFile:
+                    results.append({"message": "Archivo ZIP inválido", "filename": filename, "status": "error"})
+                    continue
+                
+                with archive:
+                    for info in archive.infolist():
+                        entry_name = PurePosixPath(info.filename).name
+                        if info.is_dir() or info.filename.startswith("__MACOSX/") or not entry_name:
+                            continue
+                        if not entry_name.lower().endswith(".pdf"):
+                            results.append({"message": "Solo se permiten archivos PDF", "filename": entry_name, "status": "error"})
+                            continue
+                        if info.file_size > BULK_MAX_ENTRY_BYTES:
+                            results.append({"message": "Archivo demasiado grande", "filename": entry_name, "status": "error"})
+                            continue
+                        stream = await file_manager.executor.run(archive.open, info)
+                        try:
+                            await _save(entry_name, stream)
+                        finally:
+                            await file_manager.executor.run(stream.close)
+                            
+            elif filename.lower().endswith(".pdf"):
+                await _save(filename, upload.file)
+            else:
+                results.append({"message": "Solo se permiten archivos PDF o ZIP", "filename": filename, "status": "error"})
+        
+        # Encolar todos los archivos en una sola transacción
+        if queued_uuids:
+            await ingestion_queue.enqueue_many(queued_uuids)
+        
+        return {
+            "message": f"{len(queued_uuids)} CVs encolados para procesamiento",
+            "pool": pool,
+            "files": results,
+            "total": len(results),
+            "queued": len(queued_uuids),
+            "duplicates": sum(1 for result in results if result.get("duplicate")),
+            "rejected": sum(1 for result in results if result["status"] == "error")
+        }
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error en upload_cv: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error al subir CV: {str(e)}")
+        print(f"Error en upload_cvs_bulk: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error en la importación masiva: {str(e)}")
+
+@router.get("/screening/upload/{uuid}/status")
+async def get_cv_status(
+    uuid: str,
+    file_manager: FileManager = Depends(get_file_manager),
+    ingestion_queue: Optional[IngestionQueue] = Depends(get_ingestion_queue)
+) -> Dict[str, Any]:
+    """
+    Consultar el estado de procesamiento de un CV (queued, processing, processed, error)
+    """
+    try:
+        metadata = await file_manager.get_file_metadata(uuid)
+        if not metadata:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        
+        job = await ingestion_queue.get_job(uuid) if ingestion_queue else None
+        
+        return {
+            "uuid": uuid,
+            "filename": metadata.get("original_filename"),
+            "status": metadata.get("status"),
+            "chunks_count": metadata.get("chunks_count", 0),
+            "processing_errors": metadata.get("processing_errors", []),
+            "attempts": job["attempts"] if job else 0
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error en get_cv_status: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al obtener estado: {str(e)}")
 
 @router.delete("/screening/upload/{uuid}")
-async def delete_cv(uuid: str) -> Dict[str, str]:
+async def delete_cv(
+    uuid: str,
+    file_manager: FileManager = Depends(get_file_manager),
+    rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline),
+    ingestion_queue: Optional[IngestionQueue] = Depends(get_ingestion_queue)
+) -> Dict[str, str]:
     """
     Eliminar un archivo CV y sus vectores de Pinecone
     """
     try:
-        # Inicializar FileManager
-        file_manager = FileManager()
-        
         # Verificar que el archivo existe
         if not await file_manager.file_exists(uuid):
             raise HTTPException(status_code=404, detail="Archivo no encontrado")
         
-        # Obtener pipeline RAG
-        from main import rag_pipeline
-        
         if not rag_pipeline:
             raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
         
+        # Sacar el archivo de la cola de ingesta si seguía pendiente
+        if ingestion_queue:
+            await ingestion_queue.cancel(uuid)
+        
         # Eliminar vectores de Pinecone
         pinecone_success = await rag_pipeline.delete_by_uuid(uuid)
         
         # Eliminar archivo físico y metadatos
         file_success = await file_manager.delete_file_and_metadata(uuid)
+        # Al eliminar CVs sin vector de CV el índice por CV puede quedar completo
+        if not rag_pipeline.cv_index_ready:
+            await rag_pipeline.refresh_cv_index_ready()
         
         if pinecone_success and file_success:
             return {
@@ -177,15 +412,71 @@ async def delete_cv(uuid: str) -> Dict[str, str]:
         print(f"Error en delete_cv: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al eliminar CV: {str(e)}")
 
+@router.post("/screening/upload/delete")
+async def delete_cvs_bulk(
+    request: BulkDeleteRequest,
+    file_manager: FileManager = Depends(get_file_manager),
+    rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline),
+    ingestion_queue: Optional[IngestionQueue] = Depends(get_ingestion_queue)
+) -> Dict[str, Any]:
+    """
+    Eliminar varios archivos CV y sus vectores en una sola operación por lotes
+    """
+    try:
+        if not rag_pipeline:
+            raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
+        
+        # Separar los existentes y recoger su chunks_count antes de borrar metadatos
+        chunks_counts = {}
+        not_found = []
+        for file_uuid in dict.fromkeys(request.uuids):
+            metadata = await file_manager.get_file_metadata(file_uuid)
+            if metadata:
+                chunks_counts[file_uuid] = metadata.get("chunks_count", 0)
+            else:
+                not_found.append(file_uuid)
+        
+        uuids = list(chunks_counts)
+        
+        # Sacar los archivos de la cola de ingesta si seguían pendientes
+        if ingestion_queue:
+            for file_uuid in uuids:
+                await ingestion_queue.cancel(file_uuid)
+        
+        # Eliminar vectores de todos los CVs en lotes
+        pinecone_success = await rag_pipeline.delete_by_uuids(uuids, chunks_counts)
+        
+        # Eliminar archivos físicos y metadatos
+        deleted = []
+        failed = []
+        for file_uuid in uuids:
+            if await file_manager.delete_file_and_metadata(file_uuid):
+                deleted.append(file_uuid)
+            else:
+                failed.append(file_uuid)
+        if not rag_pipeline.cv_index_ready:
+            await rag_pipeline.refresh_cv_index_ready()
+        
+        return {
+            "message": f"{len(deleted)} archivos eliminados",
+            "deleted": deleted,
+            "not_found": not_found,
+            "failed": failed,
+            "status": "deleted" if pinecone_success and not failed else "partial_deletion"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error en delete_cvs_bulk: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al eliminar CVs: {str(e)}")
+
 @router.get("/screening/upload/{uuid}")
-async def get_cv_metadata(uuid: str) -> Dict[str, Any]:
+async def get_cv_metadata(uuid: str, file_manager: FileManager = Depends(get_file_manager)) -> Dict[str, Any]:
     """
     Obtener metadatos de un archivo CV incluyendo estadísticas de vectores
     """
     try:
-        # Inicializar FileManager
-        file_manager = FileManager()
-        
         # Obtener metadatos
         metadata = await file_manager.get_file_metadata(uuid)
         
@@ -202,27 +493,152 @@ async def get_cv_metadata(uuid: str) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Error al obtener metadatos: {str(e)}")
 
 @router.get("/screening/upload")
-async def list_cvs() -> Dict[str, Any]:
+async def list_cvs(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    uploaded_from: Optional[str] = Query(None, description="Fecha de subida mínima (ISO, incluida)"),
+    uploaded_to: Optional[str] = Query(None, description="Fecha de subida máxima (ISO, excluida)"),
+    filename: Optional[str] = Query(None, description="Subcadena del nombre original"),
+    sort: str = Query("upload_date", description="upload_date, original_filename, file_size, chunks_count o status"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por comas"),
+    pool: Optional[str] = Query(None, description="Pool de los CVs (sin indicar: todas; 'default': la pool por defecto)"),
+    file_manager: FileManager = Depends(get_file_manager)
+) -> Dict[str, Any]:
     """
-    Listar todos los archivos CV procesados
+    Listar archivos CV por páginas, con filtros, ordenación y selección de campos
     """
+    if pool is not None:
+        pool = parse_pool(pool)
     try:
-        # Inicializar FileManager
-        file_manager = FileManager()
+        # El ETag depende solo de los parámetros y de la versión de los metadatos:
+        # una página sin cambios se responde con 304 sin consultar la base de datos
+        query_key = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.items()))
+        metadata_version = await file_manager.executor.run(file_manager.get_metadata_version)
+        etag = f'W/"{metadata_version}-{hashlib.sha1(query_key.encode()).hexdigest()[:16]}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        page = await file_manager.query_files(
+            status=status,
+            uploaded_from=uploaded_from,
+            uploaded_to=uploaded_to,
+            filename=filename,
+            sort=sort,
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor,
+            pool=pool
+        )
+        
+        files = page["files"]
+        if fields:
+            selected = {"uuid", *(field.strip() for field in fields.split(",") if field.strip())}
+            files = [{key: value for key, value in metadata.items() if key in selected} for metadata in files]
         
-        # Obtener lista de archivos
-        files = await file_manager.list_processed_files()
+        # Estadísticas desde los contadores agregados (coste constante)
+        stats = await file_manager.executor.run(file_manager.get_stats)
         
-        # Obtener estadísticas
-        stats = file_manager.get_stats()
+        # Total de coincidencias cuando sale de los contadores (globales o por pool); con otros filtros es None
+        counts = stats
+        if pool is not None:
+            pool_stats = await file_manager.executor.run(file_manager.get_pool_stats, pool)
+            counts = pool_stats.get(pool, {"total_files": 0, "by_status": {}})
+        if uploaded_from or uploaded_to or filename:
+            total = None
+        elif status:
+            total = counts["by_status"].get(status, 0)
+        else:
+            total = counts["total_files"]
         
+        response.headers["ETag"] = etag
         return {
             "files": files,
             "stats": stats,
-            "total": len(files)
+            "total": total,
+            "next_cursor": page["next_cursor"],
+            "limit": limit
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error en list_cvs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al listar CVs: {str(e)}")
 
+@router.get("/screening/pools")
+async def list_pools(
+    file_manager: FileManager = Depends(get_file_manager),
+    rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline)
+) -> Dict[str, Any]:
+    """
+    Listar las pools de CVs (ofertas o clientes) con sus archivos por estado y sus vectores.
+    La pool por defecto se identifica con ""
+    """
+    try:
+        file_stats = await file_manager.executor.run(file_manager.get_pool_stats)
+        vector_counts = await rag_pipeline.pool_vector_counts() if rag_pipeline else {}
+        
+        pools = []
+        for pool in sorted(set(file_stats) | set(vector_counts)):
+            stats = file_stats.get(pool, {"total_files": 0, "total_size_bytes": 0, "by_status": {}})
+            pools.append({
+                "pool": pool,
+                "total_files": stats["total_files"],
+                "total_size_bytes": stats["total_size_bytes"],
+                "by_status": stats["by_status"],
+                "vectors": vector_counts.get(pool)
+            })
+        
+        return {"pools": pools, "total": len(pools)}
+        
+    except Exception as e:
+        print(f"Error en list_pools: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al listar pools: {str(e)}")
+
+@router.delete("/screening/pools/{pool}")
+async def delete_pool(
+    pool: str,
+    file_manager: FileManager = Depends(get_file_manager),
+    rag_pipeline: Optional[RAGPipeline] = Depends(get_rag_pipeline),
+    ingestion_queue: Optional[IngestionQueue] = Depends(get_ingestion_queue)
+) -> Dict[str, Any]:
+    """
+    Eliminar una pool completa: sus vectores en una sola operación (namespace de
+    Pinecone o vector store local), sus metadatos y sus archivos
+    """
+    pool = parse_pool(pool)
+    if not pool:
+        raise HTTPException(status_code=400, detail="La pool por defecto no se puede eliminar")
+    
+    try:
+        if not rag_pipeline:
+            raise HTTPException(status_code=500, detail="Pipeline RAG no disponible")
+        
+        file_uuids = [metadata["uuid"] for metadata in await file_manager.list_processed_files(pool=pool)]
+        if not file_uuids:
+            raise HTTPException(status_code=404, detail="Pool no encontrada")
+        
+        # Sacar los archivos de la cola de ingesta si seguían pendientes
+        if ingestion_queue:
+            for file_uuid in file_uuids:
+                await ingestion_queue.cancel(file_uuid)
+        
+        vectors_deleted = await rag_pipeline.delete_pool(pool)
+        deleted = await file_manager.delete_pool(pool)
+        
+        return {
+            "message": f"Pool {pool} eliminada ({len(deleted)} archivos)",
+            "pool": pool,
+            "deleted": len(deleted),
+            "status": "deleted" if vectors_deleted else "partial_deletion"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error en delete_pool: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al eliminar la pool: {str(e)}")
@@ -0,0 +1,51 @@
+"""
+Dependencias de FastAPI para acceder a los recursos de la aplicación
+Si el lifespan no se ha ejecutado (p. ej. en tests sin contexto) el pipeline y la
+cola son None y cada endpoint responde como si no estuvieran disponibles; los
+endpoints que necesitan el gestor de archivos responden 500 (no se abre el
+directorio data/ real fuera del lifespan).
+"""
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+
+from services.candidate_ranker import CandidateRanker
+from services.file_manager import FileManager
+from services.ingestion_queue import IngestionQueue
+from services.pools import normalize_pool
+from services.rag_pipeline import RAGPipeline
+from services.resources import AppResources
+
+def get_resources(request: Request) -> Optional[AppResources]:
+    """Contenedor de recursos creado en el lifespan"""
+    return getattr(request.app.state, "resources", None)
+
+
+def get_file_manager(resources: Optional[AppResources] = Depends(get_resources)) -> FileManager:
+    """Gestor de archivos compartido del contenedor de recursos"""
+    if not resources:
+        raise HTTPException(status_code=500, detail="Gestor de archivos no disponible")
+    return resources.file_manager
+
+
+def get_rag_pipeline(resources: Optional[AppResources] = Depends(get_resources)) -> Optional[RAGPipeline]:
+    """Pipeline RAG de la aplicación"""
+    return resources.rag_pipeline if resources else None
+
+
+def get_ingestion_queue(resources: Optional[AppResources] = Depends(get_resources)) -> Optional[IngestionQueue]:
+    """Cola de ingesta de la aplicación"""
+    return resources.ingestion_queue if resources else None
+
+
+def parse_pool(pool: Optional[str]) -> str:
+    """Identificador de pool recibido en una petición ("" para la pool por defecto; 400 si no es válido)"""
+    try:
+        return normalize_pool(pool)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_candidate_ranker(resources: Optional[AppResources] = Depends(get_resources)) -> Optional[CandidateRanker]:
+    """Ranking de candidatos de la aplicación"""
+    return resources.candidate_ranker if resources else None
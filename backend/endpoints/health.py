@@ -4,6 +4,7 @@ Endpoints de salud y estado del sistema
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
 from config.llm_config import get_provider_info
+from services.tracing import tracer
 
 router = APIRouter()
 
@@ -47,3 +48,12 @@ async def llm_config_check() -> Dict[str, Any]:
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener configuración LLM: {str(e)}")
+
+@router.get("/metrics")
+async def latency_metrics() -> Dict[str, Any]:
+    """Latencias por etapa (count, media, p50/p95/p99 y máximo en ms) desde el arranque"""
+    return {
+        "status": "success",
+        "tracing_enabled": tracer.enabled,
+        "stages": tracer.stats()
+    }
@@ -8,25 +8,23 @@ import os
 from dotenv import load_dotenv
 
 from endpoints import cv_screener, health, chat
-from services.rag_pipeline import RAGPipeline
+from services.resources import AppResources
+from services.tracing import ServerTimingMiddleware
 
 # Cargar variables de entorno
 load_dotenv()
 
-# Inicializar el pipeline RAG
-rag_pipeline = None
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestión del ciclo de vida de la aplicación"""
-    global rag_pipeline
-    # Inicializar el pipeline RAG al arrancar
-    rag_pipeline = RAGPipeline()
-    await rag_pipeline.initialize()
+    # Pools de conexiones, pipeline RAG y cola de ingesta compartidos por todos los endpoints
+    resources = AppResources()
+    app.state.resources = resources
+    await resources.startup()
     yield
     # Cleanup al cerrar
-    if rag_pipeline:
-        await rag_pipeline.cleanup()
+    await resources.close()
+    app.state.resources = None
 
 # Crear la aplicación FastAPI
 app = FastAPI(
@@ -43,8 +41,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Tiempos por etapa en la cabecera Server-Timing e histogramas de latencia (GET /api/v1/metrics)
+app.add_middleware(ServerTimingMiddleware)
+
 # Incluir routers
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(cv_screener.router, prefix="/api/v1", tags=["cv-screener"])
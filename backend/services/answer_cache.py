@@ -0,0 +1,166 @@
+"""
+Caché de respuestas del chat
+Indexada por la pregunta normalizada y la versión del corpus de CVs: cualquier
+alta, baja o cambio de estado de un CV invalida todas las respuestas. Opcionalmente
+reutiliza la respuesta de una pregunta equivalente por similitud de embeddings.
+Las respuestas de distintos ámbitos (pool y secciones consultadas) no se mezclan.
+"""
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    """Minúsculas, sin acentos, sin signos de puntuación y con espacios simples"""
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+class AnswerCache:
+    """Caché LRU con TTL de respuestas del chat ligada a la versión del corpus"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        similarity_threshold: Optional[float] = None
+    ):
+        """
+        Args:
+            max_entries: Número máximo de respuestas (ANSWER_CACHE_MAX_ENTRIES)
+            ttl: Segundos de validez de cada respuesta (ANSWER_CACHE_TTL)
+            similarity_threshold: Similitud coseno mínima para reutilizar la respuesta de
+                otra pregunta (ANSWER_CACHE_SIMILARITY, desactivado si no se indica)
+        """
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+        self.ttl = ttl or float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+        if similarity_threshold is None and os.getenv("ANSWER_CACHE_SIMILARITY"):
+            similarity_threshold = float(os.getenv("ANSWER_CACHE_SIMILARITY"))
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._corpus_version = None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _sync_version(self, corpus_version: int) -> bool:
+        """
+        Vacía la caché si el corpus ha avanzado desde que se guardaron las respuestas
+
+        Returns:
+            bool: False si la versión es anterior a la actual (petición que empezó antes
+            de una ingesta): ni se vacía la caché ni se retrocede de versión
+        """
+        if self._corpus_version is not None and corpus_version < self._corpus_version:
+            return False
+        if corpus_version != self._corpus_version:
+            self._entries.clear()
+            self._corpus_version = corpus_version
+        return True
+
+    def get(
+        self,
+        question: str,
+        corpus_version: int,
+        vector: Optional[List[float]] = None,
+        scope: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Busca la respuesta a una pregunta
+
+        Args:
+            question: Pregunta del usuario
+            corpus_version: Versión actual del corpus
+            vector: Embedding de la pregunta (solo para la coincidencia por similitud)
+            scope: Ámbito de la consulta (pool y secciones); "" es el corpus por defecto completo
+
+        Returns:
+            Resultado guardado o None
+        """
+        if not self._sync_version(corpus_version):
+            self.misses += 1
+            return None
+        now = time.monotonic()
+        key = (scope, normalize_question(question))
+
+        entry = self._entries.get(key)
+        if entry and entry["expires_at"] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["result"]
+        if entry:
+            del self._entries[key]
+
+        if vector is not None and self.similarity_threshold is not None:
+            match = self._most_similar(vector, now, scope)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self.semantic_hits += 1
+                return self._entries[match]["result"]
+
+        self.misses += 1
+        return None
+
+    def _most_similar(self, vector: List[float], now: float, scope: str = "") -> Optional[Tuple[str, str]]:
+        """Clave de la pregunta guardada más similar del mismo ámbito si supera el umbral"""
+        candidates = [
+            (key, entry["vector"]) for key, entry in self._entries.items()
+            if key[0] == scope and entry["vector"] is not None and entry["expires_at"] > now
+        ]
+        if not candidates:
+            return None
+        matrix = np.asarray([candidate for _, candidate in candidates], dtype=np.float32)
+        query = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(scores))
+        return candidates[best][0] if scores[best] >= self.similarity_threshold else None
+
+    def put(
+        self,
+        question: str,
+        corpus_version: int,
+        result: Dict[str, Any],
+        vector: Optional[List[float]] = None,
+        scope: str = ""
+    ) -> None:
+        """
+        Guarda la respuesta a una pregunta
+
+        Args:
+            question: Pregunta del usuario
+            corpus_version: Versión del corpus con la que se generó la respuesta (si el
+                corpus ha cambiado mientras se generaba, la respuesta no se guarda)
+            result: Resultado a guardar
+            vector: Embedding de la pregunta
+            scope: Ámbito de la consulta (pool y secciones)
+        """
+        if not self._sync_version(corpus_version):
+            return
+        key = (scope, normalize_question(question))
+        self._entries[key] = {
+            "result": result,
+            "vector": vector,
+            "expires_at": time.monotonic() + self.ttl
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y fallos"""
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            "corpus_version": self._corpus_version
+        }
@@ -0,0 +1,127 @@
+"""
+Ranking de todos los CVs contra una descripción de trabajo
+Primero puntúa el corpus completo con una sola consulta vectorial (la descripción
+se embebe una vez) y después envía al LLM solo los CVs preseleccionados, con un
+número acotado de llamadas simultáneas.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from services.file_manager import FileManager
+from services.rag_pipeline import RAGPipeline
+from services.tracing import tracer
+
+
+class CandidateRanker:
+    """Ranking de candidatos en dos fases: similitud vectorial y análisis del LLM"""
+
+    def __init__(
+        self,
+        rag_pipeline: RAGPipeline,
+        file_manager: Optional[FileManager] = None,
+        concurrency: Optional[int] = None,
+        cv_max_chars: Optional[int] = None
+    ):
+        """
+        Args:
+            rag_pipeline: Pipeline RAG inicializado
+            file_manager: Gestor de archivos (por defecto el del pipeline)
+            concurrency: Análisis del LLM simultáneos (RANK_LLM_CONCURRENCY)
+            cv_max_chars: Caracteres de cada CV que se envían al LLM (RANK_CV_MAX_CHARS)
+        """
+        self.rag_pipeline = rag_pipeline
+        self.file_manager = file_manager or rag_pipeline.file_manager
+        self.concurrency = concurrency or int(os.getenv("RANK_LLM_CONCURRENCY", "4"))
+        self.cv_max_chars = cv_max_chars or int(os.getenv("RANK_CV_MAX_CHARS", "12000"))
+        # Compartido entre peticiones para acotar la carga total sobre el LLM
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def rank(self, job_description: str, top_n: int = 10, analyze: bool = True, pool: str = "") -> Dict[str, Any]:
+        """
+        Devuelve los mejores candidatos del corpus para una descripción de trabajo
+
+        Args:
+            job_description: Descripción del puesto
+            top_n: Número de candidatos a devolver
+            analyze: Si es False solo se devuelve la preselección por similitud
+            pool: Pool de CVs que se puntúa ("" para la pool por defecto)
+
+        Returns:
+            Dict con candidates (ordenados), total_scored, truncated y unscored (CVs procesados
+            sin puntuar porque ningún chunk suyo entró en el límite de la consulta de Pinecone) y timing
+        """
+        start = time.perf_counter()
+        with tracer.span("embed"):
+            vector = await self.rag_pipeline.executor.run(self.rag_pipeline.embeddings.embed_query, job_description)
+        scores, complete = await self.rag_pipeline.score_cvs(vector, pool)
+        unscored = 0
+        if not complete:
+            processed = await self.file_manager.list_processed_files(status="processed", pool=pool)
+            unscored = sum(1 for metadata in processed if metadata["uuid"] not in scores)
+            if unscored:
+                print(f"Ranking truncado: {unscored} CVs sin chunks entre los {self.rag_pipeline.rank_top_k} más similares")
+        shortlist = await self._shortlist(scores, top_n)
+        scoring_ms = (time.perf_counter() - start) * 1000
+
+        if analyze:
+            await asyncio.gather(*(self._analyze(candidate, job_description) for candidate in shortlist))
+            shortlist.sort(
+                key=lambda candidate: (
+                    candidate["analysis"]["score"] if candidate["analysis"] else -1.0,
+                    candidate["similarity"]
+                ),
+                reverse=True
+            )
+
+        return {
+            "candidates": shortlist,
+            "total_scored": len(scores),
+            "truncated": unscored > 0,
+            "unscored": unscored,
+            "timing": {
+                "scoring_ms": round(scoring_ms, 1),
+                "total_ms": round((time.perf_counter() - start) * 1000, 1)
+            }
+        }
+
+    async def _shortlist(self, scores: Dict[str, float], top_n: int) -> List[Dict[str, Any]]:
+        """
+        Los top_n CVs más similares que siguen procesados (descarta vectores de CVs borrados)
+
+        Args:
+            scores: Dict UUID -> similitud
+            top_n: Número de candidatos
+
+        Returns:
+            Lista de candidatos {uuid, filename, similarity, analysis}
+        """
+        shortlist = []
+        for file_uuid, similarity in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            if len(shortlist) >= top_n:
+                break
+            metadata = await self.file_manager.get_file_metadata(file_uuid)
+            if not metadata or metadata.get("status") != "processed":
+                continue
+            shortlist.append({
+                "uuid": file_uuid,
+                "filename": metadata.get("original_filename", "Unknown"),
+                "similarity": round(similarity, 4),
+                "analysis": None
+            })
+        return shortlist
+
+    async def _analyze(self, candidate: Dict[str, Any], job_description: str) -> None:
+        """Añade al candidato el análisis del LLM (o el error si falla)"""
+        async with self._semaphore:
+            try:
+                cv_text = await self.rag_pipeline.get_candidate_text(candidate["uuid"])
+                if not cv_text:
+                    raise ValueError("No se pudo obtener el texto del CV")
+                candidate["analysis"] = await self.rag_pipeline.analyze_cv_match(
+                    cv_text[:self.cv_max_chars], job_description
+                )
+            except Exception as e:
+                print(f"Error al analizar el candidato {candidate['uuid']}: {str(e)}")
+                candidate["error"] = str(e)
@@ -0,0 +1,176 @@
+"""
+Ensamblado del contexto para el LLM con presupuesto de tokens
+Entre la recuperación y el LLM: une los chunks consecutivos de un mismo CV
+eliminando el solapamiento del splitter, descarta los casi duplicados y recorta
+el resultado al presupuesto de tokens, informando de los tokens ahorrados.
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain.schema import Document
+
+MIN_OVERLAP_CHARS = 8
+# Tokens mínimos libres para incluir recortado el bloque que no cabe entero
+MIN_TRUNCATED_TOKENS = 50
+
+
+class ContextPacker:
+    """Une, deduplica y recorta los documentos recuperados a un presupuesto de tokens"""
+
+    def __init__(
+        self,
+        tokenizer: Optional[Any] = None,
+        token_budget: Optional[int] = None,
+        max_overlap: int = 400,
+        duplicate_threshold: float = 0.9
+    ):
+        """
+        Args:
+            tokenizer: Codificador de tiktoken (si no hay, se estima 1 token cada 4 caracteres)
+            token_budget: Tokens máximos de contexto (CONTEXT_TOKEN_BUDGET)
+            max_overlap: Caracteres máximos de solapamiento entre chunks consecutivos
+            duplicate_threshold: Similitud de Jaccard (o contención) a partir de la cual
+                un bloque se considera duplicado de otro mejor clasificado
+        """
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+        self.max_overlap = max_overlap
+        self.duplicate_threshold = duplicate_threshold
+        self.requests = 0
+        self.tokens_saved = 0
+
+    def count_tokens(self, text: str) -> int:
+        """Tokens de un texto con el tokenizer del pipeline"""
+        if self.tokenizer is None:
+            return (len(text) + 3) // 4
+        return len(self.tokenizer.encode(text, disallowed_special=()))
+
+    def pack(self, documents: List[Document]) -> Tuple[List[Document], Dict[str, int]]:
+        """
+        Prepara el contexto a partir de los documentos recuperados (en orden de relevancia)
+
+        Args:
+            documents: Documentos recuperados
+
+        Returns:
+            Tupla (documentos para el LLM, estadísticas de tokens antes y después)
+        """
+        tokens_before = sum(self.count_tokens(document.page_content) for document in documents)
+
+        blocks = self._merge_adjacent(documents)
+        blocks = self._drop_near_duplicates(blocks)
+        packed = self._fit_budget(blocks)
+
+        tokens_after = sum(self.count_tokens(document.page_content) for document in packed)
+        stats = {
+            "chunks": len(documents),
+            "blocks": len(packed),
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after
+        }
+        self.requests += 1
+        self.tokens_saved += stats["tokens_saved"]
+        return packed, stats
+
+    def _merge_adjacent(self, documents: List[Document]) -> List[Document]:
+        """
+        Une los chunks consecutivos (chunk_index contiguo) de un mismo CV en un único bloque,
+        quitando el texto repetido por el solapamiento. Cada bloque conserva la posición del
+        chunk mejor clasificado.
+        """
+        groups: Dict[Any, List[Tuple[int, Document]]] = {}
+        for rank, document in enumerate(documents):
+            key = document.metadata.get("uuid")
+            if key is None or document.metadata.get("chunk_index") is None:
+                key = ("chunk", rank)
+            groups.setdefault(key, []).append((rank, document))
+
+        blocks: List[Tuple[int, Document]] = []
+        for members in groups.values():
+            members.sort(key=lambda member: member[1].metadata.get("chunk_index") or 0)
+            rank, current = members[0]
+            indexes = [current.metadata.get("chunk_index")]
+            text = current.page_content
+            for next_rank, document in members[1:]:
+                index = document.metadata.get("chunk_index")
+                if indexes[-1] is not None and index == indexes[-1] + 1:
+                    text = self._join_overlapping(text, document.page_content)
+                    indexes.append(index)
+                    rank = min(rank, next_rank)
+                    continue
+                blocks.append((rank, self._block(current, text, indexes)))
+                rank, current, indexes, text = next_rank, document, [index], document.page_content
+            blocks.append((rank, self._block(current, text, indexes)))
+
+        blocks.sort(key=lambda block: block[0])
+        return [document for _, document in blocks]
+
+    @staticmethod
+    def _block(first: Document, text: str, indexes: List[Optional[int]]) -> Document:
+        if len(indexes) == 1:
+            return first
+        return Document(page_content=text, metadata={**first.metadata, "chunk_indexes": indexes})
+
+    def _join_overlapping(self, left: str, right: str) -> str:
+        """Concatena dos chunks consecutivos sin repetir el sufijo de left con el que empieza right"""
+        longest = min(len(left), len(right), self.max_overlap)
+        # Solapamientos muy cortos pueden ser coincidencias (una palabra repetida)
+        for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+            if left.endswith(right[:size]):
+                return left + right[size:]
+        return left + "\n" + right
+
+    def _drop_near_duplicates(self, blocks: List[Document]) -> List[Document]:
+        """Descarta los bloques casi idénticos o contenidos en otro mejor clasificado"""
+        kept: List[Tuple[Document, Set[Tuple[str, ...]]]] = []
+        for block in blocks:
+            shingles = self._shingles(block.page_content)
+            duplicate = False
+            for _, other in kept:
+                if not shingles or not other:
+                    continue
+                shared = len(shingles & other)
+                jaccard = shared / len(shingles | other)
+                containment = shared / len(shingles)
+                if jaccard >= self.duplicate_threshold or containment >= self.duplicate_threshold:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append((block, shingles))
+        return [block for block, _ in kept]
+
+    @staticmethod
+    def _shingles(text: str, size: int = 5) -> Set[Tuple[str, ...]]:
+        words = re.findall(r"\w+", text.lower())
+        if len(words) < size:
+            return {tuple(words)} if words else set()
+        return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    def _fit_budget(self, blocks: List[Document]) -> List[Document]:
+        """Añade bloques por orden de relevancia hasta el presupuesto; el último que no cabe se recorta"""
+        packed = []
+        remaining = self.token_budget
+        for block in blocks:
+            tokens = self.count_tokens(block.page_content)
+            if tokens <= remaining:
+                packed.append(block)
+                remaining -= tokens
+                continue
+            if remaining >= MIN_TRUNCATED_TOKENS:
+                packed.append(Document(
+                    page_content=self._truncate(block.page_content, remaining),
+                    metadata={**block.metadata, "truncated": True}
+                ))
+            break
+        return packed
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        if self.tokenizer is None:
+            return text[:max_tokens * 4]
+        return self.tokenizer.decode(self.tokenizer.encode(text, disallowed_special=())[:max_tokens])
+
+    def stats(self) -> Dict[str, int]:
+        """Tokens ahorrados acumulados"""
+        return {"requests": self.requests, "tokens_saved": self.tokens_saved, "token_budget": self.token_budget}
@@ -0,0 +1,204 @@
+"""
+División de CVs en chunks por secciones y por tokens
+Detecta las cabeceras habituales de un CV (experiencia, formación, habilidades,
+idiomas...) y agrupa líneas completas de cada sección hasta el tamaño en tokens
+configurado. Cada chunk lleva las secciones que contiene para poder filtrar por ellas.
+"""
+import os
+import re
+from typing import Any, List, Optional, Pattern, Tuple
+
+from services.profile_extractor import fold
+
+# Sección canónica -> cabeceras (texto en minúsculas y sin acentos)
+SECTION_HEADERS = {
+    "summary": [
+        r"resumen(?: profesional)?", r"perfil(?: profesional| personal)?", r"sobre mi", r"acerca de mi",
+        r"objetivo(?: profesional)?", r"summary", r"(?:professional )?profile", r"about(?: me)?", r"objective"
+    ],
+    "experience": [
+        r"experiencia(?: profesional| laboral)?", r"trayectoria(?: profesional)?", r"historial laboral",
+        r"(?:work |professional )?experience", r"employment(?: history)?", r"work history"
+    ],
+    "education": [
+        r"formacion(?: academica| reglada)?", r"educacion", r"estudios", r"titulacion(?:es)?",
+        r"education", r"academic background"
+    ],
+    "skills": [
+        r"habilidades(?: tecnicas)?", r"competencias(?: tecnicas| profesionales)?",
+        r"conocimientos(?: tecnicos| informaticos)?", r"aptitudes", r"tecnologias", r"stack tecnologico",
+        r"(?:technical )?skills", r"tech stack"
+    ],
+    "languages": [r"idiomas", r"languages"],
+    "projects": [r"proyectos(?: destacados| personales)?", r"(?:personal )?projects"],
+    "certifications": [
+        r"certificaciones", r"certificados", r"cursos(?: y certificaciones)?", r"formacion complementaria",
+        r"certifications", r"courses"
+    ],
+    "other": [
+        r"referencias", r"references", r"intereses", r"interests", r"aficiones", r"hobbies",
+        r"voluntariado", r"volunteering", r"publicaciones", r"publications", r"premios", r"awards",
+        r"logros", r"achievements"
+    ],
+}
+
+# "header" es el texto anterior a la primera cabecera (nombre y contacto)
+SECTIONS = ["header"] + list(SECTION_HEADERS)
+
+# Una cabecera ocupa la línea completa o va seguida de dos puntos ("Idiomas: inglés C1")
+HEADER_PATTERNS: List[Tuple[str, Pattern]] = [
+    (section, re.compile(r"^[\W\d_]*(?:" + "|".join(aliases) + r")[\s.]*(?::.*)?$"))
+    for section, aliases in SECTION_HEADERS.items()
+]
+MAX_HEADER_CHARS = 60
+SENTENCE_END = re.compile(r"(?<=[.;!?])\s+")
+
+
+class CVChunker:
+    """Divide el texto de un CV en chunks que respetan las secciones y un tamaño en tokens"""
+
+    def __init__(
+        self,
+        tokenizer: Optional[Any] = None,
+        chunk_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None
+    ):
+        """
+        Args:
+            tokenizer: Codificador de tiktoken (si no hay, se estima 1 token cada 4 caracteres)
+            chunk_tokens: Tokens máximos por chunk (CHUNK_TOKENS)
+            overlap_tokens: Tokens de las últimas líneas que se repiten en el siguiente
+                chunk de la misma sección (CHUNK_OVERLAP_TOKENS)
+        """
+        self.tokenizer = tokenizer
+        self.chunk_tokens = chunk_tokens or int(os.getenv("CHUNK_TOKENS", "400"))
+        self.overlap_tokens = overlap_tokens if overlap_tokens is not None else int(os.getenv("CHUNK_OVERLAP_TOKENS", "30"))
+
+    def count_tokens(self, text: str) -> int:
+        if self.tokenizer is None:
+            return (len(text) + 3) // 4
+        return len(self.tokenizer.encode(text, disallowed_special=()))
+
+    @staticmethod
+    def detect_section(line: str) -> Optional[str]:
+        """Sección cuya cabecera ocupa la línea, o None si la línea no es una cabecera"""
+        folded = fold(line).strip()
+        if not folded:
+            return None
+        # Las cabeceras en línea propia son cortas; con dos puntos se mira solo lo anterior
+        head = folded.split(":", 1)[0] if ":" in folded else folded
+        if len(head) > MAX_HEADER_CHARS:
+            return None
+        for section, pattern in HEADER_PATTERNS:
+            if pattern.match(folded):
+                return section
+        return None
+
+    def split_sections(self, text: str, initial: str = "header") -> List[Tuple[str, str]]:
+        """
+        Divide el texto por cabeceras de sección
+
+        Args:
+            text: Texto del CV (o de una parte)
+            initial: Sección del texto anterior a la primera cabecera
+
+        Returns:
+            Lista de (sección, texto incluida su cabecera), en orden
+        """
+        sections: List[Tuple[str, List[str]]] = [(initial, [])]
+        for line in text.splitlines():
+            section = self.detect_section(line)
+            if section:
+                sections.append((section, [line]))
+            else:
+                sections[-1][1].append(line)
+        return [(section, "\n".join(lines).strip()) for section, lines in sections if "".join(lines).strip()]
+
+    def _units(self, text: str) -> List[Tuple[str, int]]:
+        """Líneas con su número de tokens; las que son muy largas se parten por frases y palabras"""
+        limit = max(1, self.chunk_tokens // 4)
+        units = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            tokens = self.count_tokens(line)
+            if tokens <= limit:
+                units.append((line, tokens))
+                continue
+            for sentence in SENTENCE_END.split(line):
+                tokens = self.count_tokens(sentence)
+                if tokens <= limit:
+                    units.append((sentence, tokens))
+                    continue
+                piece, piece_tokens = [], 0
+                for word in sentence.split():
+                    word_tokens = self.count_tokens(" " + word)
+                    if piece and piece_tokens + word_tokens > limit:
+                        units.append((" ".join(piece), piece_tokens))
+                        piece, piece_tokens = [], 0
+                    piece.append(word)
+                    piece_tokens += word_tokens
+                if piece:
+                    units.append((" ".join(piece), piece_tokens))
+        return units
+
+    def chunk_sections(self, sections: List[Tuple[str, str]]) -> List[Tuple[str, List[str]]]:
+        """
+        Agrupa las líneas de cada sección en chunks de hasta chunk_tokens tokens.
+        Una sección que cabe entera en el chunk actual se añade a él; si no, empieza
+        chunk nuevo, de modo que solo se parten las secciones más largas que un chunk.
+
+        Args:
+            sections: Lista de (sección, texto) de split_sections
+
+        Returns:
+            Lista de (texto del chunk, secciones que contiene)
+        """
+        chunks: List[Tuple[str, List[str]]] = []
+        current: List[Tuple[str, int]] = []
+        current_tokens = 0
+        current_sections: List[str] = []
+
+        def flush() -> None:
+            if current:
+                chunks.append(("\n".join(text for text, _ in current), list(current_sections)))
+
+        for section, text in sections:
+            units = self._units(text)
+            if not units:
+                continue
+            section_tokens = sum(tokens + 1 for _, tokens in units)
+            if current and current_tokens + section_tokens > self.chunk_tokens:
+                flush()
+                current, current_tokens, current_sections = [], 0, []
+            current_sections.append(section)
+
+            for unit, tokens in units:
+                if current and current_tokens + tokens + 1 > self.chunk_tokens:
+                    flush()
+                    # Solapamiento: últimas líneas del chunk anterior, solo dentro de la misma sección
+                    overlap, overlap_tokens = [], 0
+                    if current_sections == [section]:
+                        for previous, previous_tokens in reversed(current[1:]):
+                            if overlap_tokens + previous_tokens + 1 > self.overlap_tokens:
+                                break
+                            overlap.insert(0, (previous, previous_tokens))
+                            overlap_tokens += previous_tokens + 1
+                    current, current_tokens, current_sections = overlap, overlap_tokens, [section]
+                current.append((unit, tokens))
+                current_tokens += tokens + 1
+        flush()
+        return chunks
+
+    def chunk(self, text: str) -> List[Tuple[str, List[str]]]:
+        """
+        Divide el texto de un CV en chunks
+
+        Args:
+            text: Texto completo del CV
+
+        Returns:
+            Lista de (texto del chunk, secciones que contiene)
+        """
+        return self.chunk_sections(self.split_sections(text))
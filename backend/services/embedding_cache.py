@@ -0,0 +1,388 @@
+"""
+Caché persistente de embeddings indexada por modelo y hash del texto
+Un LRU en memoria delante de un almacén en disco (SQLite con blobs float32 y
+desalojo por tamaño). Sirve tanto los embeddings de documentos como los de consultas.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+# Accesos pendientes de guardar en last_used a partir de los cuales se escriben sin esperar a put_many
+TOUCH_FLUSH_SIZE = 1000
+
+
+def text_hash(text: str) -> str:
+    """Hash SHA-256 del texto (clave de deduplicación de chunks y embeddings)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore(Protocol):
+    """Interfaz de los almacenes persistentes de embeddings"""
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]: ...
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]) -> None: ...
+
+    def stats(self) -> Dict[str, int]: ...
+
+    def close(self) -> None: ...
+
+
+class SQLiteEmbeddingStore:
+    """Embeddings en SQLite como blobs float32, con desalojo de los menos usados por tamaño"""
+
+    def __init__(self, db_path: Optional[Path] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            db_path: Ruta de la base de datos (por defecto data/embeddings.db)
+            max_bytes: Tamaño máximo de los vectores guardados (EMBEDDING_CACHE_MAX_MB)
+        """
+        project_root = Path(__file__).parent.parent.parent
+        self.db_path = Path(db_path) if db_path else project_root / "data" / "embeddings.db"
+        self.max_bytes = max_bytes or int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024")) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._conn = None
+        self._size_bytes = 0
+        # Último acceso de los embeddings leídos, pendiente de escribir (las lecturas no escriben en disco)
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abre la base de datos en el primer uso (llamar con el lock adquirido)"""
+        if self._conn is None:
+            self._conn = self._connect()
+            self._size_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()[0]
+        return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(embeddings)")]
+        if "last_used" not in columns:
+            conn.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        conn.commit()
+        return conn
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Obtiene los embeddings guardados para una lista de hashes
+
+        Args:
+            model: Modelo de embeddings
+            hashes: Hashes de los textos
+
+        Returns:
+            Dict hash -> vector con los encontrados
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            # Consultas por bloques para respetar el límite de parámetros de SQLite
+            for start in range(0, len(unique), 500):
+                block = unique[start:start + 500]
+                placeholders = ",".join("?" * len(block))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *block]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                    self._touched[(model, key)] = now
+            if len(self._touched) >= TOUCH_FLUSH_SIZE:
+                self._flush_touched(conn)
+                conn.commit()
+        return found
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        """Escribe el último acceso de los embeddings leídos (llamar con el lock adquirido)"""
+        if self._touched:
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(used, model, key) for (model, key), used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]) -> None:
+        """
+        Guarda embeddings nuevos y desaloja los menos usados si se supera el tamaño máximo
+
+        Args:
+            model: Modelo de embeddings
+            vectors: Dict hash -> vector
+        """
+        if not vectors:
+            return
+        now = time.time()
+        rows = [
+            (model, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in vectors.items()
+        ]
+        with self._lock:
+            conn = self._connection()
+            for row in rows:
+                # Si otro embedder ya lo guardó, la fila existente se conserva y no suma tamaño
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                    row
+                ).rowcount
+                if inserted:
+                    self._size_bytes += len(row[2])
+                else:
+                    self._touched[(model, row[1])] = now
+            self._flush_touched(conn)
+            if self._size_bytes > self.max_bytes:
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Elimina los embeddings menos usados hasta quedar al 90% del tamaño máximo"""
+        target = int(self.max_bytes * 0.9)
+        while self._size_bytes > target:
+            rows = conn.execute(
+                "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._size_bytes = 0
+                break
+            victims = []
+            for rowid, size in rows:
+                victims.append((rowid,))
+                self._size_bytes -= size
+                if self._size_bytes <= target:
+                    break
+            conn.executemany("DELETE FROM embeddings WHERE rowid = ?", victims)
+            self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            conn = self._connection()
+            entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"disk_entries": entries, "disk_bytes": self._size_bytes, "evictions": self.evictions}
+
+    def close(self) -> None:
+        """Guarda los accesos pendientes y cierra la base de datos"""
+        with self._lock:
+            if self._conn is not None:
+                self._flush_touched(self._conn)
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+class EmbeddingCache:
+    """LRU en memoria delante de un almacén persistente, con contadores de aciertos"""
+
+    def __init__(
+        self,
+        store: Optional[EmbeddingStore] = None,
+        lru_size: Optional[int] = None,
+        db_path: Optional[Path] = None
+    ):
+        """
+        Args:
+            store: Almacén persistente (por defecto según EMBEDDING_CACHE_BACKEND: sqlite o none)
+            lru_size: Entradas del LRU en memoria (EMBEDDING_CACHE_LRU_SIZE)
+            db_path: Ruta de la base de datos del almacén SQLite por defecto
+        """
+        if store is None and os.getenv("EMBEDDING_CACHE_BACKEND", "sqlite") == "sqlite":
+            store = SQLiteEmbeddingStore(db_path)
+        self.store = store
+        self.lru_size = lru_size if lru_size is not None else int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "5000"))
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Obtiene los embeddings en caché (memoria y después disco)
+
+        Args:
+            model: Modelo de embeddings
+            hashes: Hashes de los textos
+
+        Returns:
+            Dict hash -> vector con los encontrados
+        """
+        found = {}
+        pending = []
+        with self._lock:
+            for key in dict.fromkeys(hashes):
+                vector = self._lru.get((model, key))
+                if vector is None:
+                    pending.append(key)
+                else:
+                    self._lru.move_to_end((model, key))
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+        if pending and self.store is not None:
+            from_disk = self.store.get_many(model, pending)
+            with self._lock:
+                self.disk_hits += len(from_disk)
+                for key, vector in from_disk.items():
+                    self._remember(model, key, vector)
+            found.update(from_disk)
+
+        with self._lock:
+            self.misses += len(pending) - len([key for key in pending if key in found])
+
+        return {key: vector.tolist() for key, vector in found.items()}
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        """
+        Guarda embeddings nuevos en memoria y en disco
+
+        Args:
+            model: Modelo de embeddings
+            vectors: Dict hash -> vector
+        """
+        arrays = {key: np.asarray(vector, dtype=np.float32) for key, vector in vectors.items()}
+        with self._lock:
+            for key, vector in arrays.items():
+                self._remember(model, key, vector)
+        if self.store is not None:
+            self.store.put_many(model, arrays)
+
+    def _remember(self, model: str, key: str, vector: np.ndarray) -> None:
+        """Añade al LRU desalojando la entrada más antigua (llamar con el lock adquirido)"""
+        if self.lru_size <= 0:
+            return
+        self._lru[(model, key)] = vector
+        self._lru.move_to_end((model, key))
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores de aciertos y fallos de la caché"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            stats = {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._lru)
+            }
+        if self.store is not None:
+            stats.update(self.store.stats())
+        return stats
+
+    def close(self) -> None:
+        """Cierra el almacén persistente"""
+        if self.store is not None:
+            self.store.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Envoltorio de Embeddings de LangChain que sirve documentos y consultas desde la caché"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        """
+        Args:
+            embeddings: Embeddings subyacentes (p. ej. OpenAIEmbeddings)
+            cache: Caché de embeddings
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = getattr(embeddings, "model", "default")
+        # Textos que otro hilo está enviando al proveedor: hash -> Future con su vector
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.coalesced = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        known = self.cache.get_many(self.model, hashes)
+
+        # Solo se envían al proveedor los textos distintos que no están en caché
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in known:
+                missing.setdefault(key, text)
+
+        if missing:
+            known.update(self._embed_missing(missing, self.embeddings.embed_documents))
+
+        return [known[key] for key in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_hash(text)
+        known = self.cache.get_many(self.model, [key])
+        if key in known:
+            return known[key]
+        vectors = self._embed_missing({key: text}, lambda texts: [self.embeddings.embed_query(texts[0])])
+        return vectors[key]
+
+    def _embed_missing(self, missing: Dict[str, str], embed: Callable[[List[str]], List[List[float]]]) -> Dict[str, List[float]]:
+        """
+        Calcula los embeddings que faltan; los textos que ya está calculando otro hilo
+        no se vuelven a enviar, se espera su resultado
+
+        Args:
+            missing: Dict hash -> texto sin embedding en caché
+            embed: Llamada al proveedor con la lista de textos propios
+
+        Returns:
+            Dict hash -> vector de todos los textos de missing
+        """
+        own = {}
+        waiting = {}
+        with self._inflight_lock:
+            for key, text in missing.items():
+                if key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    own[key] = text
+                    self._inflight[key] = Future()
+            self.coalesced += len(waiting)
+
+        vectors = {}
+        if own:
+            try:
+                vectors = dict(zip(own.keys(), embed(list(own.values()))))
+                self.cache.put_many(self.model, vectors)
+            except Exception as e:
+                self._release(own, error=e)
+                raise
+            self._release(own, vectors=vectors)
+
+        # Los propios se resuelven antes de esperar a los ajenos, así que no hay esperas cruzadas
+        for key, future in waiting.items():
+            vectors[key] = future.result()
+        return vectors
+
+    def _release(self, keys: Dict[str, str], vectors: Optional[Dict[str, List[float]]] = None, error: Optional[Exception] = None) -> None:
+        """Resuelve los futures de los textos propios y los retira de la lista en curso"""
+        with self._inflight_lock:
+            futures = [self._inflight.pop(key) for key in keys]
+        for key, future in zip(keys, futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(vectors[key])
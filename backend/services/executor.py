@@ -0,0 +1,49 @@
+"""
+Capa de ejecución para llamadas bloqueantes (LangChain, Pinecone, pypdf)
+Ejecuta el trabajo síncrono en un pool de hilos acotado para no bloquear el event loop
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BlockingExecutor:
+    """Pool de hilos acotado para llamadas síncronas desde handlers async"""
+
+    def __init__(self, max_workers: Optional[int] = None, thread_name_prefix: str = "rag"):
+        """
+        Args:
+            max_workers: Número máximo de hilos (por defecto RAG_MAX_WORKERS o 32)
+            thread_name_prefix: Prefijo para los nombres de los hilos
+        """
+        self.max_workers = max_workers or int(os.getenv("RAG_MAX_WORKERS", "32"))
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=thread_name_prefix
+        )
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Ejecuta una función bloqueante en el pool sin bloquear el event loop
+
+        Args:
+            func: Función síncrona a ejecutar
+            *args, **kwargs: Argumentos de la función
+
+        Returns:
+            El resultado de la función
+        """
+        loop = asyncio.get_running_loop()
+        # Propagar contextvars al hilo (igual que asyncio.to_thread)
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._pool, call)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cierra el pool cancelando el trabajo pendiente"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -1,78 +1,201 @@
 """
 Sistema de gestión de archivos con UUIDs
-Maneja la subida, almacenamiento y metadatos de archivos PDF
+Maneja la subida y el almacenamiento de archivos PDF y sus metadatos en SQLite
 """
 import uuid
-import json
 import os
-from typing import Dict, Any, List, Optional
+import json
+import base64
+import gzip
+import hashlib
+from typing import Dict, Any, List, Optional, BinaryIO, Tuple
 from pathlib import Path
 from datetime import datetime
 from fastapi import UploadFile
 import asyncio
+from services.executor import BlockingExecutor
+from services.metadata_store import MetadataStore
+from services.profile_store import CandidateProfileStore
+from services.tracing import tracer
+
+class FileTooLargeError(Exception):
+    """El archivo supera el tamaño máximo de subida"""
+
 
 class FileManager:
-    """Gestor de archivos con UUIDs únicos"""
+    """Gestor de archivos con UUIDs únicos y metadatos en SQLite"""
     
-    def __init__(self):
+    def __init__(self, data_dir: Optional[Path] = None, executor: Optional[BlockingExecutor] = None):
         # Rutas relativas al directorio raíz del proyecto
         project_root = Path(__file__).parent.parent.parent
-        self.cvs_dir = project_root / "data" / "cvs"
-        self.json_dir = project_root / "data" / "json"
+        data_dir = Path(data_dir) if data_dir else project_root / "data"
+        self.data_dir = data_dir
+        self.cvs_dir = data_dir / "cvs"
+        self.json_dir = data_dir / "json"
+        # Subidas: bloques de tamaño fijo y tamaño máximo por archivo
+        self.upload_chunk_size = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+        self.max_upload_bytes = int(os.getenv("UPLOAD_MAX_MB", "50")) * 1024 * 1024
         self._ensure_directories()
+        # Metadatos en SQLite (los JSON antiguos de json_dir se migran en el primer uso)
+        self.metadata_store = MetadataStore(data_dir / "metadata.db", json_dir=self.json_dir)
+        # Perfiles estructurados extraídos en la ingesta (consultas sin LLM)
+        self.profile_store = CandidateProfileStore(data_dir / "profiles.db")
+        # Serializa la comprobación de duplicados (uno por instancia; asyncio.Lock se asocia al
+        # event loop en el primer uso, no al crearse)
+        self._dedup_lock = asyncio.Lock()
+        # Hashes reservados por subidas que aún no han registrado sus metadatos: (pool, hash) -> UUID
+        self._pending_hashes: Dict[Tuple[str, str], str] = {}
+        # Pool de hilos acotado para la E/S de disco y SQLite (compartido con el pipeline RAG y la cola)
+        self.executor = executor or BlockingExecutor()
     
     def _ensure_directories(self):
         """Crear directorios necesarios si no existen"""
         self.cvs_dir.mkdir(parents=True, exist_ok=True)
         self.json_dir.mkdir(parents=True, exist_ok=True)
     
-    async def save_file_with_metadata(self, file: UploadFile) -> str:
+    async def save_file_with_metadata(self, file: UploadFile, pool: str = "") -> str:
         """
-        Guarda archivo PDF y genera metadatos JSON
+        Guarda archivo PDF y registra sus metadatos en SQLite
         
         Args:
             file: Archivo PDF subido
+            pool: Pool del CV ("" para la pool por defecto)
+            
+        Returns:
+            str: UUID del archivo guardado (o del existente si es un duplicado exacto)
+        """
+        file_uuid, _ = await self.save_file_deduplicated(file, pool)
+        return file_uuid
+    
+    async def save_file_deduplicated(self, file: UploadFile, pool: str = "") -> Tuple[str, bool]:
+        """
+        Guarda archivo PDF salvo que ya exista uno con el mismo contenido en la pool
+        
+        Args:
+            file: Archivo PDF subido
+            pool: Pool del CV ("" para la pool por defecto)
+            
+        Returns:
+            Tupla (UUID, es_duplicado). Si es duplicado, el UUID es el del archivo existente
+        """
+        # UploadFile.file es el archivo temporal del servidor: se copia por bloques sin cargarlo en memoria
+        return await self.save_stream_deduplicated(file.filename, file.file, pool)
+    
+    async def save_stream_with_metadata(self, filename: str, stream: BinaryIO, pool: str = "") -> str:
+        """
+        Guarda un PDF leído desde un stream (p. ej. una entrada de un ZIP) sin cargarlo entero en memoria
+        
+        Args:
+            filename: Nombre original del archivo
+            stream: Stream binario con el contenido del PDF
+            pool: Pool del CV ("" para la pool por defecto)
             
         Returns:
-            str: UUID del archivo guardado
+            str: UUID del archivo guardado (o del existente si es un duplicado exacto)
         """
+        file_uuid, _ = await self.save_stream_deduplicated(filename, stream, pool)
+        return file_uuid
+    
+    async def save_stream_deduplicated(self, filename: str, stream: BinaryIO, pool: str = "") -> Tuple[str, bool]:
+        """
+        Guarda un PDF desde un stream salvo que ya exista uno con el mismo contenido en la pool
+        (el mismo CV puede estar en varias pools, p. ej. en dos ofertas de trabajo)
+        
+        Args:
+            filename: Nombre original del archivo
+            stream: Stream binario con el contenido del PDF
+            pool: Pool del CV ("" para la pool por defecto)
+            
+        Returns:
+            Tupla (UUID, es_duplicado). Si es duplicado, el UUID es el del archivo existente
+            
+        Raises:
+            FileTooLargeError: Si el contenido supera max_upload_bytes
+        """
+        file_uuid = str(uuid.uuid4())
+        tmp_path = self.cvs_dir / f".{file_uuid}.tmp"
         try:
-            # Generar UUID único
-            file_uuid = str(uuid.uuid4())
-            
-            # Guardar archivo como {uuid}.pdf
-            file_path = self.cvs_dir / f"{file_uuid}.pdf"
-            
-            # Leer contenido del archivo
-            content = await file.read()
-            
-            # Guardar archivo
-            with open(file_path, "wb") as buffer:
-                buffer.write(content)
-            
-            # Crear metadatos
-            metadata = {
-                "uuid": file_uuid,
-                "original_filename": file.filename,
-                "upload_date": datetime.utcnow().isoformat() + "Z",
-                "file_size": len(content),
-                "status": "uploaded",
-                "chunks_count": 0,
-                "pinecone_prefix": f"cv_{file_uuid}",
-                "processing_errors": [],
-                "last_accessed": datetime.utcnow().isoformat() + "Z"
-            }
+            def _copy() -> tuple:
+                digest = hashlib.sha256()
+                file_size = 0
+                with open(tmp_path, "wb") as buffer:
+                    while block := stream.read(self.upload_chunk_size):
+                        file_size += len(block)
+                        if file_size > self.max_upload_bytes:
+                            raise FileTooLargeError(
+                                f"El archivo supera el tamaño máximo de {self.max_upload_bytes // (1024 * 1024)} MB"
+                            )
+                        buffer.write(block)
+                        digest.update(block)
+                return file_size, digest.hexdigest()
             
-            # Guardar metadatos
-            await self._save_metadata(file_uuid, metadata)
+            # Copiar a un temporal por bloques (fuera del event loop) calculando el hash
+            # y comprobando el tamaño a medida que llegan los bytes; después se renombra
+            with tracer.span("upload_write"):
+                file_size, content_hash = await self.executor.run(_copy)
             
-            print(f"Archivo guardado: {file_uuid} ({file.filename})")
-            return file_uuid
+            # El lock cubre solo la comprobación: el hash queda reservado hasta registrar los metadatos
+            key = (pool, content_hash)
+            async with self._dedup_lock:
+                existing_uuid = self._pending_hashes.get(key) or await self.find_by_content_hash(content_hash, pool)
+                if not existing_uuid:
+                    self._pending_hashes[key] = file_uuid
+            if existing_uuid:
+                await self.executor.run(tmp_path.unlink)
+                print(f"Archivo duplicado: {filename} -> {existing_uuid}")
+                return existing_uuid, True
+            
+            try:
+                await self.executor.run(tmp_path.replace, self.cvs_dir / f"{file_uuid}.pdf")
+                metadata = self._build_metadata(file_uuid, filename, file_size, content_hash, pool)
+                await self._save_metadata(file_uuid, metadata)
+            finally:
+                del self._pending_hashes[key]
+            
+            print(f"Archivo guardado: {file_uuid} ({filename})")
+            return file_uuid, False
             
         except Exception as e:
-            print(f"Error al guardar archivo: {str(e)}")
+            def _cleanup() -> None:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            
+            await self.executor.run(_cleanup)
+            print(f"Error al guardar archivo {filename}: {str(e)}")
             raise
     
+    async def find_by_content_hash(self, content_hash: str, pool: str = "") -> Optional[str]:
+        """
+        Busca un archivo existente con el mismo contenido en la pool
+        
+        Args:
+            content_hash: Hash SHA-256 del PDF
+            pool: Pool en la que se busca
+            
+        Returns:
+            UUID del archivo existente o None
+        """
+        with tracer.span("metadata"):
+            return await self.executor.run(self.metadata_store.find_by_content_hash, content_hash, pool)
+    
+    def _build_metadata(
+        self, file_uuid: str, filename: str, file_size: int, content_hash: str, pool: str = ""
+    ) -> Dict[str, Any]:
+        """Crea los metadatos iniciales de un archivo recién guardado"""
+        return {
+            "uuid": file_uuid,
+            "pool": pool,
+            "original_filename": filename,
+            "upload_date": datetime.utcnow().isoformat() + "Z",
+            "file_size": file_size,
+            "content_hash": content_hash,
+            "status": "uploaded",
+            "chunks_count": 0,
+            "pinecone_prefix": f"cv_{file_uuid}",
+            "processing_errors": [],
+            "last_accessed": datetime.utcnow().isoformat() + "Z"
+        }
+    
     async def get_file_metadata(self, file_uuid: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene metadatos de un archivo
@@ -84,13 +207,8 @@ class FileManager:
             Dict con metadatos o None si no existe
         """
         try:
-            metadata_path = self.json_dir / f"{file_uuid}.json"
-            
-            if not metadata_path.exists():
-                return None
-            
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with tracer.span("metadata"):
+                return await self.executor.run(self.metadata_store.get, file_uuid)
                 
         except Exception as e:
             print(f"Error al leer metadatos de {file_uuid}: {str(e)}")
@@ -108,17 +226,11 @@ class FileManager:
             bool: True si se actualizó correctamente
         """
         try:
-            metadata = await self.get_file_metadata(file_uuid)
-            if not metadata:
-                return False
-            
-            # Actualizar campos
-            metadata.update(updates)
-            metadata["last_accessed"] = datetime.utcnow().isoformat() + "Z"
-            
-            # Guardar metadatos actualizados
-            await self._save_metadata(file_uuid, metadata)
-            return True
+            # Lectura y escritura en la misma transacción: sin pérdida de actualizaciones concurrentes
+            updates = {**updates, "last_accessed": datetime.utcnow().isoformat() + "Z"}
+            with tracer.span("metadata"):
+                metadata = await self.executor.run(self.metadata_store.update, file_uuid, updates)
+            return metadata is not None
             
         except Exception as e:
             print(f"Error al actualizar metadatos de {file_uuid}: {str(e)}")
@@ -135,15 +247,9 @@ class FileManager:
             bool: True si se eliminó correctamente
         """
         try:
-            # Eliminar archivo físico
-            file_path = self.cvs_dir / f"{file_uuid}.pdf"
-            if file_path.exists():
-                file_path.unlink()
-            
-            # Eliminar metadatos
-            metadata_path = self.json_dir / f"{file_uuid}.json"
-            if metadata_path.exists():
-                metadata_path.unlink()
+            # Eliminar metadatos (y el JSON anterior a la migración, si quedaba)
+            await self.executor.run(self.metadata_store.delete, file_uuid)
+            await self.executor.run(self._delete_files, file_uuid)
             
             print(f"Archivo eliminado: {file_uuid}")
             return True
@@ -152,35 +258,116 @@ class FileManager:
             print(f"Error al eliminar archivo {file_uuid}: {str(e)}")
             return False
     
-    async def list_processed_files(self) -> List[Dict[str, Any]]:
+    def _delete_files(self, file_uuid: str) -> None:
+        """Elimina el PDF, el perfil, el JSON antiguo y el texto extraído en caché de un archivo"""
+        file_path = self.cvs_dir / f"{file_uuid}.pdf"
+        if file_path.exists():
+            file_path.unlink()
+        self.profile_store.delete(file_uuid)
+        metadata_path = self.json_dir / f"{file_uuid}.json"
+        if metadata_path.exists():
+            metadata_path.unlink()
+        for cache_path in self.json_dir.glob(f"{file_uuid}.*.txt.gz"):
+            cache_path.unlink()
+    
+    async def delete_pool(self, pool: str) -> List[str]:
         """
-        Lista todos los archivos procesados con sus metadatos
+        Elimina todos los archivos de una pool: los metadatos en una sola sentencia y
+        después los PDFs, perfiles y textos en caché
         
+        Args:
+            pool: Pool a eliminar
+            
         Returns:
-            Lista de diccionarios con metadatos
+            Lista de UUIDs eliminados
         """
-        try:
-            files = []
-            
-            # Buscar todos los archivos JSON de metadatos
-            for json_file in self.json_dir.glob("*.json"):
+        file_uuids = await self.executor.run(self.metadata_store.delete_pool, pool)
+        
+        def _delete_all() -> None:
+            for file_uuid in file_uuids:
                 try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                        files.append(metadata)
+                    self._delete_files(file_uuid)
                 except Exception as e:
-                    print(f"Error al leer {json_file}: {str(e)}")
-                    continue
-            
-            # Ordenar por fecha de subida (más reciente primero)
-            files.sort(key=lambda x: x.get("upload_date", ""), reverse=True)
+                    print(f"Error al eliminar archivo {file_uuid}: {str(e)}")
+        
+        await self.executor.run(_delete_all)
+        print(f"Pool eliminada: {pool} ({len(file_uuids)} archivos)")
+        return file_uuids
+    
+    async def list_processed_files(self, status: Optional[str] = None, pool: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lista todos los archivos procesados con sus metadatos
+        
+        Args:
+            status: Filtrar por estado (uploaded, queued, processing, processed, error)
+            pool: Filtrar por pool (None: todas)
             
-            return files
+        Returns:
+            Lista de diccionarios con metadatos, ordenada por fecha de subida (más reciente primero)
+        """
+        try:
+            with tracer.span("metadata"):
+                return await self.executor.run(self.metadata_store.list, status, None, 0, pool)
             
         except Exception as e:
             print(f"Error al listar archivos: {str(e)}")
             return []
     
+    async def query_files(
+        self,
+        status: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_to: Optional[str] = None,
+        filename: Optional[str] = None,
+        sort: str = "upload_date",
+        descending: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        pool: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Lista una página de archivos filtrada y ordenada por un campo indexado
+        
+        Args:
+            status: Filtrar por estado
+            uploaded_from: Fecha de subida mínima (ISO, incluida)
+            uploaded_to: Fecha de subida máxima (ISO, excluida)
+            filename: Subcadena del nombre original
+            sort: Campo de ordenación (upload_date, original_filename, file_size, chunks_count, status)
+            descending: Orden descendente
+            limit: Tamaño de la página
+            cursor: Cursor opaco devuelto en la página anterior
+            pool: Filtrar por pool (None: todas)
+            
+        Returns:
+            Dict con files y next_cursor (None en la última página)
+            
+        Raises:
+            ValueError: Si el campo de ordenación o el cursor no son válidos
+        """
+        after = None
+        if cursor:
+            try:
+                decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+                if decoded["sort"] != sort or decoded["desc"] != descending:
+                    raise ValueError("el cursor corresponde a otra ordenación")
+                after = (decoded["value"], decoded["uuid"])
+            except Exception as e:
+                raise ValueError(f"Cursor no válido: {str(e)}")
+        
+        with tracer.span("metadata"):
+            files, next_key = await self.executor.run(
+                self.metadata_store.query,
+                status, uploaded_from, uploaded_to, filename, sort, descending, limit, after, pool
+            )
+        
+        next_cursor = None
+        if next_key:
+            payload = {"sort": sort, "desc": descending, "value": next_key[0], "uuid": next_key[1]}
+            next_cursor = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+        
+        return {"files": files, "next_cursor": next_cursor}
+    
     async def get_file_path(self, file_uuid: str) -> Optional[Path]:
         """
         Obtiene la ruta del archivo físico
@@ -205,21 +392,146 @@ class FileManager:
             bool: True si existe
         """
         file_path = self.cvs_dir / f"{file_uuid}.pdf"
-        metadata_path = self.json_dir / f"{file_uuid}.json"
-        return file_path.exists() and metadata_path.exists()
+        return file_path.exists() and await self.executor.run(self.metadata_store.exists, file_uuid)
+    
+    async def get_content_hash(self, file_uuid: str) -> Optional[str]:
+        """
+        Obtiene el hash SHA-256 del PDF (lo calcula y guarda si falta en los metadatos)
+        
+        Args:
+            file_uuid: UUID del archivo
+            
+        Returns:
+            str con el hash o None si el archivo no existe
+        """
+        metadata = await self.get_file_metadata(file_uuid)
+        if not metadata:
+            return None
+        if metadata.get("content_hash"):
+            return metadata["content_hash"]
+        
+        file_path = await self.get_file_path(file_uuid)
+        if not file_path:
+            return None
+        
+        def _hash() -> str:
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                while block := f.read(1024 * 1024):
+                    digest.update(block)
+            return digest.hexdigest()
+        
+        content_hash = await self.executor.run(_hash)
+        await self.update_file_metadata(file_uuid, {"content_hash": content_hash})
+        return content_hash
+    
+    def _text_cache_path(self, file_uuid: str, content_hash: str) -> Path:
+        """Ruta del texto extraído en json_dir, ligada al hash del PDF"""
+        return self.json_dir / f"{file_uuid}.{content_hash[:16]}.txt.gz"
+    
+    async def save_extracted_text(self, file_uuid: str, text: str) -> bool:
+        """
+        Guarda comprimido el texto extraído del PDF para no volver a parsearlo
+        
+        Args:
+            file_uuid: UUID del archivo
+            text: Texto extraído
+            
+        Returns:
+            bool: True si se guardó correctamente
+        """
+        try:
+            content_hash = await self.get_content_hash(file_uuid)
+            if not content_hash:
+                return False
+            
+            cache_path = self._text_cache_path(file_uuid, content_hash)
+            
+            def _write() -> None:
+                # Eliminar cachés de versiones anteriores del PDF
+                for stale_path in self.json_dir.glob(f"{file_uuid}.*.txt.gz"):
+                    if stale_path != cache_path:
+                        stale_path.unlink()
+                tmp_path = cache_path.with_suffix(".tmp")
+                tmp_path.write_bytes(gzip.compress(text.encode("utf-8"), compresslevel=6))
+                tmp_path.replace(cache_path)
+            
+            await self.executor.run(_write)
+            return True
+            
+        except Exception as e:
+            print(f"Error al guardar texto extraído de {file_uuid}: {str(e)}")
+            return False
+    
+    async def get_extracted_text(self, file_uuid: str) -> Optional[str]:
+        """
+        Obtiene el texto extraído en caché si corresponde al PDF actual
+        
+        Args:
+            file_uuid: UUID del archivo
+            
+        Returns:
+            str con el texto o None si no está en caché
+        """
+        try:
+            content_hash = await self.get_content_hash(file_uuid)
+            if not content_hash:
+                return None
+            
+            cache_path = self._text_cache_path(file_uuid, content_hash)
+            
+            def _read() -> Optional[str]:
+                if not cache_path.exists():
+                    return None
+                return gzip.decompress(cache_path.read_bytes()).decode("utf-8")
+            
+            # Lectura y descompresión fuera del event loop (como la escritura)
+            return await self.executor.run(_read)
+            
+        except Exception as e:
+            print(f"Error al leer texto extraído de {file_uuid}: {str(e)}")
+            return None
     
     async def _save_metadata(self, file_uuid: str, metadata: Dict[str, Any]) -> None:
         """
-        Guarda metadatos en archivo JSON
+        Guarda metadatos en el índice SQLite
         
         Args:
             file_uuid: UUID del archivo
             metadata: Diccionario con metadatos
         """
-        metadata_path = self.json_dir / f"{file_uuid}.json"
+        with tracer.span("metadata"):
+            await self.executor.run(self.metadata_store.put, {**metadata, "uuid": file_uuid})
+    
+    def get_corpus_version(self) -> int:
+        """
+        Versión del corpus: cambia con cada alta, baja o cambio de estado de un CV
+        
+        Returns:
+            int con la versión actual
+        """
+        return self.metadata_store.counter("corpus_version")
+    
+    def get_metadata_version(self) -> int:
+        """
+        Versión de los metadatos: cambia con cualquier modificación de cualquier archivo
+        
+        Returns:
+            int con la versión actual
+        """
+        return self.metadata_store.counter("metadata_version")
+    
+    def get_pool_stats(self, pool: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Estadísticas de cada pool ("" es la pool por defecto) desde los contadores por pool
         
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        Args:
+            pool: Solo esta pool (None: todas)
+            
+        Returns:
+            Dict pool -> {total_files, total_size_bytes, by_status}
+        """
+        return self.metadata_store.pool_stats(pool)
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -229,20 +541,17 @@ class FileManager:
             Dict con estadísticas
         """
         try:
-            # Contar archivos PDF
-            pdf_count = len(list(self.cvs_dir.glob("*.pdf")))
-            
-            # Contar metadatos
-            json_count = len(list(self.json_dir.glob("*.json")))
-            
-            # Calcular tamaño total
-            total_size = sum(f.stat().st_size for f in self.cvs_dir.glob("*.pdf"))
+            # Contadores mantenidos por triggers: no recorre directorios ni tablas
+            counters = self.metadata_store.stats()
+            total_size = counters["total_size_bytes"]
             
             return {
-                "total_files": pdf_count,
-                "metadata_files": json_count,
+                "total_files": counters["total_files"],
+                "metadata_files": counters["total_files"],
                 "total_size_bytes": total_size,
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
+                "by_status": counters["by_status"],
+                "corpus_version": counters["corpus_version"],
                 "cvs_directory": str(self.cvs_dir),
                 "json_directory": str(self.json_dir)
             }
@@ -256,3 +565,8 @@ class FileManager:
                 "total_size_mb": 0,
                 "error": str(e)
             }
+    
+    def close(self) -> None:
+        """Cierra las conexiones de los metadatos y de los perfiles (se reabren si se vuelven a usar)"""
+        self.metadata_store.close()
+        self.profile_store.close()
@@ -0,0 +1,302 @@
+"""
+Cola persistente de ingesta de CVs
+Las subidas se encolan en SQLite y un pool de workers las procesa en segundo plano
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.executor import BlockingExecutor
+from services.tracing import tracer
+
+
+class IngestionQueue:
+    """Cola de ingesta persistente con workers asíncronos y reintentos"""
+
+    def __init__(
+        self,
+        rag_pipeline: Any,
+        file_manager: Any,
+        db_path: Optional[Path] = None,
+        workers: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        executor: Optional[BlockingExecutor] = None
+    ):
+        """
+        Args:
+            rag_pipeline: Pipeline RAG que procesa los PDFs
+            file_manager: FileManager donde se refleja el estado de cada archivo
+            db_path: Ruta de la base de datos SQLite de la cola
+            workers: Número de workers concurrentes (INGESTION_WORKERS)
+            max_retries: Intentos máximos por archivo (INGESTION_MAX_RETRIES)
+            retry_delay: Espera base en segundos entre reintentos (INGESTION_RETRY_DELAY)
+            batch_size: Archivos que reserva cada worker a la vez (INGESTION_BATCH_SIZE)
+            executor: Pool de hilos para las operaciones sobre SQLite (el compartido de la aplicación)
+        """
+        project_root = Path(__file__).parent.parent.parent
+        self.db_path = Path(db_path) if db_path else project_root / "data" / "ingestion_queue.db"
+        self.rag_pipeline = rag_pipeline
+        self.file_manager = file_manager
+        self.workers = workers or int(os.getenv("INGESTION_WORKERS", "4"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("INGESTION_MAX_RETRIES", "3"))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv("INGESTION_RETRY_DELAY", "2.0"))
+        self.batch_size = batch_size or int(os.getenv("INGESTION_BATCH_SIZE", "16"))
+        self.poll_interval = 1.0
+        self.executor = executor or BlockingExecutor()
+
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la base de datos de la cola y crea el esquema si no existe"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                uuid TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)")
+        return conn
+
+    async def start(self) -> None:
+        """Recupera trabajos interrumpidos y arranca los workers"""
+        recovered = await self.executor.run(self._requeue_interrupted)
+        if recovered:
+            print(f"Cola de ingesta: {recovered} trabajos interrumpidos reencolados")
+
+        for worker_id in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(worker_id)))
+        self._wakeup.set()
+        print(f"Cola de ingesta iniciada con {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Detiene los workers y cierra la base de datos"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._lock:
+            self._conn.close()
+
+    async def enqueue(self, file_uuid: str) -> None:
+        """
+        Encola un archivo para su procesamiento
+
+        Args:
+            file_uuid: UUID del archivo ya guardado por FileManager
+        """
+        await self.enqueue_many([file_uuid])
+
+    async def enqueue_many(self, file_uuids: List[str]) -> None:
+        """
+        Encola varios archivos en una sola transacción
+
+        Args:
+            file_uuids: UUIDs de archivos ya guardados por FileManager
+        """
+        await self.executor.run(self._insert_jobs, file_uuids)
+        for file_uuid in file_uuids:
+            await self.file_manager.update_file_metadata(file_uuid, {
+                "status": "queued",
+                "processing_errors": []
+            })
+        self._wakeup.set()
+
+    async def cancel(self, file_uuid: str) -> None:
+        """
+        Elimina un archivo de la cola (por ejemplo, al borrarlo)
+
+        Args:
+            file_uuid: UUID del archivo
+        """
+        await self.executor.run(self._execute, "DELETE FROM jobs WHERE uuid = ?", (file_uuid,))
+
+    async def get_job(self, file_uuid: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el estado de un trabajo de ingesta
+
+        Args:
+            file_uuid: UUID del archivo
+
+        Returns:
+            Dict con el estado del trabajo o None si no existe
+        """
+        def _select() -> Optional[sqlite3.Row]:
+            with self._lock:
+                return self._conn.execute("SELECT * FROM jobs WHERE uuid = ?", (file_uuid,)).fetchone()
+
+        row = await self.executor.run(_select)
+        return dict(row) if row else None
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    def _insert_jobs(self, file_uuids: List[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO jobs (uuid, status, attempts, last_error, available_at, created_at, updated_at)
+                    VALUES (?, 'queued', 0, NULL, ?, ?, ?)
+                    """,
+                    [(file_uuid, now, now, now) for file_uuid in file_uuids]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _requeue_interrupted(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', available_at = ?, updated_at = ? WHERE status = 'processing'",
+                (time.time(), time.time())
+            )
+            return cursor.rowcount
+
+    def _claim_batch(self, limit: int) -> List[Dict[str, Any]]:
+        """Reserva atómicamente hasta `limit` trabajos disponibles"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE status = 'queued' AND available_at <= ?
+                    ORDER BY created_at
+                    LIMIT ?
+                    """,
+                    (now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'processing', attempts = attempts + 1, updated_at = ? WHERE uuid = ?",
+                    [(now, row["uuid"]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        jobs = [dict(row) for row in rows]
+        for job in jobs:
+            job["attempts"] += 1
+        return jobs
+
+    async def _worker(self, worker_id: int) -> None:
+        """Bucle de un worker: reserva trabajos y los procesa hasta ser cancelado"""
+        while True:
+            try:
+                jobs = await self.executor.run(self._claim_batch, self.batch_size)
+                if not jobs:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._process_batch(jobs)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error en worker de ingesta {worker_id}: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _process_batch(self, jobs: List[Dict[str, Any]]) -> None:
+        """Procesa un lote de trabajos con una sola llamada de ingesta agrupada"""
+        files = []
+        claimed = []
+        for job in jobs:
+            try:
+                file_path = await self.file_manager.get_file_path(job["uuid"])
+                if not file_path:
+                    # El archivo se eliminó mientras estaba en cola
+                    await self.cancel(job["uuid"])
+                    continue
+                metadata = await self.file_manager.get_file_metadata(job["uuid"]) or {}
+                # La pool se recuerda por si el archivo se elimina durante el procesamiento
+                job["pool"] = metadata.get("pool", "")
+                await self.file_manager.update_file_metadata(job["uuid"], {"status": "processing"})
+                files.append((job["uuid"], str(file_path)))
+            except Exception as e:
+                print(f"Error al preparar {job['uuid']} para la ingesta: {str(e)}")
+            claimed.append(job)
+
+        results: Dict[str, int] = {}
+        if files:
+            try:
+                with tracer.span("ingest_batch"):
+                    results = await self.rag_pipeline.process_pdfs_bulk(files)
+            except Exception as e:
+                # Todo el lote pasa por la ruta de reintentos en lugar de quedarse en 'processing'
+                print(f"Error en lote de ingesta: {str(e)}")
+
+        # Los trabajos sin resultado cuentan como fallidos (reintento con espera o error)
+        for job in claimed:
+            await self._finish(job, results.get(job["uuid"], 0))
+
+    async def _finish(self, job: Dict[str, Any], chunks_count: int) -> None:
+        """Avanza el estado de un trabajo en la cola y en los metadatos"""
+        file_uuid = job["uuid"]
+
+        if chunks_count > 0 and not await self.file_manager.file_exists(file_uuid):
+            # Eliminado durante el procesamiento: no dejar vectores huérfanos
+            await self.rag_pipeline.delete_by_uuid(file_uuid, chunks_count, job.get("pool", ""))
+            await self.cancel(file_uuid)
+            return
+
+        if chunks_count > 0:
+            await self.executor.run(
+                self._execute,
+                "UPDATE jobs SET status = 'processed', last_error = NULL, updated_at = ? WHERE uuid = ?",
+                (time.time(), file_uuid)
+            )
+            await self.file_manager.update_file_metadata(file_uuid, {
+                "status": "processed",
+                "chunks_count": chunks_count,
+                "processing_errors": []
+            })
+            return
+
+        error = "Error en procesamiento RAG"
+        if job["attempts"] < self.max_retries:
+            # Reintento con espera exponencial
+            delay = self.retry_delay * (2 ** (job["attempts"] - 1))
+            await self.executor.run(
+                self._execute,
+                "UPDATE jobs SET status = 'queued', last_error = ?, available_at = ?, updated_at = ? WHERE uuid = ?",
+                (error, time.time() + delay, time.time(), file_uuid)
+            )
+            await self.file_manager.update_file_metadata(file_uuid, {"status": "queued"})
+            print(f"Reintentando {file_uuid} en {delay:.1f}s (intento {job['attempts']}/{self.max_retries})")
+        else:
+            await self.executor.run(
+                self._execute,
+                "UPDATE jobs SET status = 'error', last_error = ?, updated_at = ? WHERE uuid = ?",
+                (error, time.time(), file_uuid)
+            )
+            await self.file_manager.update_file_metadata(file_uuid, {
+                "status": "error",
+                "processing_errors": [error]
+            })
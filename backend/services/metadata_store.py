@@ -0,0 +1,436 @@
+"""
+Índice de metadatos de CVs en SQLite
+Sustituye a los archivos data/json/{uuid}.json: una tabla indexada por estado,
+fecha de subida y hash del contenido, con contadores agregados mantenidos por
+triggers y una migración única desde los JSON existentes.
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Columnas indexables; el resto de campos se guardan en el JSON de la columna data
+COLUMNS = ("uuid", "original_filename", "upload_date", "file_size", "content_hash", "status", "chunks_count", "pool")
+
+# Campos indexados por los que se puede ordenar el listado
+SORT_FIELDS = ("upload_date", "original_filename", "file_size", "chunks_count", "status")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    uuid TEXT PRIMARY KEY,
+    original_filename TEXT NOT NULL DEFAULT '',
+    upload_date TEXT NOT NULL DEFAULT '',
+    file_size INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    status TEXT NOT NULL DEFAULT 'uploaded',
+    chunks_count INTEGER NOT NULL DEFAULT 0,
+    pool TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_status_date ON files (status, upload_date);
+CREATE INDEX IF NOT EXISTS idx_files_upload_date ON files (upload_date);
+CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files (content_hash);
+CREATE INDEX IF NOT EXISTS idx_files_filename ON files (original_filename, uuid);
+CREATE INDEX IF NOT EXISTS idx_files_size ON files (file_size, uuid);
+CREATE INDEX IF NOT EXISTS idx_files_chunks ON files (chunks_count, uuid);
+
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO counters (name, value) VALUES
+    ('total_files', 0), ('total_size_bytes', 0), ('corpus_version', 0), ('metadata_version', 0);
+CREATE TABLE IF NOT EXISTS status_counts (status TEXT PRIMARY KEY, count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS pool_counts (
+    pool TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (pool, status)
+);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+
+CREATE TRIGGER IF NOT EXISTS files_after_insert AFTER INSERT ON files BEGIN
+    UPDATE counters SET value = value + 1 WHERE name IN ('total_files', 'corpus_version', 'metadata_version');
+    UPDATE counters SET value = value + NEW.file_size WHERE name = 'total_size_bytes';
+    INSERT INTO status_counts (status, count) VALUES (NEW.status, 1)
+        ON CONFLICT (status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_after_delete AFTER DELETE ON files BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'total_files';
+    UPDATE counters SET value = value + 1 WHERE name IN ('corpus_version', 'metadata_version');
+    UPDATE counters SET value = value - OLD.file_size WHERE name = 'total_size_bytes';
+    UPDATE status_counts SET count = count - 1 WHERE status = OLD.status;
+END;
+
+-- El índice por pool y los contadores por pool (tabla pool_counts y sus triggers) se
+-- crean en _migrate_pool: las tablas anteriores a las pools no tienen la columna
+
+CREATE TRIGGER IF NOT EXISTS files_after_update AFTER UPDATE OF status, chunks_count, file_size ON files
+WHEN OLD.status IS NOT NEW.status OR OLD.chunks_count IS NOT NEW.chunks_count OR OLD.file_size IS NOT NEW.file_size
+BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'corpus_version';
+    UPDATE counters SET value = value + NEW.file_size - OLD.file_size WHERE name = 'total_size_bytes';
+    UPDATE status_counts SET count = count - 1 WHERE status = OLD.status;
+    INSERT INTO status_counts (status, count) VALUES (NEW.status, 1)
+        ON CONFLICT (status) DO UPDATE SET count = count + 1;
+END;
+
+-- Cualquier cambio en una fila invalida los ETag del listado
+CREATE TRIGGER IF NOT EXISTS files_after_any_update AFTER UPDATE ON files BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'metadata_version';
+END;
+"""
+
+
+# Triggers de los contadores por pool y estado (requieren la columna pool)
+POOL_COUNT_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS files_pool_counts_insert AFTER INSERT ON files BEGIN
+        INSERT INTO pool_counts (pool, status, count, size) VALUES (NEW.pool, NEW.status, 1, NEW.file_size)
+            ON CONFLICT (pool, status) DO UPDATE SET count = count + 1, size = size + NEW.file_size;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS files_pool_counts_delete AFTER DELETE ON files BEGIN
+        UPDATE pool_counts SET count = count - 1, size = size - OLD.file_size
+            WHERE pool = OLD.pool AND status = OLD.status;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS files_pool_counts_update AFTER UPDATE OF status, file_size, pool ON files
+    WHEN OLD.status IS NOT NEW.status OR OLD.file_size IS NOT NEW.file_size OR OLD.pool IS NOT NEW.pool
+    BEGIN
+        UPDATE pool_counts SET count = count - 1, size = size - OLD.file_size
+            WHERE pool = OLD.pool AND status = OLD.status;
+        INSERT INTO pool_counts (pool, status, count, size) VALUES (NEW.pool, NEW.status, 1, NEW.file_size)
+            ON CONFLICT (pool, status) DO UPDATE SET count = count + 1, size = size + NEW.file_size;
+    END
+    """,
+)
+
+
+class MetadataStore:
+    """Metadatos de archivos en una tabla SQLite (WAL) con actualizaciones atómicas"""
+
+    def __init__(self, db_path: Path, json_dir: Optional[Path] = None):
+        """
+        Args:
+            db_path: Ruta de la base de datos
+            json_dir: Directorio de los JSON antiguos a migrar en el primer uso
+        """
+        self.db_path = Path(db_path)
+        self.json_dir = Path(json_dir) if json_dir else None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abre la base de datos en el primer uso (llamar con el lock adquirido)"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._migrate_pool()
+            self._migrate_json()
+        return self._conn
+
+    def _migrate_pool(self) -> None:
+        """
+        Añade la columna pool a las tablas creadas antes de las pools (CVs en la pool por defecto)
+        y crea los contadores por pool y estado, calculados una sola vez desde la tabla
+        """
+        conn = self._conn
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+        if "pool" not in columns:
+            conn.execute("ALTER TABLE files ADD COLUMN pool TEXT NOT NULL DEFAULT ''")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_files_pool_status_date ON files (pool, status, upload_date)")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in POOL_COUNT_TRIGGERS:
+                conn.execute(statement)
+            if not conn.execute("SELECT 1 FROM settings WHERE key = 'pool_counts_built'").fetchone():
+                conn.execute("DELETE FROM pool_counts")
+                conn.execute(
+                    "INSERT INTO pool_counts (pool, status, count, size) "
+                    "SELECT pool, status, COUNT(*), COALESCE(SUM(file_size), 0) FROM files GROUP BY pool, status"
+                )
+                conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('pool_counts_built', '1')")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _migrate_json(self) -> None:
+        """Importa una sola vez los metadatos de los archivos JSON antiguos"""
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM settings WHERE key = 'json_migrated'").fetchone():
+            return
+
+        rows = []
+        if self.json_dir and self.json_dir.exists():
+            for json_file in self.json_dir.glob("*.json"):
+                try:
+                    with open(json_file, "r", encoding="utf-8") as f:
+                        rows.append(self._row(json.load(f)))
+                except Exception as e:
+                    print(f"Error al migrar {json_file}: {str(e)}")
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(self._insert_sql("INSERT OR IGNORE"), rows)
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('json_migrated', '1')")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if rows:
+            print(f"Migrados {len(rows)} metadatos JSON a {self.db_path.name}")
+
+    @staticmethod
+    def _insert_sql(verb: str) -> str:
+        columns = ", ".join(COLUMNS + ("data",))
+        placeholders = ", ".join("?" * (len(COLUMNS) + 1))
+        return f"{verb} INTO files ({columns}) VALUES ({placeholders})"
+
+    @staticmethod
+    def _row(metadata: Dict[str, Any]) -> tuple:
+        """Fila de la tabla a partir del diccionario de metadatos"""
+        return (
+            metadata["uuid"],
+            metadata.get("original_filename") or "",
+            metadata.get("upload_date") or "",
+            metadata.get("file_size") or 0,
+            metadata.get("content_hash"),
+            metadata.get("status") or "uploaded",
+            metadata.get("chunks_count") or 0,
+            metadata.get("pool") or "",
+            json.dumps(metadata, ensure_ascii=False)
+        )
+
+    def get(self, file_uuid: str) -> Optional[Dict[str, Any]]:
+        """Metadatos de un archivo o None si no existe"""
+        with self._lock:
+            row = self._connection().execute("SELECT data FROM files WHERE uuid = ?", (file_uuid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def exists(self, file_uuid: str) -> bool:
+        with self._lock:
+            return self._connection().execute("SELECT 1 FROM files WHERE uuid = ?", (file_uuid,)).fetchone() is not None
+
+    def put(self, metadata: Dict[str, Any]) -> None:
+        """Inserta o reemplaza los metadatos de un archivo"""
+        with self._lock:
+            # Upsert (no REPLACE) para que los triggers de contadores vean un UPDATE
+            self._connection().execute(
+                self._insert_sql("INSERT") + " ON CONFLICT (uuid) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:] + ("data",)),
+                self._row(metadata)
+            )
+
+    def update(self, file_uuid: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Actualiza campos de forma atómica (lectura y escritura en la misma transacción)
+
+        Args:
+            file_uuid: UUID del archivo
+            updates: Campos a actualizar
+
+        Returns:
+            Metadatos actualizados o None si el archivo no existe
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM files WHERE uuid = ?", (file_uuid,)).fetchone()
+                if not row:
+                    conn.execute("ROLLBACK")
+                    return None
+                metadata = json.loads(row[0])
+                metadata.update(updates)
+                values = self._row(metadata)
+                conn.execute(
+                    "UPDATE files SET original_filename = ?, upload_date = ?, file_size = ?, content_hash = ?, "
+                    "status = ?, chunks_count = ?, pool = ?, data = ? WHERE uuid = ?",
+                    values[1:] + (file_uuid,)
+                )
+                conn.execute("COMMIT")
+                return metadata
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, file_uuid: str) -> bool:
+        """Elimina los metadatos de un archivo (True si existían)"""
+        with self._lock:
+            return self._connection().execute("DELETE FROM files WHERE uuid = ?", (file_uuid,)).rowcount > 0
+
+    def delete_pool(self, pool: str) -> List[str]:
+        """
+        Elimina los metadatos de todos los archivos de una pool
+
+        Returns:
+            Lista de UUIDs eliminados
+        """
+        with self._lock:
+            rows = self._connection().execute("DELETE FROM files WHERE pool = ? RETURNING uuid", (pool,)).fetchall()
+        return [row[0] for row in rows]
+
+    def find_by_content_hash(self, content_hash: str, pool: str = "") -> Optional[str]:
+        """UUID del archivo con ese hash de contenido en la pool o None"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT uuid FROM files WHERE content_hash = ? AND pool = ? LIMIT 1", (content_hash, pool)
+            ).fetchone()
+        return row[0] if row else None
+
+    def list(
+        self,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        pool: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Lista metadatos ordenados por fecha de subida (más reciente primero)
+
+        Args:
+            status: Filtrar por estado
+            limit: Número máximo de resultados
+            offset: Resultados a saltar
+            pool: Filtrar por pool (None: todas)
+        """
+        conditions = []
+        params = []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if pool is not None:
+            conditions.append("pool = ?")
+            params.append(pool)
+        sql = "SELECT data FROM files"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY upload_date DESC, uuid LIMIT ? OFFSET ?"
+        params += [limit if limit is not None else -1, offset]
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_to: Optional[str] = None,
+        filename: Optional[str] = None,
+        sort: str = "upload_date",
+        descending: bool = True,
+        limit: int = 100,
+        after: Optional[Tuple[Any, str]] = None,
+        pool: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, str]]]:
+        """
+        Página de metadatos con paginación por cursor (keyset) sobre un campo indexado
+
+        Args:
+            status: Filtrar por estado
+            uploaded_from: Fecha de subida mínima (ISO, incluida)
+            uploaded_to: Fecha de subida máxima (ISO, excluida)
+            filename: Subcadena del nombre original (sin distinguir mayúsculas)
+            sort: Campo de ordenación (uno de SORT_FIELDS)
+            descending: Orden descendente
+            limit: Tamaño de la página
+            after: Clave (valor del campo, uuid) del último elemento de la página anterior
+            pool: Filtrar por pool (None: todas)
+
+        Returns:
+            Tupla (metadatos de la página, clave para la página siguiente o None)
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Campo de ordenación no válido: {sort}")
+
+        conditions = []
+        params = []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if pool is not None:
+            conditions.append("pool = ?")
+            params.append(pool)
+        if uploaded_from:
+            conditions.append("upload_date >= ?")
+            params.append(uploaded_from)
+        if uploaded_to:
+            conditions.append("upload_date < ?")
+            params.append(uploaded_to)
+        if filename:
+            escaped = filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("original_filename LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if after is not None:
+            conditions.append(f"({sort}, uuid) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+
+        direction = "DESC" if descending else "ASC"
+        sql = f"SELECT {sort}, uuid, data FROM files"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {sort} {direction}, uuid {direction} LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+
+        next_key = (rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+        return [json.loads(data) for _, _, data in rows[:limit]], next_key
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores agregados (sin recorrer la tabla)"""
+        with self._lock:
+            conn = self._connection()
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+            by_status = dict(conn.execute("SELECT status, count FROM status_counts WHERE count > 0"))
+        return {**counters, "by_status": by_status}
+
+    def pool_stats(self, pool: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Archivos, tamaño y estados de cada pool desde los contadores por pool (sin recorrer la tabla)
+
+        Args:
+            pool: Solo esta pool (None: todas)
+
+        Returns:
+            Dict pool -> {total_files, total_size_bytes, by_status}
+        """
+        sql = "SELECT pool, status, count, size FROM pool_counts WHERE count > 0"
+        params: Tuple[Any, ...] = ()
+        if pool is not None:
+            sql += " AND pool = ?"
+            params = (pool,)
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        pools: Dict[str, Dict[str, Any]] = {}
+        for pool, status, count, size in rows:
+            stats = pools.setdefault(pool, {"total_files": 0, "total_size_bytes": 0, "by_status": {}})
+            stats["total_files"] += count
+            stats["total_size_bytes"] += size or 0
+            stats["by_status"][status] = count
+        return pools
+
+    def counter(self, name: str) -> int:
+        """
+        Valor de un contador agregado: corpus_version cambia con cada alta, baja o
+        cambio de estado/chunks de un archivo; metadata_version con cualquier cambio
+        """
+        with self._lock:
+            return self._connection().execute(
+                "SELECT value FROM counters WHERE name = ?", (name,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
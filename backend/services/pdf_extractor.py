@@ -0,0 +1,133 @@
+"""
+Extracción de texto de PDFs en un pool de procesos
+Las páginas se extraen por rangos en paralelo y se entregan en orden como un
+generador asíncrono, para que el chunking empiece antes de terminar el documento
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+import pypdf
+
+
+class PdfExtractionError(Exception):
+    """Error al extraer texto de un PDF (timeout, límite de páginas, PDF inválido)"""
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> Tuple[int, List[str]]:
+    """
+    Extrae el texto de las páginas [start, stop) de un PDF (se ejecuta en un proceso del pool)
+
+    Returns:
+        Tupla (número total de páginas, textos de las páginas del rango)
+    """
+    with open(file_path, "rb") as file:
+        reader = pypdf.PdfReader(file)
+        page_count = len(reader.pages)
+        pages = [reader.pages[i].extract_text() or "" for i in range(start, min(stop, page_count))]
+    return page_count, pages
+
+
+class PdfExtractor:
+    """Motor de extracción de texto de PDFs con límites por archivo"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_pages: Optional[int] = None,
+        pages_per_task: Optional[int] = None
+    ):
+        """
+        Args:
+            max_workers: Procesos del pool (PDF_MAX_WORKERS, por defecto un proceso por núcleo)
+            timeout: Tiempo máximo de extracción por archivo en segundos (PDF_EXTRACTION_TIMEOUT)
+            max_pages: Número máximo de páginas por archivo (PDF_MAX_PAGES)
+            pages_per_task: Páginas por tarea enviada al pool (PDF_PAGES_PER_TASK)
+        """
+        self.max_workers = max_workers or int(os.getenv("PDF_MAX_WORKERS", "0")) or os.cpu_count() or 1
+        self.timeout = timeout or float(os.getenv("PDF_EXTRACTION_TIMEOUT", "60"))
+        self.max_pages = max_pages or int(os.getenv("PDF_MAX_PAGES", "200"))
+        self.pages_per_task = pages_per_task or int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+        self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Crea el pool de procesos la primera vez que se necesita"""
+        if self._pool is None:
+            # spawn: los workers no heredan los hilos del proceso del servidor
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def iter_pages(self, file_path: str) -> AsyncIterator[str]:
+        """
+        Genera el texto de cada página en orden a medida que se extrae
+
+        Args:
+            file_path: Ruta del archivo PDF
+
+        Raises:
+            PdfExtractionError: Si se supera el timeout o el límite de páginas
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        pool = self._get_pool()
+        pending = []
+
+        async def _await(future: asyncio.Future) -> Tuple[int, List[str]]:
+            remaining = deadline - loop.time()
+            try:
+                return await asyncio.wait_for(future, timeout=max(remaining, 0))
+            except asyncio.TimeoutError:
+                raise PdfExtractionError(f"Timeout de {self.timeout:.0f}s extrayendo {file_path}")
+
+        try:
+            # El primer rango también devuelve el número total de páginas
+            first = loop.run_in_executor(pool, _extract_page_range, file_path, 0, self.pages_per_task)
+            page_count, pages = await _await(first)
+
+            if page_count > self.max_pages:
+                raise PdfExtractionError(
+                    f"El PDF tiene {page_count} páginas (máximo {self.max_pages}): {file_path}"
+                )
+
+            # Lanzar el resto de rangos en paralelo antes de entregar la primera página
+            pending = [
+                loop.run_in_executor(pool, _extract_page_range, file_path, start, start + self.pages_per_task)
+                for start in range(self.pages_per_task, page_count, self.pages_per_task)
+            ]
+
+            for page in pages:
+                yield page
+
+            for future in pending:
+                _, pages = await _await(future)
+                for page in pages:
+                    yield page
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def extract_text(self, file_path: str) -> str:
+        """
+        Extrae el texto completo de un PDF
+
+        Args:
+            file_path: Ruta del archivo PDF
+
+        Returns:
+            str: Texto extraído
+        """
+        pages = [page async for page in self.iter_pages(file_path)]
+        return "\n".join(pages).strip()
+
+    def shutdown(self) -> None:
+        """Cierra el pool de procesos"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,49 @@
+"""
+Pools de CVs (una oferta de trabajo o un cliente)
+Cada pool es una partición independiente: sus CVs se guardan con el campo pool en
+los metadatos, sus vectores en un namespace propio de Pinecone (o en un vector store
+local propio) y el chat y el ranking solo buscan dentro de ella. La pool por defecto
+("") es el corpus original, sin namespace.
+"""
+import re
+from typing import Optional
+
+DEFAULT_POOL = ""
+
+# Identificadores de pool: minúsculas, dígitos, guiones y guiones bajos
+POOL_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+def normalize_pool(pool: Optional[str]) -> str:
+    """
+    Identificador canónico de una pool
+
+    Args:
+        pool: Identificador recibido (None, "" o "default" son la pool por defecto)
+
+    Returns:
+        str: Identificador de la pool ("" para la pool por defecto)
+
+    Raises:
+        ValueError: Si el identificador no es válido
+    """
+    pool = (pool or "").strip().lower()
+    if pool in ("", "default"):
+        return DEFAULT_POOL
+    if not POOL_PATTERN.match(pool):
+        raise ValueError(f"Identificador de pool no válido: {pool} (usa minúsculas, dígitos, '-' o '_')")
+    return pool
+
+
+def pool_namespace(pool: str) -> Optional[str]:
+    """Namespace de Pinecone de una pool (None para la pool por defecto)"""
+    return f"pool-{pool}" if pool else None
+
+
+def namespace_pool(namespace: str) -> Optional[str]:
+    """Pool de un namespace de Pinecone ("" para el namespace por defecto, None si no es de una pool)"""
+    if not namespace:
+        return DEFAULT_POOL
+    if namespace.startswith("pool-"):
+        return namespace[len("pool-"):]
+    return None
@@ -0,0 +1,189 @@
+"""
+Extracción de un perfil estructurado del texto de un CV
+Reglas y vocabularios (sin LLM): tecnologías, años de experiencia, idiomas,
+ubicación y nivel de estudios. Se ejecuta una vez por CV durante la ingesta.
+"""
+import re
+import unicodedata
+from datetime import date
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+# Término canónico -> expresiones regulares sobre el texto en minúsculas y sin acentos
+SKILLS = {
+    "python": [r"python"],
+    "java": [r"java(?!\s*script)"],
+    "javascript": [r"javascript", r"\bjs\b"],
+    "typescript": [r"typescript", r"\bts\b"],
+    "c++": [r"c\+\+"],
+    "c#": [r"c#", r"\.net\b"],
+    "go": [r"golang", r"\bgo\s+(?:lang|developer)\b"],
+    "rust": [r"\brust\b"],
+    "php": [r"\bphp\b"],
+    "ruby": [r"\bruby\b"],
+    "kotlin": [r"\bkotlin\b"],
+    "swift": [r"\bswift\b"],
+    "scala": [r"\bscala\b"],
+    "sql": [r"\bsql\b"],
+    "postgresql": [r"postgres(?:ql)?"],
+    "mysql": [r"mysql"],
+    "mongodb": [r"mongo(?:db)?"],
+    "redis": [r"\bredis\b"],
+    "react": [r"\breact(?:\.?js)?\b"],
+    "angular": [r"\bangular\b"],
+    "vue": [r"\bvue(?:\.?js)?\b"],
+    "node.js": [r"\bnode(?:\.?js)?\b"],
+    "django": [r"django"],
+    "flask": [r"\bflask\b"],
+    "fastapi": [r"fastapi"],
+    "spring": [r"\bspring(?:\s*boot)?\b"],
+    "aws": [r"\baws\b", r"amazon web services"],
+    "azure": [r"\bazure\b"],
+    "gcp": [r"\bgcp\b", r"google cloud"],
+    "docker": [r"docker"],
+    "kubernetes": [r"kubernetes", r"\bk8s\b"],
+    "terraform": [r"terraform"],
+    "git": [r"\bgit\b", r"github", r"gitlab"],
+    "linux": [r"\blinux\b"],
+    "machine learning": [r"machine learning", r"aprendizaje automatico"],
+    "tensorflow": [r"tensorflow"],
+    "pytorch": [r"pytorch"],
+    "pandas": [r"\bpandas\b"],
+    "spark": [r"\bspark\b"],
+    "kafka": [r"\bkafka\b"],
+    "html": [r"\bhtml5?\b"],
+    "css": [r"\bcss3?\b"],
+    "power bi": [r"power\s*bi"],
+    "tableau": [r"tableau"],
+    "excel": [r"\bexcel\b"],
+    "figma": [r"\bfigma\b"],
+    "scrum": [r"\bscrum\b", r"\bagile\b", r"metodologias? agiles?"],
+}
+
+LANGUAGES = {
+    "español": [r"espanol", r"castellano", r"spanish"],
+    "inglés": [r"ingles", r"english"],
+    "francés": [r"frances", r"french"],
+    "alemán": [r"aleman", r"german"],
+    "italiano": [r"italiano", r"italian"],
+    "portugués": [r"portugues", r"portuguese"],
+    "catalán": [r"catalan", r"catala"],
+    "chino": [r"\bchino\b", r"chinese", r"mandarin"],
+}
+
+LOCATIONS = {
+    "Madrid": [r"\bmadrid\b"],
+    "Barcelona": [r"\bbarcelona\b"],
+    "Valencia": [r"\bvalencia\b"],
+    "Sevilla": [r"\bsevilla\b", r"\bseville\b"],
+    "Bilbao": [r"\bbilbao\b"],
+    "Málaga": [r"\bmalaga\b"],
+    "Zaragoza": [r"\bzaragoza\b"],
+    "Alicante": [r"\balicante\b"],
+    "Murcia": [r"\bmurcia\b"],
+    "Valladolid": [r"\bvalladolid\b"],
+    "Vigo": [r"\bvigo\b"],
+    "A Coruña": [r"\b(?:a )?coruna\b"],
+    "Granada": [r"\bgranada\b"],
+    "Palma": [r"\bpalma de mallorca\b", r"\bmallorca\b"],
+    "Las Palmas": [r"\blas palmas\b"],
+    "San Sebastián": [r"\bsan sebastian\b", r"\bdonostia\b"],
+    "Santander": [r"\bsantander\b"],
+    "Pamplona": [r"\bpamplona\b"],
+    "Oviedo": [r"\boviedo\b"],
+    "Salamanca": [r"\bsalamanca\b"],
+    "Lisboa": [r"\blisboa\b", r"\blisbon\b"],
+    "Londres": [r"\blondres\b", r"\blondon\b"],
+    "París": [r"\bparis\b"],
+    "Berlín": [r"\berlin\b"],
+    "Ciudad de México": [r"ciudad de mexico", r"\bcdmx\b", r"mexico city"],
+    "Bogotá": [r"\bbogota\b"],
+    "Medellín": [r"\bmedellin\b"],
+    "Buenos Aires": [r"\bbuenos aires\b"],
+    "Lima": [r"\blima\b"],
+    "Santiago de Chile": [r"\bsantiago de chile\b"],
+    "Montevideo": [r"\bmontevideo\b"],
+    "Quito": [r"\bquito\b"],
+}
+
+# De mayor a menor nivel: se guarda el más alto encontrado
+EDUCATION = {
+    "doctorado": [r"doctorado", r"\bph\.?\s?d\b"],
+    "máster": [r"\bmaster\b", r"\bmsc\b", r"\bmba\b"],
+    "grado": [r"\bgrado en\b", r"licenciad[oa]", r"licenciatura", r"ingenieri?[ao]", r"\bbachelor\b", r"\bdegree\b"],
+    "fp": [r"formacion profesional", r"ciclo (?:formativo|superior)", r"tecnico superior", r"\bfp\b"],
+}
+
+YEARS_PATTERNS = [
+    re.compile(r"(\d{1,2})\s*\+?\s*(?:anos|years)\s+(?:de\s+|of\s+)?(?:experiencia|experience)"),
+    re.compile(r"(?:experiencia|experience)\s+(?:de\s+|of\s+)?(?:mas de\s+|over\s+)?(\d{1,2})\s*\+?\s*(?:anos|years)"),
+]
+DATE_RANGE = re.compile(
+    r"\b((?:19|20)\d{2})\s*(?:-|–|—|a|to|hasta)\s*((?:19|20)\d{2}|actualidad|actual|presente|present|hoy|now|current)\b"
+)
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin acentos (conserva la puntuación: c++, c#, node.js)"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def _compile(vocabulary: Dict[str, List[str]]) -> List[Tuple[str, Pattern]]:
+    return [(term, re.compile("|".join(f"(?:{alias})" for alias in aliases))) for term, aliases in vocabulary.items()]
+
+
+SKILL_PATTERNS = _compile(SKILLS)
+LANGUAGE_PATTERNS = _compile(LANGUAGES)
+LOCATION_PATTERNS = _compile(LOCATIONS)
+EDUCATION_PATTERNS = _compile(EDUCATION)
+
+
+def find_terms(folded: str, patterns: List[Tuple[str, Pattern]]) -> List[str]:
+    """Términos canónicos presentes en un texto ya normalizado con fold()"""
+    return [term for term, pattern in patterns if pattern.search(folded)]
+
+
+def _first_location(folded: str) -> Optional[str]:
+    """Ubicación que aparece antes en el texto (suele estar en la cabecera del CV)"""
+    found = [(match.start(), term) for term, pattern in LOCATION_PATTERNS for match in [pattern.search(folded)] if match]
+    return min(found)[1] if found else None
+
+
+def _years_of_experience(folded: str) -> Optional[float]:
+    """Años de experiencia declarados o, si no los hay, el intervalo cubierto por las fechas del CV"""
+    stated = [int(match) for pattern in YEARS_PATTERNS for match in pattern.findall(folded)]
+    stated = [years for years in stated if 0 < years <= 50]
+    if stated:
+        return float(max(stated))
+
+    current_year = date.today().year
+    starts, ends = [], []
+    for start, end in DATE_RANGE.findall(folded):
+        end_year = int(end) if end.isdigit() else current_year
+        if int(start) <= end_year <= current_year:
+            starts.append(int(start))
+            ends.append(end_year)
+    if not starts:
+        return None
+    return float(min(max(ends) - min(starts), 50))
+
+
+def extract_profile(text: str) -> Dict[str, Any]:
+    """
+    Extrae el perfil estructurado de un CV
+
+    Args:
+        text: Texto completo del CV
+
+    Returns:
+        Dict con skills, years_experience, languages, location y education
+    """
+    folded = fold(text)
+    education = find_terms(folded, EDUCATION_PATTERNS)
+    return {
+        "skills": find_terms(folded, SKILL_PATTERNS),
+        "years_experience": _years_of_experience(folded),
+        "languages": find_terms(folded, LANGUAGE_PATTERNS),
+        "location": _first_location(folded),
+        "education": education[0] if education else None
+    }
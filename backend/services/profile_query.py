@@ -0,0 +1,195 @@
+"""
+Respuestas a preguntas estructuradas sin LLM
+Detecta preguntas de recuento, filtro o agregación ("¿Cuántos archivos hay
+procesados?", "¿Quién tiene 5+ años de Java?", "candidatos en Madrid") y las
+responde desde los metadatos y la tabla de perfiles. Si la pregunta contiene
+algo que las reglas no entienden se devuelve None y se usa el pipeline RAG.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from services.file_manager import FileManager
+from services.pools import DEFAULT_POOL
+from services.profile_extractor import (
+    EDUCATION_PATTERNS, LANGUAGE_PATTERNS, LOCATION_PATTERNS, SKILL_PATTERNS, fold
+)
+
+# Palabras de estructura que pueden acompañar a los filtros sin cambiar su significado
+STRUCTURAL_WORDS = set("""
+    a al algun alguno alguna algunos algunas and anos ano archivos archivo are cada candidato candidatos
+    con conoce conocen conocimiento conocimientos cual cuales cuantos cuantas cv cvs dame de del domina dominan
+    el en entre es esta estan estudios experiencia experience hay has have habla hablan in know knows la las list
+    lista listado listar los mas me menos minimo muestra muestrame nivel o of or perfil perfiles personas por
+    procesados procesado que quien quienes reside residen saben sabe sobre son speak speaks su sus tenemos
+    tiene tienen total totales the un una uno unos unas vive viven who with y years
+""".split())
+
+COUNT_INTENT = re.compile(r"\bcuant[oa]s\b|\bhow many\b|\bnumero de\b")
+FILES_INTENT = re.compile(r"\b(?:archivos?|cvs?|curriculums?|documentos?)\b")
+AGGREGATE_INTENT = re.compile(r"\b(?:tecnologias?|skills?|habilidades|idiomas?|ubicaciones|ciudades|estudios)\s+mas\s+(?:comunes|frecuentes|habituales)\b")
+MIN_YEARS = re.compile(r"(?:mas de|al menos|minimo|more than|at least)?\s*(\d{1,2})\s*\+?\s*(?:o mas\s+)?(?:anos|years)")
+MAX_LISTED = 20
+
+
+class ProfileQueryRouter:
+    """Responde preguntas de recuento y filtro desde los metadatos y los perfiles"""
+
+    def __init__(self, file_manager: FileManager):
+        """
+        Args:
+            file_manager: Gestor de archivos (metadatos y perfiles)
+        """
+        self.file_manager = file_manager
+
+    async def answer(self, question: str, pool: str = DEFAULT_POOL) -> Optional[Dict[str, Any]]:
+        """
+        Responde la pregunta si es estructurada
+
+        Args:
+            question: Pregunta del usuario
+            pool: Pool de CVs a la que se limitan los recuentos y filtros
+
+        Returns:
+            Dict con response, sources, source_files y confidence, o None si hay que usar RAG
+        """
+        try:
+            return await self.file_manager.executor.run(self._answer, question, pool)
+        except Exception as e:
+            print(f"Error en consulta estructurada: {str(e)}")
+            return None
+
+    def _answer(self, question: str, pool: str) -> Optional[Dict[str, Any]]:
+        folded = fold(question)
+        remaining = folded
+        filters: Dict[str, Any] = {}
+
+        years = MIN_YEARS.search(remaining)
+        if years:
+            minimum = int(years.group(1))
+            filters["min_years"] = minimum + 1 if years.group(0).strip().startswith(("mas de", "more than")) else minimum
+            remaining = remaining[:years.start()] + " " + remaining[years.end():]
+
+        aggregate = AGGREGATE_INTENT.search(remaining)
+        if aggregate:
+            remaining = remaining[:aggregate.start()] + " " + remaining[aggregate.end():]
+
+        for key, patterns in (
+            ("skills", SKILL_PATTERNS), ("languages", LANGUAGE_PATTERNS),
+            ("locations", LOCATION_PATTERNS), ("education", EDUCATION_PATTERNS)
+        ):
+            found = []
+            for term, pattern in patterns:
+                if pattern.search(remaining):
+                    found.append(term)
+                    remaining = pattern.sub(" ", remaining)
+            if found:
+                filters[key] = found
+
+        # Solo se responde si no queda ninguna palabra que las reglas no entiendan
+        leftover = [word for word in re.findall(r"[a-z0-9]+", remaining) if word not in STRUCTURAL_WORDS]
+        if leftover or len(filters.get("locations", [])) > 1 or len(filters.get("education", [])) > 1:
+            return None
+
+        if aggregate:
+            return self._aggregate(aggregate.group(0), pool)
+        if not filters:
+            if COUNT_INTENT.search(folded) and FILES_INTENT.search(folded):
+                return self._count_files("procesad" in folded, pool)
+            return None
+        if not self._profiles_ready(pool):
+            return None
+        return self._filter(filters, pool, count_only=bool(COUNT_INTENT.search(folded)))
+
+    def _pool_stats(self, pool: str) -> Dict[str, Any]:
+        """Archivos por estado de la pool desde sus contadores"""
+        stats = self.file_manager.metadata_store.pool_stats(pool)
+        return stats.get(pool, {"total_files": 0, "total_size_bytes": 0, "by_status": {}})
+
+    def _profiles_ready(self, pool: str) -> bool:
+        """Los perfiles cubren todos los CVs procesados de la pool (si no, se usa RAG)"""
+        profiles = self.file_manager.profile_store.count(pool)
+        processed = self._pool_stats(pool)["by_status"].get("processed", 0)
+        return profiles > 0 and profiles >= processed
+
+    def _count_files(self, processed_only: bool, pool: str) -> Dict[str, Any]:
+        stats = self._pool_stats(pool)
+        by_status = stats["by_status"]
+        processed = by_status.get("processed", 0)
+        if processed_only:
+            response = f"Hay {processed} archivos procesados de {stats['total_files']} en total."
+        else:
+            detail = ", ".join(f"{count} {status}" for status, count in sorted(by_status.items()) if count)
+            response = f"Hay {stats['total_files']} archivos en total" + (f" ({detail})." if detail else ".")
+        return self._result(response, [])
+
+    def _filter(self, filters: Dict[str, Any], pool: str, count_only: bool) -> Dict[str, Any]:
+        profiles, total = self.file_manager.profile_store.query(
+            skills=filters.get("skills"),
+            languages=filters.get("languages"),
+            min_years=filters.get("min_years"),
+            location=(filters.get("locations") or [None])[0],
+            education=(filters.get("education") or [None])[0],
+            limit=MAX_LISTED,
+            pool=pool
+        )
+        description = self._describe(filters)
+        if not total:
+            return self._result(f"No hay candidatos {description}.", [])
+        if count_only:
+            noun = "candidato" if total == 1 else "candidatos"
+            return self._result(f"Hay {total} {noun} {description}.", profiles)
+
+        lines = [f"Candidatos {description} ({total}):"]
+        for profile in profiles:
+            details = []
+            if profile.get("years_experience") is not None:
+                details.append(f"{profile['years_experience']:g} años de experiencia")
+            if profile.get("location"):
+                details.append(profile["location"])
+            if profile.get("skills"):
+                details.append(", ".join(profile["skills"][:8]))
+            lines.append(f"- {profile['filename'] or profile['uuid']}: " + "; ".join(details))
+        if total > len(profiles):
+            lines.append(f"... y {total - len(profiles)} más")
+        return self._result("\n".join(lines), profiles)
+
+    def _aggregate(self, phrase: str, pool: str) -> Optional[Dict[str, Any]]:
+        field = (
+            "skill" if re.search(r"tecnolog|skill|habilidad", phrase)
+            else "language" if "idioma" in phrase
+            else "location" if re.search(r"ubicacion|ciudad", phrase)
+            else "education"
+        )
+        if not self._profiles_ready(pool):
+            return None
+        values = self.file_manager.profile_store.aggregate(field, limit=10, pool=pool)
+        if not values:
+            return self._result("No hay perfiles de candidatos todavía.", [])
+        lines = ["Valores más frecuentes entre los candidatos:"]
+        lines.extend(f"- {item['value']}: {item['count']} candidatos" for item in values)
+        return self._result("\n".join(lines), [])
+
+    @staticmethod
+    def _describe(filters: Dict[str, Any]) -> str:
+        """Descripción de los filtros para la respuesta ("con python y java, en Madrid")"""
+        parts = []
+        if filters.get("skills"):
+            parts.append("con " + " y ".join(filters["skills"]))
+        if filters.get("min_years") is not None:
+            parts.append(f"con al menos {filters['min_years']} años de experiencia")
+        if filters.get("languages"):
+            parts.append("que hablan " + " y ".join(filters["languages"]))
+        if filters.get("locations"):
+            parts.append("en " + filters["locations"][0])
+        if filters.get("education"):
+            parts.append(f"con estudios de {filters['education']}")
+        return ", ".join(parts)
+
+    @staticmethod
+    def _result(response: str, profiles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "response": response,
+            "sources": [profile["uuid"] for profile in profiles],
+            "source_files": [profile["filename"] for profile in profiles],
+            "confidence": 1.0
+        }
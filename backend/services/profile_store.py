@@ -0,0 +1,276 @@
+"""
+Perfiles estructurados de candidatos en SQLite
+Una fila por CV con su pool, años de experiencia, ubicación y estudios indexados, y
+tablas de tecnologías e idiomas por candidato para filtrar, contar y agregar sin LLM.
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    uuid TEXT PRIMARY KEY,
+    filename TEXT NOT NULL DEFAULT '',
+    pool TEXT NOT NULL DEFAULT '',
+    years_experience REAL,
+    location TEXT,
+    education TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_profiles_years ON profiles (years_experience);
+CREATE INDEX IF NOT EXISTS idx_profiles_location ON profiles (location);
+CREATE INDEX IF NOT EXISTS idx_profiles_education ON profiles (education);
+
+CREATE TABLE IF NOT EXISTS profile_skills (
+    skill TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    PRIMARY KEY (skill, uuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_profile_skills_uuid ON profile_skills (uuid);
+
+CREATE TABLE IF NOT EXISTS profile_languages (
+    language TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    PRIMARY KEY (language, uuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_profile_languages_uuid ON profile_languages (uuid);
+"""
+
+# Campo agregable -> (tabla, columna)
+AGGREGATE_FIELDS = {
+    "skill": ("profile_skills", "skill"),
+    "language": ("profile_languages", "language"),
+    "location": ("profiles", "location"),
+    "education": ("profiles", "education"),
+}
+
+
+class CandidateProfileStore:
+    """Perfiles de candidatos con consultas de filtro, recuento y agregación"""
+
+    def __init__(self, db_path: Path):
+        """
+        Args:
+            db_path: Ruta de la base de datos
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abre la base de datos en el primer uso (llamar con el lock adquirido)"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SCHEMA)
+            self._migrate_pool(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _migrate_pool(conn: sqlite3.Connection) -> None:
+        """
+        Añade la columna pool a las bases de datos anteriores a las pools. Sus perfiles no
+        saben a qué pool pertenecen, así que se eliminan y el backfill los vuelve a extraer
+        """
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(profiles)")}
+        if "pool" not in columns:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("ALTER TABLE profiles ADD COLUMN pool TEXT NOT NULL DEFAULT ''")
+                conn.execute("DELETE FROM profile_skills")
+                conn.execute("DELETE FROM profile_languages")
+                conn.execute("DELETE FROM profiles")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_profiles_pool ON profiles (pool)")
+
+    def put(self, file_uuid: str, filename: str, profile: Dict[str, Any], pool: str = "") -> None:
+        """
+        Inserta o reemplaza el perfil de un candidato
+
+        Args:
+            file_uuid: UUID del CV
+            filename: Nombre original del archivo
+            profile: Perfil devuelto por extract_profile
+            pool: Pool del CV ("" para la pool por defecto)
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_rows(conn, file_uuid)
+                conn.execute(
+                    "INSERT INTO profiles (uuid, filename, pool, years_experience, location, education, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        file_uuid, filename or "", pool or "", profile.get("years_experience"), profile.get("location"),
+                        profile.get("education"), json.dumps(profile, ensure_ascii=False)
+                    )
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO profile_skills (skill, uuid) VALUES (?, ?)",
+                    [(skill, file_uuid) for skill in profile.get("skills", [])]
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO profile_languages (language, uuid) VALUES (?, ?)",
+                    [(language, file_uuid) for language in profile.get("languages", [])]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _delete_rows(conn: sqlite3.Connection, file_uuid: str) -> int:
+        conn.execute("DELETE FROM profile_skills WHERE uuid = ?", (file_uuid,))
+        conn.execute("DELETE FROM profile_languages WHERE uuid = ?", (file_uuid,))
+        return conn.execute("DELETE FROM profiles WHERE uuid = ?", (file_uuid,)).rowcount
+
+    def get(self, file_uuid: str) -> Optional[Dict[str, Any]]:
+        """Perfil de un candidato o None si no existe"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT uuid, filename, data FROM profiles WHERE uuid = ?", (file_uuid,)
+            ).fetchone()
+        return self._profile(row) if row else None
+
+    def delete(self, file_uuid: str) -> bool:
+        """Elimina el perfil de un candidato (True si existía)"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._delete_rows(conn, file_uuid)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return deleted > 0
+
+    def uuids(self) -> Set[str]:
+        """UUIDs con perfil"""
+        with self._lock:
+            return {row[0] for row in self._connection().execute("SELECT uuid FROM profiles")}
+
+    def count(self, pool: Optional[str] = None) -> int:
+        """Número de perfiles (de una pool o, con None, de todas)"""
+        where, params = ("", ()) if pool is None else (" WHERE pool = ?", (pool,))
+        with self._lock:
+            return self._connection().execute(f"SELECT COUNT(*) FROM profiles{where}", params).fetchone()[0]
+
+    @staticmethod
+    def _where(
+        skills: Optional[List[str]],
+        languages: Optional[List[str]],
+        min_years: Optional[float],
+        location: Optional[str],
+        education: Optional[str],
+        pool: Optional[str] = None
+    ) -> Tuple[str, List[Any]]:
+        """Cláusula WHERE con sus parámetros (todas las condiciones deben cumplirse)"""
+        conditions, params = [], []
+        if pool is not None:
+            conditions.append("pool = ?")
+            params.append(pool)
+        for skill in skills or []:
+            conditions.append("uuid IN (SELECT uuid FROM profile_skills WHERE skill = ?)")
+            params.append(skill)
+        for language in languages or []:
+            conditions.append("uuid IN (SELECT uuid FROM profile_languages WHERE language = ?)")
+            params.append(language)
+        if min_years is not None:
+            conditions.append("years_experience >= ?")
+            params.append(min_years)
+        if location:
+            conditions.append("location = ?")
+            params.append(location)
+        if education:
+            conditions.append("education = ?")
+            params.append(education)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def query(
+        self,
+        skills: Optional[List[str]] = None,
+        languages: Optional[List[str]] = None,
+        min_years: Optional[float] = None,
+        location: Optional[str] = None,
+        education: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+        pool: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Candidatos que cumplen todos los filtros, de más a menos años de experiencia
+
+        Args:
+            skills: Tecnologías requeridas (todas)
+            languages: Idiomas requeridos (todos)
+            min_years: Años de experiencia mínimos
+            location: Ubicación
+            education: Nivel de estudios
+            limit: Máximo de resultados
+            offset: Resultados a saltar
+            pool: Solo los candidatos de esta pool (None: todas)
+
+        Returns:
+            Tupla (perfiles, total de candidatos que cumplen los filtros)
+        """
+        where, params = self._where(skills, languages, min_years, location, education, pool)
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM profiles{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT uuid, filename, data FROM profiles{where} "
+                "ORDER BY years_experience IS NULL, years_experience DESC, filename, uuid LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [self._profile(row) for row in rows], total
+
+    def aggregate(self, field: str, limit: int = 20, pool: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Número de candidatos por valor de un campo
+
+        Args:
+            field: skill, language, location o education
+            limit: Máximo de valores (los más frecuentes)
+            pool: Solo los candidatos de esta pool (None: todas)
+
+        Returns:
+            Lista de {"value", "count"} de mayor a menor
+
+        Raises:
+            ValueError: Si el campo no es agregable
+        """
+        if field not in AGGREGATE_FIELDS:
+            raise ValueError(f"Campo no agregable: {field}")
+        table, column = AGGREGATE_FIELDS[field]
+        where, params = f"{column} IS NOT NULL", []
+        if pool is not None:
+            where += " AND pool = ?" if table == "profiles" else " AND uuid IN (SELECT uuid FROM profiles WHERE pool = ?)"
+            params.append(pool)
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {column}, COUNT(*) FROM {table} WHERE {where} "
+                f"GROUP BY {column} ORDER BY COUNT(*) DESC, {column} LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        return [{"value": value, "count": count} for value, count in rows]
+
+    @staticmethod
+    def _profile(row: tuple) -> Dict[str, Any]:
+        file_uuid, filename, data = row
+        return {"uuid": file_uuid, "filename": filename, **json.loads(data)}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
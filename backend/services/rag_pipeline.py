@@ -2,31 +2,113 @@
 Pipeline RAG para el procesamiento y análisis de CVs
 """
 import os
-from typing import List, Dict, Any, Optional
+import json
+import time
+import shutil
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_pinecone import PineconeVectorStore
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains import RetrievalQA
 from langchain.schema import Document
-from pinecone import Pinecone
+from langchain_core.prompts import format_document
 from dotenv import load_dotenv
 from config.llm_config import get_llm_config, get_provider_info
+from services.executor import BlockingExecutor
+from services.pdf_extractor import PdfExtractor
+from services.file_manager import FileManager
+from services.embedding_cache import CachedEmbeddings, EmbeddingCache, text_hash
+from services.answer_cache import AnswerCache, normalize_question
+from services.single_flight import SingleFlight
+from services.context_packer import ContextPacker
+from services.cv_chunker import CVChunker
+from services.profile_extractor import extract_profile
+from services.profile_query import ProfileQueryRouter
+from services.pools import DEFAULT_POOL, namespace_pool, pool_namespace
+from services.tracing import tracer
+from store.cv_vector_index import CVVectorIndex, mean_vector
+from store.lexical_index import STOPWORDS, LexicalIndex, query_tokens, reciprocal_rank_fusion
+from store.local_vector_store import LocalVectorStore
+from store.pinecone_client import PineconeClient
 from pathlib import Path
-import pypdf
+import tiktoken
 
 load_dotenv()
 
 class RAGPipeline:
     """Pipeline RAG para análisis de CVs"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        file_manager: Optional[FileManager] = None,
+        http_client: Optional[Any] = None,
+        http_async_client: Optional[Any] = None,
+        pinecone_client: Optional[PineconeClient] = None,
+        executor: Optional[BlockingExecutor] = None
+    ):
         self.embeddings = None
         self.vectorstore = None
         self.llm = None
         self.qa_chain = None
-        self.text_splitter = None
+        self.retriever = None
         self.llm_config = None
         self.provider_info = None
+        # Metadatos y caché de texto extraído de los CVs
+        self.file_manager = file_manager or FileManager()
+        # Pool acotado para las llamadas síncronas de LangChain, Pinecone y pypdf (el del gestor de archivos
+        # salvo que se indique otro: un único límite de hilos para todo el trabajo bloqueante)
+        self.executor = executor or self.file_manager.executor
+        # Extracción de PDFs en un pool de procesos (usa todos los núcleos)
+        self.pdf_extractor = PdfExtractor()
+        # Pools de conexiones compartidos (embeddings/LLM y Pinecone), se cierran en cleanup()
+        self.http_client = http_client
+        self.http_async_client = http_async_client
+        self.pinecone_client = pinecone_client or PineconeClient(executor=self.executor)
+        # Vectores ya calculados, indexados por hash del chunk
+        self.embedding_cache = EmbeddingCache(db_path=self.file_manager.data_dir / "embeddings.db")
+        # Respuestas del chat ya generadas, válidas mientras no cambie el corpus
+        self.answer_cache = AnswerCache()
+        # Preguntas de recuento y filtro respondidas desde la tabla de perfiles, sin LLM
+        self.profile_router = ProfileQueryRouter(self.file_manager)
+        # Preguntas idénticas simultáneas comparten una sola recuperación y llamada al LLM
+        self.chat_flight = SingleFlight()
+        # Une chunks solapados, quita duplicados y ajusta el contexto del LLM al presupuesto de tokens
+        self.context_packer = ContextPacker()
+        # Backend de vectores: "pinecone" o "local" (matriz NumPy en disco)
+        self.vector_store_backend = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+        # Vector stores de las pools (namespace de Pinecone o vector store local propio), abiertos al usarse
+        self._pool_stores: Dict[str, Any] = {}
+        self._pool_stores_lock = threading.Lock()
+        # Número de chunks que ve el LLM y cuántos se piden para poder descartar duplicados
+        self.retrieval_k = 5
+        self.retrieval_fetch_k = 10
+        # Recuperación en dos fases: primero los CVs más relevantes (un vector por CV)
+        # y después sus chunks, con un máximo de chunks por CV
+        self.cv_index = None
+        self.cv_index_ready = False
+        self.two_stage_retrieval = os.getenv("RETRIEVAL_TWO_STAGE", "true").lower() == "true"
+        self.retrieval_cv_k = 8
+        self.retrieval_per_cv = 2
+        # Búsqueda híbrida: índice BM25 local fusionado con los vectores por RRF. Las consultas
+        # de pocos términos exactos ("Kubernetes", "PMP") se responden sin calcular el embedding
+        self.lexical_index = LexicalIndex(
+            Path(os.getenv("LEXICAL_INDEX_PATH", str(self.file_manager.data_dir / "lexical_index.db")))
+        )
+        self.lexical_ready = False
+        self.hybrid_retrieval = os.getenv("RETRIEVAL_HYBRID", "true").lower() == "true"
+        self.keyword_query_max_terms = 3
+        # Chunks que se piden a Pinecone para puntuar CVs completos (máximo de la API sin metadatos)
+        self.rank_top_k = 10000
+        # Lotes de ingesta (límites de la API de embeddings y de upsert de Pinecone)
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "1000"))
+        self.embedding_batch_max_tokens = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "250000"))
+        self.embedding_concurrency = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+        self.upsert_batch_size = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "200"))
+        self.delete_batch_size = 1000
+        self.tokenizer = None
+        # Chunks por secciones del CV y tamaño en tokens (CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+        self.chunker = CVChunker()
         
     async def initialize(self):
         """Inicializar el pipeline RAG"""
@@ -38,38 +120,33 @@ class RAGPipeline:
             print(f"Usando proveedor: {self.provider_info['provider']}")
             print(f"Base URL: {self.provider_info['base_url']}")
             
-            # Configurar embeddings (siempre usa OpenAI para embeddings)
-            self.embeddings = OpenAIEmbeddings(
-                openai_api_key=os.getenv("OPENAI_API_KEY")
+            # Configurar embeddings (siempre usa OpenAI para embeddings); documentos
+            # y consultas pasan por la caché persistente
+            self.embeddings = CachedEmbeddings(
+                OpenAIEmbeddings(
+                    openai_api_key=os.getenv("OPENAI_API_KEY"),
+                    http_client=self.http_client,
+                    http_async_client=self.http_async_client
+                ),
+                self.embedding_cache
             )
             
-            # Configurar Pinecone
-            pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+            if self.vector_store_backend == "local":
+                # Vector store local: sin red, persistido en data/vector_store
+                self.vectorstore = await self.executor.run(LocalVectorStore, self.embeddings)
+            else:
+                self.vectorstore = await self._connect_pinecone()
             
-            # Obtener o crear índice
-            index_name = os.getenv("PINECONE_INDEX_NAME", "cv-screener")
-            
-            # Listar índices existentes
-            existing_indexes = [index.name for index in pc.list_indexes()]
-            
-            if index_name not in existing_indexes:
-                pc.create_index(
-                    name=index_name,
-                    dimension=1536,  # Dimensión de OpenAI embeddings
-                    metric="cosine"
-                )
-            
-            # Conectar al índice
-            self.vectorstore = PineconeVectorStore.from_existing_index(
-                index_name=index_name,
-                embedding=self.embeddings
-            )
+            # Índice de vectores por CV para la recuperación en dos fases
+            self.cv_index = await self._open_cv_index()
             
             # Configurar LLM con la configuración dinámica
             llm_kwargs = {
                 "openai_api_key": self.llm_config["api_key"],
                 "model": "google/gemini-2.5-flash",
-                "temperature": 0.1
+                "temperature": 0.1,
+                "http_client": self.http_client,
+                "http_async_client": self.http_async_client
             }
             
             # Si es OpenRouter, agregar la base_url
@@ -78,17 +155,17 @@ class RAGPipeline:
             
             self.llm = ChatOpenAI(**llm_kwargs)
             
-            # Configurar text splitter
-            self.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
+            # Tokenizer para dimensionar los lotes de embeddings
+            self.tokenizer = await self.executor.run(tiktoken.get_encoding, "cl100k_base")
+            self.context_packer.tokenizer = self.tokenizer
+            self.chunker.tokenizer = self.tokenizer
             
-            # Configurar QA chain
+            # Configurar retriever y QA chain (comparten el mismo retriever)
+            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": self.retrieval_fetch_k})
             self.qa_chain = RetrievalQA.from_chain_type(
                 llm=self.llm,
                 chain_type="stuff",
-                retriever=self.vectorstore.as_retriever(search_kwargs={"k": 5})
+                retriever=self.retriever
             )
             
             print("Pipeline RAG inicializado correctamente")
@@ -97,14 +174,167 @@ class RAGPipeline:
             print(f"Error al inicializar pipeline RAG: {str(e)}")
             raise
     
+    async def _connect_pinecone(self) -> PineconeVectorStore:
+        """Conecta con el índice de Pinecone mediante el cliente compartido"""
+        index = await self.executor.run(self.pinecone_client.connect)
+        return PineconeVectorStore(index=index, embedding=self.embeddings)
+    
+    async def _open_cv_index(self) -> Optional[CVVectorIndex]:
+        """
+        Abre el índice de vectores por CV y comprueba que cubre todos los CVs procesados
+        (los que falten los completa backfill_cv_index en segundo plano)
+        
+        Returns:
+            CVVectorIndex o None si no se pudo abrir
+        """
+        try:
+            if isinstance(self.vectorstore, LocalVectorStore):
+                local_store = await self.executor.run(
+                    LocalVectorStore, self.embeddings, self.vectorstore.data_dir.parent / "cv_vectors"
+                )
+                cv_index = CVVectorIndex(local_store=local_store)
+            else:
+                cv_index = CVVectorIndex(pinecone_index=self.vectorstore.index)
+            
+            await self.refresh_cv_index_ready(cv_index)
+            if not self.cv_index_ready:
+                print("Índice de CVs incompleto: recuperación solo por chunks hasta completarlo")
+            return cv_index
+            
+        except Exception as e:
+            print(f"Error al abrir el índice de CVs: {str(e)}")
+            self.cv_index_ready = False
+            return None
+    
+    async def refresh_cv_index_ready(self, cv_index: Optional[CVVectorIndex] = None) -> bool:
+        """
+        Recalcula si el índice por CV cubre todos los CVs procesados de la pool por defecto
+        (mientras falten CVs se usa solo la recuperación por chunks)
+        
+        Args:
+            cv_index: Índice a comprobar (por defecto el del pipeline)
+            
+        Returns:
+            bool: Valor actualizado de cv_index_ready
+        """
+        cv_index = cv_index or self.cv_index
+        if cv_index is None:
+            self.cv_index_ready = False
+            return False
+        try:
+            count = await self.executor.run(cv_index.count)
+            # Solo los CVs de la pool por defecto tienen vector de CV
+            pool_stats = await self.executor.run(self.file_manager.get_pool_stats)
+            processed = pool_stats.get(DEFAULT_POOL, {}).get("by_status", {}).get("processed", 0)
+            self.cv_index_ready = count >= processed
+        except Exception as e:
+            print(f"Error al comprobar el índice de CVs: {str(e)}")
+            self.cv_index_ready = False
+        return self.cv_index_ready
+    
+    async def backfill_cv_index(self) -> int:
+        """
+        Calcula el vector de los CVs procesados que aún no están en el índice por CV
+        (p. ej. tras actualizar) como la media de los vectores de sus chunks: con el
+        backend local desde la matriz en memoria y con Pinecone listando y leyendo sus
+        chunks. Al terminar se recalcula cv_index_ready
+        
+        Returns:
+            int: Número de vectores de CV creados
+        """
+        if self.cv_index is None:
+            return 0
+        created = 0
+        try:
+            processed = await self.file_manager.list_processed_files(status="processed", pool=DEFAULT_POOL)
+            indexed = set(await self.executor.run(self.cv_index.uuids))
+            missing = {metadata["uuid"]: metadata for metadata in processed if metadata["uuid"] not in indexed}
+            if missing:
+                if isinstance(self.vectorstore, LocalVectorStore):
+                    means = await self.executor.run(self.vectorstore.mean_vectors_by_uuid)
+                    chunk_vectors = {file_uuid: [vector] for file_uuid, vector in means.items() if file_uuid in missing}
+                else:
+                    chunk_vectors = {}
+                    for file_uuid in missing:
+                        vectors = await self.executor.run(self._fetch_chunk_vectors, self.vectorstore.index, file_uuid)
+                        if vectors:
+                            chunk_vectors[file_uuid] = vectors
+                
+                await self.executor.run(
+                    self.cv_index.upsert,
+                    {file_uuid: mean_vector(vectors) for file_uuid, vectors in chunk_vectors.items()},
+                    {
+                        file_uuid: {
+                            "filename": missing[file_uuid].get("original_filename", ""),
+                            "chunks_count": missing[file_uuid].get("chunks_count", 0)
+                        }
+                        for file_uuid in chunk_vectors
+                    }
+                )
+                created = len(chunk_vectors)
+                if created:
+                    print(f"Vectores de CV reconstruidos: {created}")
+        except Exception as e:
+            print(f"Error al completar el índice de CVs: {str(e)}")
+        
+        await self.refresh_cv_index_ready()
+        return created
+    
+    @classmethod
+    def _fetch_chunk_vectors(cls, index, file_uuid: str) -> List[List[float]]:
+        """Vectores de los chunks de un CV en Pinecone (IDs listados por prefijo)"""
+        ids = cls._list_vector_ids(index, [file_uuid])
+        vectors = []
+        # fetch admite hasta 1000 IDs por llamada
+        for start in range(0, len(ids), 1000):
+            response = index.fetch(ids=ids[start:start + 1000])
+            vectors.extend(list(vector.values) for vector in response.vectors.values())
+        return vectors
+    
+    def _vectorstore_for(self, pool: str) -> Any:
+        """
+        Vector store de una pool: el principal para la pool por defecto; un namespace de
+        Pinecone o un LocalVectorStore en data/vector_pools/{pool} para las demás
+        
+        Args:
+            pool: Pool ("" para la pool por defecto)
+            
+        Returns:
+            Vector store de la pool
+        """
+        if not pool:
+            return self.vectorstore
+        with self._pool_stores_lock:
+            store = self._pool_stores.get(pool)
+            if store is None:
+                if isinstance(self.vectorstore, LocalVectorStore):
+                    store = LocalVectorStore(self.embeddings, self._local_pool_dir(pool))
+                else:
+                    store = PineconeVectorStore(
+                        index=self.vectorstore.index, embedding=self.embeddings, namespace=pool_namespace(pool)
+                    )
+                self._pool_stores[pool] = store
+            return store
+    
+    def _local_pool_dir(self, pool: str) -> Path:
+        """Directorio del vector store local de una pool"""
+        return self.vectorstore.data_dir.parent / "vector_pools" / pool
+    
     async def add_documents(self, documents: List[Document]) -> None:
         """Agregar documentos al vectorstore"""
         try:
-            # Dividir documentos en chunks
-            texts = self.text_splitter.split_documents(documents)
+            # Dividir documentos en chunks conservando sus metadatos
+            texts = []
+            for document in documents:
+                with tracer.span("chunk"):
+                    chunked = await self.executor.run(self.chunker.chunk, document.page_content)
+                texts.extend(
+                    Document(page_content=chunk_text, metadata={**document.metadata, "section": sections[0], "sections": sections})
+                    for chunk_text, sections in chunked
+                )
             
             # Agregar al vectorstore
-            self.vectorstore.add_documents(texts)
+            await self.executor.run(self.vectorstore.add_documents, texts)
             print(f"Agregados {len(texts)} chunks al vectorstore")
             
         except Exception as e:
@@ -114,10 +344,17 @@ class RAGPipeline:
     async def query(self, question: str) -> str:
         """Realizar consulta al pipeline RAG"""
         try:
+            structured = await self.profile_router.answer(question)
+            if structured:
+                return structured["response"]
+            
             if not self.qa_chain:
                 raise ValueError("Pipeline RAG no inicializado")
             
-            result = self.qa_chain.run(question)
+            documents = await self._retrieve(question)
+            with tracer.span("context_pack"):
+                context, _ = self.context_packer.pack(documents)
+            result = await self._generate(question, context)
             return result
             
         except Exception as e:
@@ -125,8 +362,23 @@ class RAGPipeline:
             raise
     
     async def analyze_cv_match(self, cv_text: str, job_description: str) -> Dict[str, Any]:
-        """Analizar coincidencia entre CV y descripción de trabajo"""
+        """
+        Analiza la coincidencia entre un CV y una descripción de trabajo con el LLM
+        
+        Args:
+            cv_text: Texto del CV
+            job_description: Descripción del puesto
+            
+        Returns:
+            Dict con score, match_percentage, strengths, weaknesses, recommendations y detailed_analysis
+            
+        Raises:
+            ValueError: Si el LLM no devuelve un JSON válido
+        """
         try:
+            if not self.llm:
+                raise ValueError("Pipeline RAG no inicializado")
+            
             # Crear prompt para análisis
             prompt = f"""
             Analiza la siguiente coincidencia entre un CV y una descripción de trabajo:
@@ -137,33 +389,100 @@ class RAGPipeline:
             CV:
             {cv_text}
             
-            Proporciona un análisis detallado incluyendo:
-            1. Puntuación general (0-10)
-            2. Porcentaje de coincidencia
-            3. Fortalezas identificadas
-            4. Debilidades identificadas
-            5. Recomendaciones específicas
-            
-            Formato la respuesta como JSON.
+            Responde únicamente con un objeto JSON con estas claves:
+            - "score": puntuación general (0-10)
+            - "match_percentage": porcentaje de coincidencia (0-100)
+            - "strengths": lista de fortalezas identificadas
+            - "weaknesses": lista de debilidades identificadas
+            - "recommendations": lista de recomendaciones específicas
+            - "detailed_analysis": objeto con "technical_skills_match", "experience_relevance"
+              y "education_match" (0-1)
             """
             
-            # Usar el pipeline RAG para análisis
-            analysis = await self.query(prompt)
-            
-            # Aquí se procesaría la respuesta para extraer la información estructurada
-            # Por simplicidad, devolvemos un análisis básico
-            return {
-                "score": 8.5,
-                "match_percentage": 85.0,
-                "strengths": ["Experiencia relevante", "Habilidades técnicas"],
-                "weaknesses": ["Falta experiencia específica"],
-                "recommendations": ["Mejorar perfil técnico"]
-            }
+            with tracer.span("llm"):
+                message = await self.llm.ainvoke(prompt)
+            return self._parse_analysis(message.content)
             
         except Exception as e:
             print(f"Error en análisis de CV: {str(e)}")
             raise
     
+    @staticmethod
+    def _parse_analysis(text: str) -> Dict[str, Any]:
+        """
+        Extrae y normaliza el JSON del análisis devuelto por el LLM
+        
+        Args:
+            text: Respuesta del LLM (puede incluir texto o bloques de código alrededor del JSON)
+            
+        Returns:
+            Dict con el análisis normalizado
+            
+        Raises:
+            ValueError: Si no hay un objeto JSON válido
+        """
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end < start:
+            raise ValueError("La respuesta del LLM no contiene JSON")
+        data = json.loads(text[start:end + 1])
+        
+        def number(value: Any, upper: float) -> float:
+            try:
+                return round(min(max(float(value), 0.0), upper), 2)
+            except (TypeError, ValueError):
+                return 0.0
+        
+        def items(value: Any) -> List[str]:
+            if isinstance(value, str):
+                return [value]
+            return [str(item) for item in value] if isinstance(value, list) else []
+        
+        detailed = data.get("detailed_analysis")
+        return {
+            "score": number(data.get("score"), 10.0),
+            "match_percentage": number(data.get("match_percentage"), 100.0),
+            "strengths": items(data.get("strengths")),
+            "weaknesses": items(data.get("weaknesses")),
+            "recommendations": items(data.get("recommendations")),
+            "detailed_analysis": detailed if isinstance(detailed, dict) else {}
+        }
+    
+    async def score_cvs(self, vector: List[float], pool: str = DEFAULT_POOL) -> Tuple[Dict[str, float], bool]:
+        """
+        Puntúa los CVs del índice por la similitud máxima de sus chunks con un vector
+        
+        Args:
+            vector: Embedding de la consulta (p. ej. la descripción del puesto)
+            pool: Pool cuyos CVs se puntúan
+            
+        Returns:
+            Tupla (Dict UUID -> similitud, completo). Con Pinecone solo aparecen los CVs con
+            algún chunk entre los rank_top_k más similares: si la consulta llega a ese límite
+            completo es False y puede haber CVs sin puntuar
+        """
+        if isinstance(self.vectorstore, LocalVectorStore):
+            store = await self.executor.run(self._vectorstore_for, pool)
+            with tracer.span("vector_query"):
+                return await self.executor.run(store.max_scores_by_uuid, vector), True
+        
+        # Sin metadatos Pinecone admite top_k hasta 10000; el UUID va en el ID (cv_{uuid}_chunk_{i})
+        with tracer.span("vector_query"):
+            response = await self.executor.run(
+                self.vectorstore.index.query,
+                vector=vector,
+                top_k=self.rank_top_k,
+                include_metadata=False,
+                namespace=pool_namespace(pool)
+            )
+        scores = {}
+        for match in response["matches"]:
+            vector_id = match["id"]
+            if not vector_id.startswith("cv_") or "_chunk_" not in vector_id:
+                continue
+            file_uuid = vector_id[3:vector_id.rindex("_chunk_")]
+            scores[file_uuid] = max(scores.get(file_uuid, -1.0), float(match["score"]))
+        return scores, len(response["matches"]) < self.rank_top_k
+    
     async def process_pdf_with_uuid(self, file_uuid: str, file_path: str) -> int:
         """
         Procesa PDF y guarda en Pinecone con UUID como prefix
@@ -178,37 +497,31 @@ class RAGPipeline:
         try:
             print(f"Procesando PDF: {file_uuid}")
             
-            # Extraer texto del PDF
-            text = await self._extract_text_from_pdf(file_path)
+            # Reutilizar el texto en caché; si no existe, extraer página a página
+            # y dividir en chunks a medida que llegan
+            text = await self.file_manager.get_extracted_text(file_uuid)
+            if text:
+                with tracer.span("chunk"):
+                    chunked = await self.executor.run(self.chunker.chunk, text)
+            else:
+                # El span de extracción incluye los spans de chunking intercalados entre páginas
+                with tracer.span("extract"):
+                    text, chunked = await self._chunk_pages(self.pdf_extractor.iter_pages(file_path))
+                if text:
+                    await self.file_manager.save_extracted_text(file_uuid, text)
             if not text:
                 raise ValueError("No se pudo extraer texto del PDF")
             
-            # Crear documento
-            document = Document(
-                page_content=text,
-                metadata={
-                    "source": file_uuid,
-                    "filename": Path(file_path).name,
-                    "uuid": file_uuid
-                }
+            # Crear chunks con IDs cv_{file_uuid}_chunk_{index} en la pool del archivo
+            metadata = await self.file_manager.get_file_metadata(file_uuid) or {}
+            chunks, ids = self._documents_from_chunks(
+                file_uuid, [chunk_text for chunk_text, _ in chunked], file_path, [sections for _, sections in chunked],
+                pool=metadata.get("pool", DEFAULT_POOL)
             )
             
-            # Dividir en chunks
-            chunks = self.text_splitter.split_documents([document])
-            
-            # Añadir metadatos a cada chunk
-            for i, chunk in enumerate(chunks):
-                chunk.metadata.update({
-                    "uuid": file_uuid,
-                    "chunk_index": i,
-                    "filename": Path(file_path).name
-                })
-            
-            # Generar IDs con el formato cv_{file_uuid}_chunk_{index}
-            ids = [f"cv_{file_uuid}_chunk_{i}" for i in range(len(chunks))]
-            
-            # Agregar al vectorstore con IDs controlados
-            self.vectorstore.add_documents(documents=chunks, ids=ids)
+            # Generar embeddings y subir al vectorstore con IDs controlados
+            await self._embed_and_upsert(chunks, ids)
+            await self._save_profile(file_uuid, text)
             
             print(f"Procesado exitosamente: {file_uuid} ({len(chunks)} chunks)")
             return len(chunks)
@@ -217,39 +530,399 @@ class RAGPipeline:
             print(f"Error al procesar PDF {file_uuid}: {str(e)}")
             return 0
     
-    async def query_with_sources(self, question: str) -> Dict[str, Any]:
+    async def process_pdfs_bulk(self, files: List[Tuple[str, str]]) -> Dict[str, int]:
+        """
+        Procesa varios PDFs a la vez: extracción en paralelo y embeddings/upserts
+        agrupados en lotes que mezclan chunks de distintos CVs
+        
+        Args:
+            files: Lista de tuplas (file_uuid, file_path)
+            
+        Returns:
+            Dict con el número de chunks por UUID (0 si hubo error)
+        """
+        results = {file_uuid: 0 for file_uuid, _ in files}
+        if not files:
+            return results
+        
+        print(f"Procesando lote de {len(files)} PDFs")
+        
+        # Obtener el texto de todos los PDFs en paralelo (caché o extracción)
+        texts = await asyncio.gather(
+            *(self.get_candidate_text(file_uuid, file_path) for file_uuid, file_path in files)
+        )
+        
+        # Construir los chunks de todos los CVs (cada uno en su pool; el lote puede mezclar pools)
+        prepared = []
+        texts_by_uuid = {}
+        for (file_uuid, file_path), text in zip(files, texts):
+            if not text:
+                print(f"Error al procesar PDF {file_uuid}: No se pudo extraer texto del PDF")
+                continue
+            metadata = await self.file_manager.get_file_metadata(file_uuid) or {}
+            chunks, ids = await self._build_chunks(file_uuid, text, file_path, metadata.get("pool", DEFAULT_POOL))
+            prepared.append((file_uuid, chunks, ids))
+            texts_by_uuid[file_uuid] = text
+        
+        try:
+            # Un único flujo de embeddings/upserts para todos los chunks del lote
+            await self._embed_and_upsert(
+                [chunk for _, chunks, _ in prepared for chunk in chunks],
+                [vector_id for _, _, ids in prepared for vector_id in ids]
+            )
+            for file_uuid, chunks, _ in prepared:
+                results[file_uuid] = len(chunks)
+                
+        except Exception as e:
+            # Si falla el lote, reintentar archivo por archivo para aislar el error
+            print(f"Error en lote de embeddings, procesando archivo por archivo: {str(e)}")
+            for file_uuid, chunks, ids in prepared:
+                try:
+                    await self._embed_and_upsert(chunks, ids)
+                    results[file_uuid] = len(chunks)
+                except Exception as file_error:
+                    print(f"Error al procesar PDF {file_uuid}: {str(file_error)}")
+        
+        for file_uuid, text in texts_by_uuid.items():
+            if results[file_uuid]:
+                await self._save_profile(file_uuid, text)
+        
+        print(f"Lote procesado: {sum(1 for count in results.values() if count)}/{len(files)} PDFs")
+        return results
+    
+    async def _save_profile(self, file_uuid: str, text: str) -> None:
+        """
+        Extrae y guarda el perfil estructurado de un CV (un fallo no interrumpe la ingesta)
+        
+        Args:
+            file_uuid: UUID del archivo
+            text: Texto completo del CV
+        """
+        try:
+            metadata = await self.file_manager.get_file_metadata(file_uuid) or {}
+            with tracer.span("profile"):
+                profile = await self.executor.run(extract_profile, text)
+            await self.executor.run(
+                self.file_manager.profile_store.put,
+                file_uuid, metadata.get("original_filename", ""), profile, metadata.get("pool", DEFAULT_POOL)
+            )
+        except Exception as e:
+            print(f"Error al guardar el perfil de {file_uuid}: {str(e)}")
+    
+    async def backfill_profiles(self) -> int:
+        """
+        Extrae el perfil de los CVs procesados que aún no lo tienen (p. ej. tras actualizar)
+        
+        Returns:
+            int: Número de perfiles creados
+        """
+        existing = await self.executor.run(self.file_manager.profile_store.uuids)
+        processed = await self.file_manager.list_processed_files(status="processed")
+        created = 0
+        for metadata in processed:
+            if metadata["uuid"] in existing:
+                continue
+            text = await self.file_manager.get_extracted_text(metadata["uuid"])
+            if text:
+                await self._save_profile(metadata["uuid"], text)
+                created += 1
+        if created:
+            print(f"Perfiles de candidatos creados: {created}")
+        return created
+    
+    async def _build_chunks(
+        self, file_uuid: str, text: str, file_path: str, pool: str = DEFAULT_POOL
+    ) -> Tuple[List[Document], List[str]]:
+        """
+        Divide el texto de un CV en chunks con metadatos e IDs cv_{file_uuid}_chunk_{index}
+        
+        Args:
+            file_uuid: UUID del archivo
+            text: Texto extraído del PDF
+            file_path: Ruta del archivo PDF
+            pool: Pool del CV
+            
+        Returns:
+            Tupla (chunks, ids)
+        """
+        with tracer.span("chunk"):
+            chunked = await self.executor.run(self.chunker.chunk, text)
+        return self._documents_from_chunks(
+            file_uuid, [chunk_text for chunk_text, _ in chunked], file_path, [sections for _, sections in chunked], pool
+        )
+    
+    async def _chunk_pages(self, pages: AsyncIterator[str]) -> Tuple[str, List[Tuple[str, List[str]]]]:
+        """
+        Divide en chunks un flujo de páginas sin esperar al final del documento.
+        Cuando la ventana pendiente crece se dividen las secciones ya cerradas y solo
+        se retiene la última, que puede continuar en la página siguiente.
+        
+        Args:
+            pages: Generador asíncrono con el texto de cada página
+            
+        Returns:
+            Tupla (texto completo, chunks con sus secciones)
+        """
+        # Ventana acotada (unos cuatro chunks): dividirla en el event loop es barato
+        window = 16 * self.chunker.chunk_tokens
+        parts = []
+        chunked = []
+        buffer = ""
+        section = "header"
+        
+        async for page in pages:
+            parts.append(page)
+            buffer = f"{buffer}\n{page}" if buffer else page
+            if len(buffer) < window:
+                continue
+            with tracer.span("chunk"):
+                sections = self.chunker.split_sections(buffer, section)
+                if len(sections) > 1:
+                    chunked.extend(self.chunker.chunk_sections(sections[:-1]))
+                    section, buffer = sections[-1]
+        
+        if buffer.strip():
+            with tracer.span("chunk"):
+                chunked.extend(self.chunker.chunk_sections(self.chunker.split_sections(buffer, section)))
+        
+        return "\n".join(parts).strip(), chunked
+    
+    def _documents_from_chunks(
+        self,
+        file_uuid: str,
+        chunk_texts: List[str],
+        file_path: str,
+        chunk_sections: Optional[List[List[str]]] = None,
+        pool: str = DEFAULT_POOL
+    ) -> Tuple[List[Document], List[str]]:
+        """
+        Crea los documentos de cada chunk con sus metadatos e IDs cv_{file_uuid}_chunk_{index}
+        
+        Args:
+            file_uuid: UUID del archivo
+            chunk_texts: Texto de cada chunk
+            file_path: Ruta del archivo PDF
+            chunk_sections: Secciones del CV que contiene cada chunk
+            pool: Pool del CV (solo se guarda en los metadatos fuera de la pool por defecto)
+            
+        Returns:
+            Tupla (chunks, ids)
+        """
+        filename = Path(file_path).name
+        chunks = []
+        for i, chunk_text in enumerate(chunk_texts):
+            metadata = {
+                "source": file_uuid,
+                "uuid": file_uuid,
+                "chunk_index": i,
+                "filename": filename,
+                "chunk_hash": text_hash(chunk_text)
+            }
+            if chunk_sections:
+                metadata["section"] = chunk_sections[i][0]
+                metadata["sections"] = chunk_sections[i]
+            if pool:
+                metadata["pool"] = pool
+            chunks.append(Document(page_content=chunk_text, metadata=metadata))
+        ids = [f"cv_{file_uuid}_chunk_{i}" for i in range(len(chunks))]
+        return chunks, ids
+    
+    async def _embed_and_upsert(self, chunks: List[Document], ids: List[str]) -> None:
+        """
+        Genera embeddings en lotes dimensionados a los límites del proveedor y sube
+        los vectores al índice en lotes grandes
+        
+        Args:
+            chunks: Chunks a indexar
+            ids: IDs de los vectores (mismo orden que chunks)
+        """
+        if not chunks:
+            return
+        
+        # Deduplicar por hash: cada texto distinto se pide una sola vez; los ya
+        # embebidos (en este u otros CVs) los sirve la caché de CachedEmbeddings
+        hashes = [chunk.metadata.get("chunk_hash") or text_hash(chunk.page_content) for chunk in chunks]
+        unique_texts = {}
+        for key, chunk in zip(hashes, chunks):
+            unique_texts.setdefault(key, chunk.page_content)
+        keys = list(unique_texts)
+        texts = list(unique_texts.values())
+        
+        # Embeddings: lotes concurrentes acotados
+        semaphore = asyncio.Semaphore(self.embedding_concurrency)
+        
+        async def _embed(batch: List[int]) -> List[List[float]]:
+            async with semaphore:
+                return await self.executor.run(self.embeddings.embed_documents, [texts[i] for i in batch])
+        
+        batches = self._pack_embedding_batches(texts)
+        with tracer.span("embed"):
+            batch_vectors = await asyncio.gather(*(_embed(batch) for batch in batches))
+        
+        known = {}
+        for batch, values in zip(batches, batch_vectors):
+            for i, value in zip(batch, values):
+                known[keys[i]] = value
+        
+        vectors = [known[key] for key in hashes]
+        
+        # Upserts: el texto va en la metadata "text" como espera PineconeVectorStore;
+        # cada chunk va al namespace (o vector store local) de su pool
+        records_by_pool: Dict[str, List[Dict[str, Any]]] = {}
+        for vector_id, vector, chunk in zip(ids, vectors, chunks):
+            records_by_pool.setdefault(chunk.metadata.get("pool", DEFAULT_POOL), []).append({
+                "id": vector_id,
+                "values": vector,
+                "metadata": {**chunk.metadata, "text": chunk.page_content}
+            })
+        
+        def upsert(pool: str, batch: List[Dict[str, Any]]) -> None:
+            if isinstance(self.vectorstore, LocalVectorStore):
+                self._vectorstore_for(pool).upsert(batch)
+            else:
+                self.vectorstore.index.upsert(vectors=batch, namespace=pool_namespace(pool))
+        
+        size = self.upsert_batch_size
+        with tracer.span("vector_upsert"):
+            await asyncio.gather(*(
+                self.executor.run(upsert, pool, records[start:start + size])
+                for pool, records in records_by_pool.items()
+                for start in range(0, len(records), size)
+            ))
+        
+        # Un vector por CV: la media de los vectores de sus chunks (todos llegan en la misma llamada).
+        # La recuperación en dos fases solo se usa en la pool por defecto
+        if self.cv_index:
+            by_cv: Dict[str, List[List[float]]] = {}
+            filenames = {}
+            for chunk, vector in zip(chunks, vectors):
+                file_uuid = chunk.metadata.get("uuid")
+                if file_uuid and not chunk.metadata.get("pool"):
+                    by_cv.setdefault(file_uuid, []).append(vector)
+                    filenames[file_uuid] = chunk.metadata.get("filename", "")
+            with tracer.span("vector_upsert"):
+                await self.executor.run(
+                    self.cv_index.upsert,
+                    {file_uuid: mean_vector(cv_vectors) for file_uuid, cv_vectors in by_cv.items()},
+                    {file_uuid: {"filename": filenames[file_uuid], "chunks_count": len(cv_vectors)} for file_uuid, cv_vectors in by_cv.items()}
+                )
+            # Un índice incompleto puede quedar completo con los CVs recién ingeridos
+            if by_cv and not self.cv_index_ready:
+                await self.refresh_cv_index_ready()
+        
+        await self._index_lexical(chunks, ids)
+    
+    async def _index_lexical(self, chunks: List[Document], ids: List[str]) -> None:
+        """Añade los chunks al índice BM25 (un fallo no interrumpe la ingesta, pero desactiva la búsqueda híbrida)"""
+        try:
+            with tracer.span("lexical_upsert"):
+                await self.executor.run(
+                    self.lexical_index.add,
+                    [(vector_id, chunk.page_content, chunk.metadata) for vector_id, chunk in zip(ids, chunks)]
+                )
+        except Exception as e:
+            print(f"Error al actualizar el índice léxico: {str(e)}")
+            self.lexical_ready = False
+    
+    async def backfill_lexical_index(self) -> int:
+        """
+        Indexa en BM25 los CVs procesados que aún no están en el índice léxico (p. ej. tras
+        actualizar) a partir del texto extraído; la búsqueda híbrida se activa al terminar
+        
+        Returns:
+            int: Número de CVs indexados
+        """
+        try:
+            existing = await self.executor.run(self.lexical_index.uuids)
+            processed = await self.file_manager.list_processed_files(status="processed")
+            indexed = 0
+            for metadata in processed:
+                file_uuid = metadata["uuid"]
+                if file_uuid in existing:
+                    continue
+                text = await self.file_manager.get_extracted_text(file_uuid)
+                if not text:
+                    continue
+                chunks, ids = await self._build_chunks(
+                    file_uuid, text, f"{file_uuid}.pdf", metadata.get("pool", DEFAULT_POOL)
+                )
+                await self.executor.run(
+                    self.lexical_index.add,
+                    [(vector_id, chunk.page_content, chunk.metadata) for vector_id, chunk in zip(ids, chunks)]
+                )
+                indexed += 1
+            if indexed:
+                print(f"CVs añadidos al índice léxico: {indexed}")
+            self.lexical_ready = True
+            return indexed
+        except Exception as e:
+            print(f"Error al construir el índice léxico, búsqueda solo por vectores: {str(e)}")
+            self.lexical_ready = False
+            return 0
+    
+    def _pack_embedding_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Agrupa textos en lotes que respetan el máximo de entradas y de tokens por petición
+        
+        Args:
+            texts: Textos a embeber
+            
+        Returns:
+            Lista de lotes con los índices de los textos
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = len(self.tokenizer.encode(text, disallowed_special=()))
+            if current and (
+                len(current) >= self.embedding_batch_size
+                or current_tokens + tokens > self.embedding_batch_max_tokens
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def query_with_sources(
+        self,
+        question: str,
+        sections: Optional[List[str]] = None,
+        pool: str = DEFAULT_POOL
+    ) -> Dict[str, Any]:
         """
         Consulta RAG y devuelve respuesta con fuentes
         
         Args:
             question: Pregunta del usuario
+            sections: Secciones del CV a las que se limita la búsqueda (experience, skills...)
+            pool: Pool de CVs en la que se busca
             
         Returns:
             Dict con respuesta, fuentes y confianza
         """
         try:
+            structured = await self.profile_router.answer(question, pool)
+            if structured:
+                return {**structured, "cached": False}
+            
             if not self.qa_chain:
                 raise ValueError("Pipeline RAG no inicializado")
             
-            # Realizar consulta
-            result = self.qa_chain.run(question)
-            
-            # Obtener documentos fuente
-            retriever = self.vectorstore.as_retriever(search_kwargs={"k": 5})
-            source_docs = retriever.get_relevant_documents(question)
-            
-            # Extraer UUIDs únicos de las fuentes
-            source_uuids = list(set([doc.metadata.get("uuid") for doc in source_docs if doc.metadata.get("uuid")]))
+            scope = self._cache_scope(sections, pool)
+            cached, corpus_version, question_vector = await self._lookup_answer(question, scope)
+            if cached:
+                return {**cached, "cached": True}
             
-            # Calcular confianza basada en número de fuentes
-            confidence = min(0.9, 0.5 + (len(source_uuids) * 0.1))
-            
-            return {
-                "response": result,
-                "sources": source_uuids,
-                "source_files": [doc.metadata.get("filename", "Unknown") for doc in source_docs],
-                "confidence": round(confidence, 2)
-            }
+            answer = await self.chat_flight.run(
+                (normalize_question(question), corpus_version, scope),
+                self._answer, question, corpus_version, question_vector, sections, pool
+            )
+            return {**answer, "cached": False}
             
         except Exception as e:
             print(f"Error en consulta con fuentes: {str(e)}")
@@ -257,15 +930,375 @@ class RAGPipeline:
                 "response": f"Error al procesar la consulta: {str(e)}",
                 "sources": [],
                 "source_files": [],
-                "confidence": 0.0
+                "confidence": 0.0,
+                "cached": False
+            }
+    
+    async def _answer(
+        self,
+        question: str,
+        corpus_version: int,
+        question_vector: Optional[List[float]],
+        sections: Optional[List[str]] = None,
+        pool: str = DEFAULT_POOL
+    ) -> Dict[str, Any]:
+        """
+        Genera la respuesta con sus fuentes y la guarda en la caché de respuestas
+        
+        Args:
+            question: Pregunta del usuario
+            corpus_version: Versión del corpus al empezar la consulta
+            question_vector: Embedding de la pregunta (si la caché compara por similitud)
+            sections: Secciones del CV a las que se limita la búsqueda
+            pool: Pool de CVs en la que se busca
+            
+        Returns:
+            Dict con respuesta, fuentes y confianza
+        """
+        # Recuperar documentos una sola vez y usarlos tanto para el LLM como para las fuentes
+        source_docs = await self._retrieve(question, sections, pool)
+        # El LLM ve el contexto compactado; las fuentes siguen siendo los chunks recuperados
+        with tracer.span("context_pack"):
+            context, context_stats = self.context_packer.pack(source_docs)
+        result = await self._generate(question, context)
+        
+        # Extraer UUIDs únicos de las fuentes
+        source_uuids = list(dict.fromkeys(doc.metadata.get("uuid") for doc in source_docs if doc.metadata.get("uuid")))
+        
+        # Calcular confianza basada en número de fuentes
+        confidence = min(0.9, 0.5 + (len(source_uuids) * 0.1))
+        
+        answer = {
+            "response": result,
+            "sources": source_uuids,
+            "source_files": [doc.metadata.get("filename", "Unknown") for doc in source_docs],
+            "confidence": round(confidence, 2),
+            "context": context_stats
+        }
+        self.answer_cache.put(question, corpus_version, answer, question_vector, self._cache_scope(sections, pool))
+        return answer
+    
+    @staticmethod
+    def _cache_scope(sections: Optional[List[str]], pool: str) -> str:
+        """Ámbito de una consulta en la caché de respuestas ("" para todo el corpus por defecto)"""
+        if not sections and not pool:
+            return ""
+        return f"{pool}|{','.join(sorted(sections or []))}"
+    
+    async def _lookup_answer(
+        self, question: str, scope: str = ""
+    ) -> Tuple[Optional[Dict[str, Any]], int, Optional[List[float]]]:
+        """
+        Busca una respuesta ya generada para la pregunta con la versión actual del corpus
+        
+        Args:
+            question: Pregunta del usuario
+            scope: Ámbito de la consulta (pool y secciones)
+            
+        Returns:
+            Tupla (respuesta guardada o None, versión del corpus, embedding de la pregunta
+            si la coincidencia por similitud está activada)
+        """
+        with tracer.span("metadata"):
+            corpus_version = await self.executor.run(self.file_manager.get_corpus_version)
+        question_vector = None
+        if self.answer_cache.similarity_threshold is not None:
+            # El embedding queda en la caché de embeddings y lo reutiliza la recuperación
+            with tracer.span("embed"):
+                question_vector = await self.executor.run(self.embeddings.embed_query, question)
+        return self.answer_cache.get(question, corpus_version, question_vector, scope), corpus_version, question_vector
+    
+    async def _retrieve(
+        self,
+        question: str,
+        sections: Optional[List[str]] = None,
+        pool: str = DEFAULT_POOL
+    ) -> List[Document]:
+        """
+        Recupera los chunks relevantes para una pregunta (un embedding y una consulta al vectorstore)
+        descartando chunks con contenido idéntico para mantener la diversidad de resultados
+        
+        Args:
+            question: Pregunta del usuario
+            sections: Secciones del CV a las que se limita la búsqueda
+            pool: Pool de CVs en la que se busca (solo sus vectores y su parte del índice BM25)
+            
+        Returns:
+            Lista de documentos recuperados
+        """
+        section_filter = {"sections": {"$in": sections}} if sections else None
+        lexical = []
+        if self.hybrid_retrieval and self.lexical_ready:
+            with tracer.span("lexical_query"):
+                results = await self.executor.run(
+                    self.lexical_index.search, question, self.retrieval_fetch_k, section_filter, pool
+                )
+            lexical = [document for document, _ in results]
+            # Consultas de términos exactos: basta con BM25, sin embedding ni consulta al vectorstore
+            if lexical and self._is_keyword_query(question):
+                return self._unique(lexical)[:self.retrieval_k]
+        
+        # El índice de vectores por CV solo cubre la pool por defecto
+        if self.two_stage_retrieval and self.cv_index_ready and not pool:
+            documents = await self._retrieve_two_stage(question, section_filter)
+            if documents:
+                if lexical:
+                    documents = reciprocal_rank_fusion([documents, lexical])[:self.retrieval_k]
+                return documents
+        
+        if section_filter or pool:
+            store = await self.executor.run(self._vectorstore_for, pool)
+            with tracer.span("embed"):
+                vector = await self.executor.run(self.embeddings.embed_query, question)
+            with tracer.span("vector_query"):
+                results = await self.executor.run(
+                    store.similarity_search_by_vector_with_score,
+                    vector,
+                    k=self.retrieval_fetch_k,
+                    filter=section_filter
+                )
+            documents = [document for document, _ in results]
+        else:
+            # El retriever calcula el embedding y consulta el vectorstore en una sola llamada
+            with tracer.span("vector_query"):
+                documents = await self.executor.run(self.retriever.invoke, question)
+        
+        if lexical:
+            documents = reciprocal_rank_fusion([documents, lexical])
+        return self._unique(documents)[:self.retrieval_k]
+    
+    @staticmethod
+    def _unique(documents: List[Document]) -> List[Document]:
+        """Descarta los chunks con contenido idéntico conservando el orden"""
+        unique = []
+        seen = set()
+        for document in documents:
+            key = document.metadata.get("chunk_hash") or text_hash(document.page_content)
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(document)
+        return unique
+    
+    def _is_keyword_query(self, question: str) -> bool:
+        """
+        Consulta de pocos términos sueltos ("Kubernetes", "Django AWS"), no una pregunta en
+        lenguaje natural: todas sus palabras deben ser términos (ninguna stopword), así
+        "quien sabe python" o "candidatos con experiencia en React" combinan BM25 y vectores
+        """
+        if "?" in question:
+            return False
+        tokens = query_tokens(question)
+        if not 0 < len(tokens) <= self.keyword_query_max_terms:
+            return False
+        return not any(token in STOPWORDS for token in tokens)
+    
+    async def _retrieve_two_stage(self, question: str, section_filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Recuperación en dos fases: selecciona los retrieval_cv_k CVs más relevantes por su
+        vector de CV y busca solo entre sus chunks, con un máximo de retrieval_per_cv
+        chunks por CV para que las fuentes no se concentren en un único CV largo
+        
+        Args:
+            question: Pregunta del usuario
+            section_filter: Filtro de metadatos por secciones del CV
+            
+        Returns:
+            Lista de documentos recuperados (vacía si no hay CVs en el índice)
+        """
+        with tracer.span("embed"):
+            vector = await self.executor.run(self.embeddings.embed_query, question)
+        with tracer.span("vector_query"):
+            top_cvs = await self.executor.run(self.cv_index.search, vector, self.retrieval_cv_k)
+        if not top_cvs:
+            return []
+        
+        with tracer.span("vector_query"):
+            results = await self.executor.run(
+                self.vectorstore.similarity_search_by_vector_with_score,
+                vector,
+                k=max(self.retrieval_fetch_k, self.retrieval_cv_k * self.retrieval_per_cv),
+                filter={"uuid": {"$in": [file_uuid for file_uuid, _ in top_cvs]}, **(section_filter or {})}
+            )
+        
+        selected = []
+        overflow = []
+        per_cv: Dict[str, int] = {}
+        seen = set()
+        for document, _ in results:
+            key = document.metadata.get("chunk_hash") or text_hash(document.page_content)
+            if key in seen:
+                continue
+            seen.add(key)
+            file_uuid = document.metadata.get("uuid")
+            if per_cv.get(file_uuid, 0) < self.retrieval_per_cv:
+                per_cv[file_uuid] = per_cv.get(file_uuid, 0) + 1
+                selected.append(document)
+            else:
+                overflow.append(document)
+        # Si hay pocos CVs relevantes se completa con los chunks que superaron el máximo por CV
+        return (selected + overflow)[:self.retrieval_k]
+    
+    async def _generate(self, question: str, documents: List[Document]) -> str:
+        """
+        Genera la respuesta del LLM a partir de documentos ya recuperados
+        
+        Args:
+            question: Pregunta del usuario
+            documents: Documentos de contexto que verá el LLM
+            
+        Returns:
+            str: Respuesta generada
+        """
+        with tracer.span("llm"):
+            return await self.executor.run(
+                self.qa_chain.combine_documents_chain.run,
+                input_documents=documents,
+                question=question
+            )
+    
+    async def stream_with_sources(
+        self,
+        question: str,
+        sections: Optional[List[str]] = None,
+        pool: str = DEFAULT_POOL
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Consulta RAG en streaming: primero las fuentes (tras la recuperación), después
+        los tokens de la respuesta a medida que los genera el LLM y al final la confianza
+        y los tiempos. Si el consumidor deja de iterar, la llamada al LLM se cancela.
+        
+        Args:
+            question: Pregunta del usuario
+            sections: Secciones del CV a las que se limita la búsqueda
+            pool: Pool de CVs en la que se busca
+            
+        Yields:
+            Eventos {"event": "sources" | "token" | "done", "data": {...}}
+        """
+        if not self.qa_chain:
+            raise ValueError("Pipeline RAG no inicializado")
+        
+        start = time.perf_counter()
+        # Las respuestas estructuradas (sin LLM) y las de la caché se envían en un único token
+        ready = await self.profile_router.answer(question, pool)
+        from_cache = False
+        scope = self._cache_scope(sections, pool)
+        if not ready:
+            ready, corpus_version, question_vector = await self._lookup_answer(question, scope)
+            from_cache = ready is not None
+        if ready:
+            yield {"event": "sources", "data": {"sources": ready["sources"]}}
+            yield {"event": "token", "data": {"text": ready["response"]}}
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            yield {
+                "event": "done",
+                "data": {
+                    "confidence": ready["confidence"],
+                    "cached": from_cache,
+                    "timing": {"retrieval_ms": 0.0, "first_token_ms": elapsed_ms, "total_ms": elapsed_ms}
+                }
             }
+            return
+        
+        source_docs = await self._retrieve(question, sections, pool)
+        retrieval_ms = (time.perf_counter() - start) * 1000
+        
+        source_uuids = list(dict.fromkeys(doc.metadata.get("uuid") for doc in source_docs if doc.metadata.get("uuid")))
+        yield {"event": "sources", "data": {"sources": source_uuids}}
+        
+        with tracer.span("context_pack"):
+            context, context_stats = self.context_packer.pack(source_docs)
+        first_token_ms = None
+        parts = []
+        llm_start = time.perf_counter()
+        async for chunk in self.llm.astream(self._prompt_messages(question, context)):
+            if not chunk.content:
+                continue
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - start) * 1000
+                if tracer.enabled:
+                    tracer.record("llm_first_token", (time.perf_counter() - llm_start) * 1000)
+            parts.append(chunk.content)
+            yield {"event": "token", "data": {"text": chunk.content}}
+        # Incluye el tiempo que el cliente tarda en consumir los tokens (no se puede separar en streaming)
+        if tracer.enabled:
+            tracer.record("llm", (time.perf_counter() - llm_start) * 1000)
+        
+        confidence = round(min(0.9, 0.5 + (len(source_uuids) * 0.1)), 2)
+        # Solo se guardan respuestas completas (si el cliente se desconecta no se llega aquí)
+        self.answer_cache.put(question, corpus_version, {
+            "response": "".join(parts),
+            "sources": source_uuids,
+            "source_files": [doc.metadata.get("filename", "Unknown") for doc in source_docs],
+            "confidence": confidence,
+            "context": context_stats
+        }, question_vector, scope)
+        yield {
+            "event": "done",
+            "data": {
+                "confidence": confidence,
+                "cached": False,
+                "context": context_stats,
+                "timing": {
+                    "retrieval_ms": round(retrieval_ms, 1),
+                    "first_token_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+                    "total_ms": round((time.perf_counter() - start) * 1000, 1)
+                }
+            }
+        }
+    
+    def _prompt_messages(self, question: str, documents: List[Document]) -> List[Any]:
+        """
+        Mensajes para el LLM con el mismo prompt y formato de contexto que la QA chain "stuff"
+        
+        Args:
+            question: Pregunta del usuario
+            documents: Documentos de contexto
+            
+        Returns:
+            Lista de mensajes del chat
+        """
+        chain = self.qa_chain.combine_documents_chain
+        context = chain.document_separator.join(
+            format_document(document, chain.document_prompt) for document in documents
+        )
+        prompt = chain.llm_chain.prompt
+        return prompt.format_prompt(**{chain.document_variable_name: context, "question": question}).to_messages()
     
-    async def delete_by_uuid(self, file_uuid: str) -> bool:
+    async def delete_by_uuid(self, file_uuid: str, chunks_count: Optional[int] = None, pool: Optional[str] = None) -> bool:
         """
-        Elimina vectores de Pinecone por UUID usando eliminación por prefix
+        Elimina los vectores de un CV
         
         Args:
             file_uuid: UUID del archivo a eliminar
+            chunks_count: Número de chunks indexados (si no se indica, se lee de los metadatos)
+            pool: Pool del CV (si no se indica, se lee de los metadatos)
+            
+        Returns:
+            bool: True si se eliminó correctamente
+        """
+        counts = {file_uuid: chunks_count} if chunks_count else None
+        return await self.delete_by_uuids([file_uuid], counts, pool)
+    
+    async def delete_by_uuids(
+        self,
+        file_uuids: List[str],
+        chunks_counts: Optional[Dict[str, int]] = None,
+        pool: Optional[str] = None
+    ) -> bool:
+        """
+        Elimina los vectores de varios CVs en el menor número de llamadas posible
+        
+        Los IDs se reconstruyen con el esquema cv_{uuid}_chunk_{i} a partir del
+        chunks_count registrado en la ingesta; para los CVs sin recuento se listan
+        los IDs por prefijo (o se borra por filtro de metadatos si el índice no
+        permite listar). Cada CV se borra del namespace de su pool.
+        
+        Args:
+            file_uuids: UUIDs de los archivos a eliminar
+            chunks_counts: Número de chunks por UUID (los que falten se leen de los metadatos)
+            pool: Pool de todos los CVs (si no se indica, se lee de los metadatos de cada uno)
             
         Returns:
             bool: True si se eliminó correctamente
@@ -274,58 +1307,192 @@ class RAGPipeline:
             if not self.vectorstore:
                 raise ValueError("Pipeline RAG no inicializado")
             
-            # Obtener el índice de Pinecone directamente
-            pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-            index_name = os.getenv("PINECONE_INDEX_NAME", "cv-screener")
-            index = pc.Index(index_name)
+            if not file_uuids:
+                return True
             
-            # Buscar vectores con el prefix cv_{file_uuid}_chunk_
-            prefix = f"cv_{file_uuid}_chunk_"
+            if self.cv_index:
+                await self.executor.run(self.cv_index.delete, file_uuids)
+            try:
+                await self.executor.run(self.lexical_index.delete_uuids, file_uuids)
+            except Exception as lexical_error:
+                print(f"Error al eliminar del índice léxico: {str(lexical_error)}")
+                self.lexical_ready = False
             
-            # Usar query para encontrar todos los vectores con este prefix
-            # Pinecone permite filtrar por metadata, pero necesitamos buscar por ID
-            # Como alternativa, usamos un rango amplio y filtramos por metadata
+            chunks_counts = dict(chunks_counts or {})
+            by_pool: Dict[str, List[str]] = {}
+            for file_uuid in file_uuids:
+                file_pool = pool
+                if file_pool is None or not chunks_counts.get(file_uuid):
+                    metadata = await self.file_manager.get_file_metadata(file_uuid) or {}
+                    if file_pool is None:
+                        file_pool = metadata.get("pool", DEFAULT_POOL)
+                    if not chunks_counts.get(file_uuid):
+                        chunks_counts[file_uuid] = metadata.get("chunks_count", 0)
+                by_pool.setdefault(file_pool, []).append(file_uuid)
             
-            try:
-                # Método 1: Buscar por metadata (más eficiente si hay pocos vectores)
-                query_response = index.query(
-                    vector=[0.0] * 1536,  # Vector dummy para la búsqueda
-                    top_k=1000,  # Buscar muchos resultados
-                    include_metadata=True,
-                    filter={"uuid": {"$eq": file_uuid}}
-                )
-                
-                # Extraer IDs de los resultados
-                ids_to_delete = [match.id for match in query_response.matches]
-                
-                if ids_to_delete:
-                    index.delete(ids=ids_to_delete)
-                    print(f"Eliminados {len(ids_to_delete)} vectores para UUID: {file_uuid}")
-                else:
-                    print(f"No se encontraron vectores para UUID: {file_uuid}")
-                
+            if isinstance(self.vectorstore, LocalVectorStore):
+                deleted = 0
+                for file_pool, pool_uuids in by_pool.items():
+                    store = await self.executor.run(self._vectorstore_for, file_pool)
+                    deleted += await self.executor.run(store.delete_by_uuids, pool_uuids)
+                print(f"Eliminados {deleted} vectores de {len(file_uuids)} CVs")
                 return True
-                
-            except Exception as query_error:
-                print(f"Error en query por metadata, intentando método alternativo: {query_error}")
-                
-                # Método 2: Eliminar por rango de IDs (fallback)
-                # Asumir máximo 200 chunks por archivo
+            
+            index = self.vectorstore.index
+            deleted = 0
+            for file_pool, pool_uuids in by_pool.items():
+                namespace = pool_namespace(file_pool)
                 ids_to_delete = []
-                for i in range(200):
-                    vector_id = f"cv_{file_uuid}_chunk_{i}"
-                    ids_to_delete.append(vector_id)
+                unknown = []
+                for file_uuid in pool_uuids:
+                    if chunks_counts[file_uuid] > 0:
+                        ids_to_delete.extend(
+                            f"cv_{file_uuid}_chunk_{i}" for i in range(chunks_counts[file_uuid])
+                        )
+                    else:
+                        unknown.append(file_uuid)
                 
-                # Intentar eliminar (Pinecone ignora IDs que no existen)
-                index.delete(ids=ids_to_delete)
-                print(f"Eliminación por rango completada para UUID: {file_uuid}")
+                if unknown:
+                    try:
+                        ids_to_delete.extend(await self.executor.run(self._list_vector_ids, index, unknown, namespace))
+                    except Exception as list_error:
+                        # Los índices basados en pods no permiten listar por prefijo
+                        print(f"No se pudieron listar IDs por prefijo, eliminando por filtro: {list_error}")
+                        await self.executor.run(index.delete, filter={"uuid": {"$in": unknown}}, namespace=namespace)
                 
-                return True
+                # Pinecone acepta hasta 1000 IDs por llamada (ignora los que no existen)
+                size = self.delete_batch_size
+                await asyncio.gather(*(
+                    self.executor.run(index.delete, ids=ids_to_delete[start:start + size], namespace=namespace)
+                    for start in range(0, len(ids_to_delete), size)
+                ))
+                deleted += len(ids_to_delete)
+            print(f"Eliminados {deleted} vectores de {len(file_uuids)} CVs")
+            return True
+            
+        except Exception as e:
+            print(f"Error al eliminar vectores para UUIDs {file_uuids}: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _list_vector_ids(index, file_uuids: List[str], namespace: Optional[str] = None) -> List[str]:
+        """Lista los IDs de los vectores de cada CV por el prefijo cv_{uuid}_chunk_"""
+        ids = []
+        for file_uuid in file_uuids:
+            for page in index.list(prefix=f"cv_{file_uuid}_chunk_", namespace=namespace):
+                ids.extend(page)
+        return ids
+    
+    async def delete_pool(self, pool: str) -> bool:
+        """
+        Elimina todos los vectores de una pool en una sola operación: el namespace
+        completo en Pinecone o el directorio de su vector store local
+        
+        Args:
+            pool: Pool a eliminar (no puede ser la pool por defecto)
+            
+        Returns:
+            bool: True si se eliminó correctamente
+        """
+        try:
+            if not self.vectorstore:
+                raise ValueError("Pipeline RAG no inicializado")
+            if not pool:
+                raise ValueError("La pool por defecto no se puede eliminar")
+            
+            try:
+                await self.executor.run(self.lexical_index.delete_pool, pool)
+            except Exception as lexical_error:
+                print(f"Error al eliminar la pool del índice léxico: {str(lexical_error)}")
+                self.lexical_ready = False
+            
+            if isinstance(self.vectorstore, LocalVectorStore):
+                def _remove() -> None:
+                    with self._pool_stores_lock:
+                        store = self._pool_stores.pop(pool, None)
+                        if store is not None:
+                            store.close()
+                        shutil.rmtree(self._local_pool_dir(pool), ignore_errors=True)
+                await self.executor.run(_remove)
+            else:
+                with self._pool_stores_lock:
+                    self._pool_stores.pop(pool, None)
+                try:
+                    await self.executor.run(
+                        self.vectorstore.index.delete, delete_all=True, namespace=pool_namespace(pool)
+                    )
+                except Exception as namespace_error:
+                    # Un namespace sin vectores no existe en Pinecone: no hay nada que borrar
+                    if "not found" not in str(namespace_error).lower():
+                        raise
+            
+            print(f"Vectores de la pool {pool} eliminados")
+            return True
             
         except Exception as e:
-            print(f"Error al eliminar vectores para UUID {file_uuid}: {str(e)}")
+            print(f"Error al eliminar la pool {pool}: {str(e)}")
             return False
     
+    async def pool_vector_counts(self) -> Dict[str, int]:
+        """
+        Número de vectores de cada pool con vectores ("" es la pool por defecto)
+        
+        Returns:
+            Dict pool -> número de vectores
+        """
+        if isinstance(self.vectorstore, LocalVectorStore):
+            counts = {DEFAULT_POOL: (await self.executor.run(self.vectorstore.stats))["total_vector_count"]}
+            pools_dir = self.vectorstore.data_dir.parent / "vector_pools"
+            pools = await self.executor.run(
+                lambda: sorted(path.name for path in pools_dir.iterdir() if path.is_dir()) if pools_dir.exists() else []
+            )
+            for pool in pools:
+                store = await self.executor.run(self._vectorstore_for, pool)
+                count = (await self.executor.run(store.stats))["total_vector_count"]
+                # Como en Pinecone, solo aparecen las pools con vectores
+                if count:
+                    counts[pool] = count
+            return counts
+        
+        stats = await self.executor.run(self.vectorstore.index.describe_index_stats)
+        return self._namespace_pool_counts(stats["namespaces"])
+    
+    @staticmethod
+    def _namespace_pool_counts(namespaces: Optional[Dict[str, Any]]) -> Dict[str, int]:
+        """Vectores por pool a partir de los namespaces de Pinecone (ignora el de vectores de CV)"""
+        counts = {}
+        for namespace, summary in (namespaces or {}).items():
+            pool = namespace_pool(namespace)
+            if pool is not None:
+                counts[pool] = int(summary["vector_count"])
+        return counts
+    
+    async def get_candidate_text(self, file_uuid: str, file_path: Optional[str] = None) -> str:
+        """
+        Obtiene el texto completo de un CV desde la caché, extrayéndolo del PDF solo si falta
+        
+        Args:
+            file_uuid: UUID del archivo
+            file_path: Ruta del PDF (si no se indica, se obtiene de FileManager)
+            
+        Returns:
+            str: Texto del CV, vacío si no se pudo obtener
+        """
+        text = await self.file_manager.get_extracted_text(file_uuid)
+        if text:
+            return text
+        
+        if not file_path:
+            path = await self.file_manager.get_file_path(file_uuid)
+            if not path:
+                return ""
+            file_path = str(path)
+        
+        text = await self._extract_text_from_pdf(file_path)
+        if text:
+            await self.file_manager.save_extracted_text(file_uuid, text)
+        return text
+    
     async def _extract_text_from_pdf(self, file_path: str) -> str:
         """
         Extrae texto de un archivo PDF
@@ -337,12 +1504,8 @@ class RAGPipeline:
             str: Texto extraído
         """
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = pypdf.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text.strip()
+            with tracer.span("extract"):
+                return await self.pdf_extractor.extract_text(file_path)
             
         except Exception as e:
             print(f"Error al extraer texto del PDF {file_path}: {str(e)}")
@@ -350,7 +1513,7 @@ class RAGPipeline:
     
     async def get_vector_stats(self) -> Dict[str, Any]:
         """
-        Obtiene estadísticas del vectorstore
+        Obtiene estadísticas del vectorstore, con el número de vectores de cada pool
         
         Returns:
             Dict con estadísticas
@@ -359,18 +1522,29 @@ class RAGPipeline:
             if not self.vectorstore:
                 return {"error": "Pipeline RAG no inicializado"}
             
-            # Obtener estadísticas del índice
-            pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-            index_name = os.getenv("PINECONE_INDEX_NAME", "cv-screener")
-            index = pc.Index(index_name)
+            if isinstance(self.vectorstore, LocalVectorStore):
+                stats = await self.executor.run(self.vectorstore.stats)
+                return {
+                    "total_vectors": stats["total_vector_count"],
+                    "dimension": stats["dimension"],
+                    "index_name": "local",
+                    "namespaces": {},
+                    "pools": await self.pool_vector_counts(),
+                    "cv_index_ready": self.cv_index_ready,
+                    "lexical_index_ready": self.lexical_ready
+                }
             
-            stats = index.describe_index_stats()
+            # Obtener estadísticas del índice
+            stats = await self.executor.run(self.vectorstore.index.describe_index_stats)
             
             return {
                 "total_vectors": stats.total_vector_count,
                 "dimension": stats.dimension,
-                "index_name": index_name,
-                "namespaces": stats.namespaces if hasattr(stats, 'namespaces') else {}
+                "index_name": self.pinecone_client.index_name,
+                "namespaces": stats.namespaces if hasattr(stats, 'namespaces') else {},
+                "pools": self._namespace_pool_counts(getattr(stats, "namespaces", None)),
+                "cv_index_ready": self.cv_index_ready,
+                "lexical_index_ready": self.lexical_ready
             }
             
         except Exception as e:
@@ -381,9 +1555,21 @@ class RAGPipeline:
     async def cleanup(self):
         """Limpiar recursos"""
         try:
-            if self.vectorstore:
-                # Cerrar conexiones si es necesario
-                pass
+            if isinstance(self.vectorstore, LocalVectorStore):
+                self.vectorstore.close()
+                for store in self._pool_stores.values():
+                    store.close()
+            self._pool_stores.clear()
+            if self.cv_index:
+                self.cv_index.close()
+            self.lexical_index.close()
+            self.pinecone_client.close()
+            if self.http_client:
+                self.http_client.close()
+            if self.http_async_client:
+                await self.http_async_client.aclose()
+            self.pdf_extractor.shutdown()
+            self.embedding_cache.close()
             print("Pipeline RAG limpiado correctamente")
         except Exception as e:
             print(f"Error al limpiar pipeline RAG: {str(e)}")
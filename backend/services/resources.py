@@ -0,0 +1,95 @@
+"""
+Recursos con ciclo de vida de aplicación
+Un único contenedor creado en el lifespan de FastAPI que posee los pools de
+conexiones HTTP (Pinecone, embeddings y LLM), el gestor de archivos, el pipeline
+RAG, la cola de ingesta y el ranking de candidatos. Los endpoints lo reciben
+mediante dependencias.
+"""
+import asyncio
+import os
+from typing import Optional, Tuple
+
+import httpx
+
+from services.candidate_ranker import CandidateRanker
+from services.file_manager import FileManager
+from services.ingestion_queue import IngestionQueue
+from services.rag_pipeline import RAGPipeline
+from store.pinecone_client import PineconeClient
+
+
+def create_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    Crea los clientes HTTP compartidos por las llamadas de embeddings y del LLM
+
+    Returns:
+        Tupla (cliente síncrono, cliente asíncrono) con conexiones keep-alive
+    """
+    pool_size = int(os.getenv("HTTP_POOL_SIZE", "32"))
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+    )
+    timeout = httpx.Timeout(float(os.getenv("HTTP_TIMEOUT", "60")))
+    return httpx.Client(limits=limits, timeout=timeout), httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+class AppResources:
+    """Contenedor de los recursos de larga duración de la aplicación"""
+
+    def __init__(self, file_manager: Optional[FileManager] = None):
+        self.file_manager = file_manager or FileManager()
+        # Pool de hilos acotado (RAG_MAX_WORKERS) para todo el trabajo bloqueante de la aplicación
+        self.executor = self.file_manager.executor
+        self.http_client = None
+        self.http_async_client = None
+        self.pinecone_client = None
+        self.rag_pipeline = None
+        self.ingestion_queue = None
+        self.candidate_ranker = None
+        self._backfill = None
+
+    async def startup(self) -> None:
+        """Abre los pools de conexiones, inicializa el pipeline RAG y arranca la cola de ingesta"""
+        self.http_client, self.http_async_client = create_http_clients()
+        self.pinecone_client = PineconeClient(executor=self.executor)
+        self.rag_pipeline = RAGPipeline(
+            self.file_manager,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            pinecone_client=self.pinecone_client,
+            executor=self.executor
+        )
+        await self.rag_pipeline.initialize()
+        self.candidate_ranker = CandidateRanker(self.rag_pipeline, self.file_manager)
+        # Perfiles, índice léxico y vectores de CV de los CVs procesados antes de existir (en segundo plano)
+        self._backfill = asyncio.create_task(self._run_backfills())
+        # Arrancar los workers de ingesta en segundo plano
+        self.ingestion_queue = IngestionQueue(
+            self.rag_pipeline,
+            self.file_manager,
+            db_path=self.file_manager.data_dir / "ingestion_queue.db",
+            executor=self.executor
+        )
+        await self.ingestion_queue.start()
+
+    async def _run_backfills(self) -> None:
+        """Completa los perfiles, el índice léxico y el índice por CV; después se activan las consultas que los usan"""
+        await self.rag_pipeline.backfill_profiles()
+        await self.rag_pipeline.backfill_lexical_index()
+        await self.rag_pipeline.backfill_cv_index()
+
+    async def close(self) -> None:
+        """Detiene la cola de ingesta y cierra el pipeline, el gestor de archivos y sus conexiones"""
+        if self._backfill and not self._backfill.done():
+            self._backfill.cancel()
+        if self.ingestion_queue:
+            await self.ingestion_queue.stop()
+        if self.rag_pipeline:
+            await self.rag_pipeline.cleanup()
+        self.executor.shutdown(wait=False)
+        self.file_manager.close()
+        self.ingestion_queue = None
+        self.candidate_ranker = None
+        self.rag_pipeline = None
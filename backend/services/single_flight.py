@@ -0,0 +1,42 @@
+"""
+Deduplicación de llamadas concurrentes idénticas (single-flight)
+Mientras una operación con una clave está en curso, las peticiones con la misma
+clave esperan su resultado en lugar de repetirla.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Comparte una única ejecución en curso entre las peticiones con la misma clave"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Ejecuta func(*args, **kwargs) salvo que ya haya una ejecución en curso con la misma clave
+
+        Args:
+            key: Clave de deduplicación
+            func: Corrutina a ejecutar
+
+        Returns:
+            Resultado de la ejecución (el mismo para todas las peticiones que la comparten)
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.followers += 1
+        # shield: si una petición se cancela (p. ej. el cliente se desconecta) el resto sigue esperando
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Ejecuciones propias, peticiones que se sumaron a una en curso y ejecuciones activas"""
+        return {"leaders": self.leaders, "followers": self.followers, "inflight": len(self._inflight)}
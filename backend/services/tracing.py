@@ -0,0 +1,202 @@
+"""
+Trazas de latencia por etapa
+Spans ligeros alrededor de las etapas del camino crítico (extracción, chunking,
+embeddings, upsert y consulta de vectores, LLM, metadatos). Cada span se acumula
+en un histograma en memoria con p50/p95/p99 por etapa y, dentro de una petición
+HTTP, en la cabecera Server-Timing de la respuesta. Con TRACING_ENABLED=false
+span() devuelve un contexto vacío compartido y no mide nada.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# Límites superiores de las cubetas en ms: geométricos de 0.05 ms a ~5 min (error relativo < 20 %)
+BUCKET_BOUNDS: List[float] = [round(0.05 * 1.2 ** i, 4) for i in range(87)]
+
+# Duración y número de spans por etapa de la petición en curso (None fuera de una petición)
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_timings", default=None)
+
+_NOOP = nullcontext()
+
+
+class LatencyHistogram:
+    """Histograma de latencias con cubetas geométricas fijas (memoria constante)"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, duration_ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, duration_ms)] += 1
+        self.count += 1
+        self.total += duration_ms
+        self.max = max(self.max, duration_ms)
+
+    def percentile(self, q: float) -> float:
+        """
+        Percentil estimado por interpolación lineal dentro de la cubeta
+
+        Args:
+            q: Percentil entre 0 y 1
+
+        Returns:
+            float: Latencia en ms (0 si no hay muestras)
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= target:
+                lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                estimate = lower + (upper - lower) * (target - cumulative) / bucket_count
+                return min(estimate, self.max)
+            cumulative += bucket_count
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(self.max, 3)
+        }
+
+
+class _Span:
+    """Mide el bloque y registra la duración al salir (también si hay excepción)"""
+
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.tracer.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Tracer:
+    """Registro de spans por etapa: histogramas del proceso y tiempos de la petición en curso"""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        """
+        Args:
+            enabled: Activar las trazas (TRACING_ENABLED, activadas por defecto)
+        """
+        if enabled is None:
+            enabled = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str):
+        """
+        Contexto que mide una etapa: with tracer.span("embed"): ...
+
+        Args:
+            name: Nombre de la etapa (token válido de Server-Timing: letras, dígitos, "_" o ".")
+        """
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name)
+
+    def record(self, name: str, duration_ms: float) -> None:
+        """
+        Registra la duración de una etapa en su histograma y en la petición en curso (los spans
+        de una petición pueden terminar a la vez en varios hilos del executor: todo bajo el lock)
+        """
+        timings = _request_timings.get()
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.observe(duration_ms)
+            if timings is not None:
+                entry = timings.setdefault(name, [0.0, 0])
+                entry[0] += duration_ms
+                entry[1] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Resumen (count, media, p50/p95/p99 y máximo en ms) de cada etapa"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+# Instancia compartida por los servicios y el middleware
+tracer = Tracer()
+
+
+def server_timing_header(timings: Dict[str, List[float]], total_ms: float) -> str:
+    """
+    Valor de la cabecera Server-Timing: una entrada por etapa con la duración acumulada
+    (los spans concurrentes se suman) y el número de spans si hay más de uno
+
+    Args:
+        timings: Dict etapa -> [ms acumulados, número de spans]
+        total_ms: Duración total de la petición hasta la cabecera
+    """
+    entries = []
+    for name, (duration_ms, count) in timings.items():
+        entry = f"{name};dur={duration_ms:.1f}"
+        if count > 1:
+            entry += f';desc="{count} spans"'
+        entries.append(entry)
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que recoge los spans de cada petición y los añade en Server-Timing.
+    También registra la duración de cada ruta (http.{método} {plantilla de la ruta}).
+    En las respuestas en streaming la cabecera solo incluye lo medido antes del primer byte.
+    """
+
+    def __init__(self, app, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Dict[str, List[float]] = {}
+        token = _request_timings.set(timings)
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                # Bajo el lock del tracer: los hilos del executor pueden seguir añadiendo spans
+                with self.tracer._lock:
+                    header = server_timing_header(timings, (time.perf_counter() - start) * 1000)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # Plantilla de la ruta (no la URL) para no crear un histograma por UUID
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                self.tracer.record(f"http.{scope['method']} {route.path}", (time.perf_counter() - start) * 1000)
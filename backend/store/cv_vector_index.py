@@ -0,0 +1,102 @@
+"""
+Índice de un vector por CV (media normalizada de los vectores de sus chunks)
+Permite seleccionar primero los CVs más relevantes y buscar después solo entre
+sus chunks. Con el backend local es un LocalVectorStore propio (data/cv_vectors);
+con Pinecone es un namespace separado del mismo índice.
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from store.local_vector_store import LocalVectorStore
+
+
+def mean_vector(vectors: List[List[float]]) -> List[float]:
+    """Media de los vectores normalizados, normalizada (centroide en el espacio coseno)"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    mean = matrix.mean(axis=0)
+    return (mean / max(float(np.linalg.norm(mean)), 1e-12)).tolist()
+
+
+class CVVectorIndex:
+    """Vectores a nivel de CV sobre un LocalVectorStore o un namespace de Pinecone"""
+
+    def __init__(self, local_store: Optional[LocalVectorStore] = None, pinecone_index: Optional[Any] = None, namespace: Optional[str] = None):
+        """
+        Args:
+            local_store: Vector store local dedicado a los vectores de CV
+            pinecone_index: Índice de Pinecone (si no hay local_store)
+            namespace: Namespace de Pinecone de los vectores de CV (PINECONE_CV_NAMESPACE)
+        """
+        self.local_store = local_store
+        self.pinecone_index = pinecone_index
+        self.namespace = namespace or os.getenv("PINECONE_CV_NAMESPACE", "cv-summaries")
+
+    def upsert(self, vectors: Dict[str, List[float]], metadata: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """
+        Inserta o reemplaza el vector de varios CVs
+
+        Args:
+            vectors: Dict UUID -> vector del CV
+            metadata: Dict UUID -> metadatos adicionales
+        """
+        metadata = metadata or {}
+        records = [
+            {"id": file_uuid, "values": vector, "metadata": {**metadata.get(file_uuid, {}), "uuid": file_uuid}}
+            for file_uuid, vector in vectors.items()
+        ]
+        if not records:
+            return
+        if self.local_store is not None:
+            self.local_store.upsert(records)
+        else:
+            for start in range(0, len(records), 200):
+                self.pinecone_index.upsert(vectors=records[start:start + 200], namespace=self.namespace)
+
+    def search(self, vector: List[float], k: int) -> List[Tuple[str, float]]:
+        """
+        Los k CVs con el vector más similar
+
+        Args:
+            vector: Embedding de la consulta
+            k: Número de CVs
+
+        Returns:
+            Lista de (UUID, similitud) ordenada de mayor a menor
+        """
+        if self.local_store is not None:
+            results = self.local_store.similarity_search_by_vector_with_score(vector, k=k)
+            return [(document.metadata["uuid"], score) for document, score in results]
+        response = self.pinecone_index.query(vector=vector, top_k=k, namespace=self.namespace, include_metadata=False)
+        return [(match["id"], float(match["score"])) for match in response["matches"]]
+
+    def delete(self, file_uuids: List[str]) -> None:
+        """Elimina el vector de varios CVs (los que no existen se ignoran)"""
+        if not file_uuids:
+            return
+        if self.local_store is not None:
+            self.local_store.delete(ids=file_uuids)
+        else:
+            for start in range(0, len(file_uuids), 1000):
+                self.pinecone_index.delete(ids=file_uuids[start:start + 1000], namespace=self.namespace)
+
+    def uuids(self) -> List[str]:
+        """UUIDs de los CVs con vector"""
+        if self.local_store is not None:
+            return self.local_store.ids()
+        return [file_uuid for page in self.pinecone_index.list(namespace=self.namespace) for file_uuid in page]
+
+    def count(self) -> int:
+        """Número de CVs con vector"""
+        if self.local_store is not None:
+            return self.local_store.stats()["total_vector_count"]
+        namespaces = self.pinecone_index.describe_index_stats()["namespaces"] or {}
+        summary = namespaces.get(self.namespace)
+        return int(summary["vector_count"]) if summary else 0
+
+    def close(self) -> None:
+        """Cierra el vector store local"""
+        if self.local_store is not None:
+            self.local_store.close()
@@ -0,0 +1,250 @@
+"""
+Índice léxico (BM25) de los chunks de los CVs en SQLite FTS5
+Complementa la búsqueda por vectores en las consultas de términos exactos
+("Kubernetes", "PMP", "Django"): se actualiza con cada ingesta y borrado, se
+guarda en disco y solo se abre al usarse por primera vez.
+"""
+import json
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from store.local_vector_store import _matches
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunk_rows (
+    id INTEGER PRIMARY KEY,
+    vector_id TEXT NOT NULL UNIQUE,
+    uuid TEXT NOT NULL,
+    pool TEXT NOT NULL DEFAULT '',
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunk_rows_uuid ON chunk_rows (uuid);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunk_text USING fts5(text, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+# Palabras sin valor para la búsqueda léxica (se ignoran en las consultas)
+STOPWORDS = set("""
+    a al algo algun alguna alguno algunos algunas and con cual cuales de del donde el ella en entre es esta
+    estan este for hay in la las lo los me mi muestra muestrame o of on or para por que quien quienes se
+    sin sobre su sus the to tiene tienen un una uno unos unas y with who candidato candidatos cv cvs perfil
+    perfiles sabe saben conoce conocen busca buscar dame lista listar
+""".split())
+
+# Constante k de Reciprocal Rank Fusion
+RRF_K = 60
+
+
+def query_tokens(text: str) -> List[str]:
+    """Palabras de un texto en minúsculas y sin acentos (incluidas las stopwords)"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"\w+", text)
+
+
+def query_terms(text: str) -> List[str]:
+    """Términos de búsqueda de un texto (sin acentos, sin stopwords, sin repetir)"""
+    return list(dict.fromkeys(word for word in query_tokens(text) if word not in STOPWORDS))
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = RRF_K) -> List[Document]:
+    """
+    Combina varias listas ordenadas de documentos por Reciprocal Rank Fusion
+    (cada documento suma 1 / (k + posición) en cada lista en la que aparece)
+
+    Args:
+        rankings: Listas de documentos, de más a menos relevante
+        k: Constante de suavizado
+
+    Returns:
+        Documentos sin repetir, de mayor a menor puntuación combinada
+    """
+    scores: Dict[Hashable, float] = {}
+    documents: Dict[Hashable, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            key = _document_key(document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=lambda key: -scores[key])]
+
+
+def _document_key(document: Document) -> Hashable:
+    """Identidad de un chunk en los distintos índices (CV y posición)"""
+    metadata = document.metadata
+    if metadata.get("uuid") is not None and metadata.get("chunk_index") is not None:
+        return (metadata["uuid"], metadata["chunk_index"])
+    return document.page_content
+
+
+class LexicalIndex:
+    """Índice invertido BM25 de los chunks, persistente y de carga perezosa"""
+
+    def __init__(self, db_path: Path):
+        """
+        Args:
+            db_path: Ruta de la base de datos
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abre la base de datos en el primer uso (llamar con el lock adquirido)"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SCHEMA)
+            # Índices creados antes de las pools: sus chunks son de la pool por defecto
+            if "pool" not in {row[1] for row in conn.execute("PRAGMA table_info(chunk_rows)")}:
+                conn.execute("ALTER TABLE chunk_rows ADD COLUMN pool TEXT NOT NULL DEFAULT ''")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_rows_pool ON chunk_rows (pool)")
+            self._conn = conn
+        return self._conn
+
+    def add(self, records: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """
+        Indexa chunks; los chunks anteriores de los mismos CVs se reemplazan
+
+        Args:
+            records: Lista de (id del vector, texto, metadatos con uuid y, fuera de la pool por defecto, pool)
+        """
+        if not records:
+            return
+        file_uuids = list(dict.fromkeys(metadata.get("uuid", "") for _, _, metadata in records))
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_rows(conn, file_uuids)
+                for vector_id, text, metadata in records:
+                    row_id = conn.execute(
+                        "INSERT INTO chunk_rows (vector_id, uuid, pool, metadata) VALUES (?, ?, ?, ?)",
+                        (vector_id, metadata.get("uuid", ""), metadata.get("pool", ""), json.dumps(metadata, ensure_ascii=False))
+                    ).lastrowid
+                    conn.execute("INSERT INTO chunk_text (rowid, text) VALUES (?, ?)", (row_id, text))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _delete_rows(conn: sqlite3.Connection, file_uuids: List[str]) -> int:
+        deleted = 0
+        for start in range(0, len(file_uuids), 500):
+            batch = file_uuids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            conn.execute(
+                f"DELETE FROM chunk_text WHERE rowid IN (SELECT id FROM chunk_rows WHERE uuid IN ({placeholders}))", batch
+            )
+            deleted += conn.execute(f"DELETE FROM chunk_rows WHERE uuid IN ({placeholders})", batch).rowcount
+        return deleted
+
+    def delete_uuids(self, file_uuids: List[str]) -> int:
+        """
+        Elimina los chunks de varios CVs
+
+        Returns:
+            int: Número de chunks eliminados
+        """
+        if not file_uuids:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._delete_rows(conn, list(file_uuids))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return deleted
+
+    def delete_pool(self, pool: str) -> int:
+        """
+        Elimina los chunks de todos los CVs de una pool
+
+        Returns:
+            int: Número de chunks eliminados
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM chunk_text WHERE rowid IN (SELECT id FROM chunk_rows WHERE pool = ?)", (pool,))
+                deleted = conn.execute("DELETE FROM chunk_rows WHERE pool = ?", (pool,)).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return deleted
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        pool: str = ""
+    ) -> List[Tuple[Document, float]]:
+        """
+        Chunks que contienen alguno de los términos de la consulta, ordenados por BM25
+
+        Args:
+            query: Texto de la consulta
+            k: Número de resultados
+            filter: Filtro de metadatos al estilo Pinecone
+            pool: Pool en la que se busca ("" para la pool por defecto)
+
+        Returns:
+            Lista de (documento, puntuación BM25), de mayor a menor
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        # Con filtro se piden más filas porque algunas se descartan después
+        limit = k * 4 if filter else k
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT r.vector_id, r.metadata, t.text, bm25(chunk_text) AS rank "
+                "FROM chunk_text t JOIN chunk_rows r ON r.id = t.rowid "
+                "WHERE chunk_text MATCH ? AND r.pool = ? ORDER BY rank LIMIT ?",
+                (match, pool, limit)
+            ).fetchall()
+
+        results = []
+        for vector_id, metadata, text, rank in rows:
+            metadata = json.loads(metadata)
+            if not _matches(metadata, filter):
+                continue
+            # bm25() de FTS5 es negativo: cuanto menor, más relevante
+            results.append((Document(page_content=text, metadata=metadata, id=vector_id), -rank))
+        return results[:k]
+
+    def uuids(self) -> Set[str]:
+        """UUIDs de los CVs indexados"""
+        with self._lock:
+            return {row[0] for row in self._connection().execute("SELECT DISTINCT uuid FROM chunk_rows")}
+
+    def count(self) -> int:
+        """Número de chunks indexados"""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM chunk_rows").fetchone()[0]
+
+    def pool_counts(self) -> Dict[str, int]:
+        """Número de chunks indexados por pool"""
+        with self._lock:
+            return dict(self._connection().execute("SELECT pool, COUNT(*) FROM chunk_rows GROUP BY pool"))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,476 @@
+"""
+Vector store local con NumPy
+Los vectores se guardan normalizados en una matriz float32 mapeada en memoria
+(vectors.f32) y los IDs y metadatos en una tabla SQLite. La búsqueda es un
+producto matricial con top-k vectorizado, sin salto de red.
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+
+# Operadores de filtro admitidos
+FILTER_OPERATORS = ("$eq", "$ne", "$in", "$nin")
+
+
+def _matches(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evalúa un filtro de metadatos al estilo Pinecone ({"campo": valor},
+    {"campo": {"$eq"|"$ne"|"$in"|"$nin": ...}}). En los campos con listas de valores
+    (p. ej. sections) $eq y $ne comprueban si el valor está en la lista, y $in y $nin
+    si alguno de sus elementos está en la lista esperada
+    """
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if isinstance(value, list):
+            for operator, expected in condition.items():
+                if operator == "$eq" and expected not in value:
+                    return False
+                if operator == "$ne" and expected in value:
+                    return False
+                if operator == "$in" and not set(value) & set(expected):
+                    return False
+                if operator == "$nin" and set(value) & set(expected):
+                    return False
+            continue
+        for operator, expected in condition.items():
+            if operator == "$eq" and value != expected:
+                return False
+            if operator == "$ne" and value == expected:
+                return False
+            if operator == "$in" and value not in expected:
+                return False
+            if operator == "$nin" and value in expected:
+                return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+    """Vector store persistente en disco con búsqueda por similitud coseno en NumPy"""
+
+    def __init__(self, embedding: Embeddings, data_dir: Optional[Path] = None, initial_capacity: int = 1024):
+        """
+        Args:
+            embedding: Embeddings para textos y consultas
+            data_dir: Directorio de los datos (por defecto data/vector_store)
+            initial_capacity: Filas reservadas al crear la matriz
+        """
+        project_root = Path(__file__).parent.parent.parent
+        self.data_dir = Path(data_dir) if data_dir else project_root / "data" / "vector_store"
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._embedding = embedding
+        self.initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(str(self.data_dir / "metadata.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                uuid TEXT,
+                metadata TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_uuid ON vectors (uuid)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+        dimension = self._conn.execute("SELECT value FROM settings WHERE key = 'dimension'").fetchone()
+        self.dimension = int(dimension[0]) if dimension else None
+        self._matrix = None
+        self._capacity = 0
+        # Agrupación de filas por CV para puntuar CVs completos (se recalcula tras cada cambio)
+        self._groups = None
+        # Filas de cada valor de cada campo filtrado (campo -> valor -> filas), también por cambio
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _load(self) -> None:
+        """Carga la tabla de metadatos en memoria y mapea la matriz de vectores"""
+        rows = self._conn.execute("SELECT row, id, metadata FROM vectors").fetchall()
+        self._count = max((row for row, _, _ in rows), default=-1) + 1
+        self._ids: Dict[str, int] = {}
+        self._rows: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        for row, vector_id, metadata in rows:
+            self._ids[vector_id] = row
+            self._rows[row] = (vector_id, json.loads(metadata))
+        self._free = [row for row in range(self._count) if row not in self._rows]
+        self._alive = np.zeros(max(self._count, 1), dtype=bool)
+        self._alive[list(self._rows)] = True
+        if self.dimension:
+            self._map(max(self._count, self.initial_capacity))
+
+    def _map(self, capacity: int) -> None:
+        """Mapea (y si hace falta amplía) el archivo de vectores a la capacidad indicada"""
+        path = self.data_dir / "vectors.f32"
+        size = capacity * self.dimension * 4
+        if not path.exists() or path.stat().st_size < size:
+            with open(path, "ab") as file:
+                file.truncate(size)
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        self._capacity = capacity
+        if len(self._alive) < capacity:
+            self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+
+    def _allocate_row(self) -> int:
+        """Devuelve una fila libre, ampliando la matriz al doble si está llena"""
+        if self._free:
+            return self._free.pop()
+        if self._count >= self._capacity:
+            self._map(max(self._capacity * 2, self.initial_capacity))
+        self._count += 1
+        return self._count - 1
+
+    def upsert(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Inserta o reemplaza vectores ya calculados (mismo formato que los upserts de Pinecone)
+
+        Args:
+            records: Lista de {"id", "values", "metadata"} con el texto en metadata["text"]
+        """
+        if not records:
+            return
+        vectors = np.asarray([record["values"] for record in records], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO settings (key, value) VALUES ('dimension', ?)", (str(self.dimension),)
+                )
+                self._map(self.initial_capacity)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Dimensión {vectors.shape[1]} distinta de la del índice ({self.dimension})")
+
+            db_rows = []
+            for record, vector in zip(records, vectors):
+                row = self._ids.get(record["id"])
+                if row is None:
+                    row = self._allocate_row()
+                metadata = record.get("metadata") or {}
+                self._matrix[row] = vector
+                self._alive[row] = True
+                self._ids[record["id"]] = row
+                self._rows[row] = (record["id"], metadata)
+                db_rows.append((row, record["id"], metadata.get("uuid"), json.dumps(metadata, ensure_ascii=False)))
+
+            self._groups = None
+            self._postings = {}
+            self._matrix.flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (row, id, uuid, metadata) VALUES (?, ?, ?, ?)", db_rows
+            )
+            self._conn.commit()
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [f"doc_{self._count + i}" for i in range(len(texts))]
+        vectors = self._embedding.embed_documents(texts)
+        self.upsert([
+            {"id": vector_id, "values": vector, "metadata": {**metadata, "text": text}}
+            for vector_id, vector, metadata, text in zip(ids, vectors, metadatas, texts)
+        ])
+        return ids
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Busca los k vectores más similares (coseno) que cumplen el filtro
+
+        Args:
+            embedding: Vector de la consulta
+            k: Número de resultados
+            filter: Filtro de metadatos al estilo Pinecone
+
+        Returns:
+            Lista de (Document, similitud)
+        """
+        with self._lock:
+            if not self._rows:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1)
+
+            scores = self._matrix[:self._count] @ query
+            mask = self._alive[:self._count].copy()
+            if filter:
+                mask &= self._filter_mask(filter)
+            scores = np.where(mask, scores, -np.inf)
+
+            k = min(k, int(mask.sum()))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            for row in top:
+                vector_id, metadata = self._rows[int(row)]
+                metadata = dict(metadata)
+                text = metadata.pop("text", "")
+                results.append((Document(page_content=text, metadata=metadata, id=vector_id), float(scores[row])))
+            return results
+
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        """
+        Máscara de las filas que cumplen el filtro (llamar con el lock adquirido): se combina
+        la máscara de cada valor desde las filas precalculadas por campo y valor, sin evaluar
+        el filtro fila a fila
+        """
+        mask = np.ones(self._count, dtype=bool)
+        try:
+            for key, condition in filter.items():
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for operator, expected in condition.items():
+                    if operator not in FILTER_OPERATORS:
+                        continue
+                    values = expected if operator in ("$in", "$nin") else [expected]
+                    value_mask = self._value_mask(key, values)
+                    mask &= value_mask if operator in ("$eq", "$in") else ~value_mask
+        except TypeError:
+            # Valores no hashables: evaluación fila a fila
+            mask = np.zeros(self._count, dtype=bool)
+            for row, (_, metadata) in self._rows.items():
+                mask[row] = _matches(metadata, filter)
+        return mask
+
+    def _value_mask(self, key: str, values: Iterable[Any]) -> np.ndarray:
+        """Filas cuyo campo es (o, si es una lista, contiene) alguno de los valores"""
+        postings = self._postings.get(key)
+        if postings is None:
+            rows_by_value: Dict[Any, List[int]] = {}
+            for row, (_, metadata) in self._rows.items():
+                value = metadata.get(key)
+                for item in value if isinstance(value, list) else [value]:
+                    rows_by_value.setdefault(item, []).append(row)
+            postings = {item: np.asarray(rows, dtype=np.int64) for item, rows in rows_by_value.items()}
+            self._postings[key] = postings
+        mask = np.zeros(self._count, dtype=bool)
+        for value in values:
+            rows = postings.get(value)
+            if rows is not None:
+                mask[rows] = True
+        return mask
+
+    def _uuid_groups(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Filas vivas, código de CV de cada fila y UUIDs (llamar con el lock adquirido)
+
+        Returns:
+            Tupla (filas, códigos, uuids) donde uuids[códigos[i]] es el CV de filas[i]
+        """
+        if self._groups is None:
+            rows = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+            uuids, codes = np.unique(
+                [self._rows[int(row)][1].get("uuid", "") for row in rows], return_inverse=True
+            )
+            self._groups = (rows, codes.reshape(-1), uuids)
+        return self._groups
+
+    def max_scores_by_uuid(self, embedding: List[float]) -> Dict[str, float]:
+        """
+        Puntúa todos los CVs a la vez: similitud coseno máxima entre la consulta y sus chunks
+
+        Args:
+            embedding: Vector de la consulta
+
+        Returns:
+            Dict UUID -> similitud del chunk más parecido
+        """
+        with self._lock:
+            if not self._rows:
+                return {}
+            rows, codes, uuids = self._uuid_groups()
+
+            query = np.asarray(embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1)
+            # Producto sobre el slice contiguo (vista del memmap) y después selección de filas:
+            # indexar la matriz con la lista de filas copiaría todos los vectores a memoria
+            scores = (self._matrix[:self._count] @ query)[rows]
+            best = np.full(len(uuids), -np.inf, dtype=np.float32)
+            np.maximum.at(best, codes, scores)
+            return {str(uuid): float(score) for uuid, score in zip(uuids, best) if uuid}
+
+    def mean_vectors_by_uuid(self) -> Dict[str, List[float]]:
+        """
+        Vector medio (normalizado) de los chunks de cada CV
+
+        Returns:
+            Dict UUID -> vector medio
+        """
+        with self._lock:
+            if not self._rows:
+                return {}
+            rows, codes, uuids = self._uuid_groups()
+            row_codes = np.full(self._count, -1, dtype=np.int64)
+            row_codes[rows] = codes
+            sums = np.zeros((len(uuids), self.dimension), dtype=np.float32)
+            # Por bloques de filas contiguas para no copiar toda la matriz a memoria
+            for start in range(0, self._count, 8192):
+                end = min(start + 8192, self._count)
+                block_codes = row_codes[start:end]
+                alive = block_codes >= 0
+                np.add.at(sums, block_codes[alive], self._matrix[start:end][alive])
+            sums /= np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+            return {str(uuid): vector.tolist() for uuid, vector in zip(uuids, sums) if uuid}
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # Similitud coseno en [-1, 1] -> relevancia en [0, 1]
+        return lambda score: (score + 1) / 2
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Elimina vectores por ID
+
+        Args:
+            ids: IDs a eliminar (se ignoran los que no existen)
+        """
+        with self._lock:
+            rows = [self._ids.pop(vector_id) for vector_id in ids or [] if vector_id in self._ids]
+            self._release(rows)
+        return True
+
+    def delete_by_uuid(self, file_uuid: str) -> int:
+        """
+        Elimina todos los vectores de un CV
+
+        Args:
+            file_uuid: UUID del archivo
+
+        Returns:
+            int: Número de vectores eliminados
+        """
+        return self.delete_by_uuids([file_uuid])
+
+    def delete_by_uuids(self, file_uuids: List[str]) -> int:
+        """
+        Elimina todos los vectores de varios CVs
+
+        Args:
+            file_uuids: UUIDs de los archivos
+
+        Returns:
+            int: Número de vectores eliminados
+        """
+        rows = []
+        with self._lock:
+            for start in range(0, len(file_uuids), 500):
+                block = file_uuids[start:start + 500]
+                placeholders = ",".join("?" * len(block))
+                rows.extend(
+                    row for (row,) in self._conn.execute(
+                        f"SELECT row FROM vectors WHERE uuid IN ({placeholders})", block
+                    )
+                )
+            for row in rows:
+                self._ids.pop(self._rows[row][0], None)
+            self._release(rows)
+        return len(rows)
+
+    def _release(self, rows: List[int]) -> None:
+        """Marca filas como libres y borra sus metadatos (llamar con el lock adquirido)"""
+        if not rows:
+            return
+        for row in rows:
+            self._rows.pop(row, None)
+            self._alive[row] = False
+        self._free.extend(rows)
+        self._groups = None
+        self._postings = {}
+        self._conn.executemany("DELETE FROM vectors WHERE row = ?", [(row,) for row in rows])
+        self._conn.commit()
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        with self._lock:
+            documents = []
+            for vector_id in ids:
+                row = self._ids.get(vector_id)
+                if row is None:
+                    continue
+                metadata = dict(self._rows[row][1])
+                text = metadata.pop("text", "")
+                documents.append(Document(page_content=text, metadata=metadata, id=vector_id))
+            return documents
+
+    def ids(self) -> List[str]:
+        """IDs de todos los vectores guardados"""
+        with self._lock:
+            return list(self._ids)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del índice (mismas claves que describe_index_stats de Pinecone)"""
+        with self._lock:
+            return {
+                "total_vector_count": len(self._rows),
+                "dimension": self.dimension,
+                "capacity": self._capacity,
+                "data_dir": str(self.data_dir)
+            }
+
+    def close(self) -> None:
+        """Vuelca la matriz a disco y cierra la base de datos"""
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._conn.close()
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        data_dir: Optional[Path] = None,
+        **kwargs: Any
+    ) -> "LocalVectorStore":
+        store = cls(embedding, data_dir=data_dir)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -1,96 +1,135 @@
 """
 Cliente para interacción con Pinecone
+Una única instancia por aplicación: el cliente y el índice comparten un pool de
+conexiones HTTP persistente, en lugar de crear un cliente en cada llamada.
 """
 import os
 from typing import List, Dict, Any, Optional
-import pinecone
+from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
 
+from services.executor import BlockingExecutor
+
 load_dotenv()
 
 class PineconeClient:
     """Cliente para operaciones con Pinecone"""
-    
-    def __init__(self):
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        index_name: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        executor: Optional[BlockingExecutor] = None
+    ):
+        """
+        Args:
+            api_key: API key de Pinecone (PINECONE_API_KEY)
+            index_name: Nombre del índice (PINECONE_INDEX_NAME)
+            pool_size: Conexiones HTTP del pool e hilos del cliente (PINECONE_POOL_SIZE)
+            executor: Pool de hilos para las llamadas bloqueantes (el compartido de la aplicación)
+        """
+        self.api_key = api_key or os.getenv("PINECONE_API_KEY")
+        self.index_name = index_name or os.getenv("PINECONE_INDEX_NAME", "cv-screener")
+        self.pool_size = pool_size or int(os.getenv("PINECONE_POOL_SIZE", "32"))
+        self.executor = executor or BlockingExecutor()
+        self.client = None
         self.index = None
-        self.index_name = os.getenv("PINECONE_INDEX_NAME", "cv-screener")
-        
-    async def initialize(self):
-        """Inicializar conexión con Pinecone"""
+
+    def connect(self):
+        """
+        Conecta con el índice (creándolo si no existe) y lo reutiliza en llamadas posteriores
+
+        Returns:
+            Index: Índice de Pinecone con su pool de conexiones
+        """
+        if self.index is not None:
+            return self.index
+
         try:
-            pinecone.init(
-                api_key=os.getenv("PINECONE_API_KEY"),
-                environment=os.getenv("PINECONE_ENVIRONMENT")
-            )
-            
+            self.client = Pinecone(api_key=self.api_key, pool_threads=self.pool_size)
+
             # Obtener o crear índice
-            if self.index_name not in pinecone.list_indexes():
-                pinecone.create_index(
+            existing_indexes = [index.name for index in self.client.list_indexes()]
+            if self.index_name not in existing_indexes:
+                self.client.create_index(
                     name=self.index_name,
                     dimension=1536,  # Dimensión de OpenAI embeddings
-                    metric="cosine"
+                    metric="cosine",
+                    spec=ServerlessSpec(
+                        cloud=os.getenv("PINECONE_CLOUD", "aws"),
+                        region=os.getenv("PINECONE_REGION", "us-east-1")
+                    )
                 )
-            
-            self.index = pinecone.Index(self.index_name)
+
+            self.index = self.client.Index(
+                self.index_name,
+                pool_threads=self.pool_size,
+                connection_pool_maxsize=self.pool_size
+            )
             print(f"Conectado al índice Pinecone: {self.index_name}")
-            
+            return self.index
+
         except Exception as e:
             print(f"Error al conectar con Pinecone: {str(e)}")
             raise
-    
+
+    async def initialize(self):
+        """Inicializar conexión con Pinecone"""
+        await self.executor.run(self.connect)
+
     async def upsert_vectors(self, vectors: List[Dict[str, Any]]) -> None:
         """Insertar o actualizar vectores en Pinecone"""
         try:
-            if not self.index:
-                await self.initialize()
-            
-            self.index.upsert(vectors=vectors)
+            index = await self.executor.run(self.connect)
+            await self.executor.run(index.upsert, vectors=vectors)
             print(f"Insertados {len(vectors)} vectores en Pinecone")
-            
+
         except Exception as e:
             print(f"Error al insertar vectores: {str(e)}")
             raise
-    
+
     async def query_vectors(self, query_vector: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
         """Consultar vectores similares"""
         try:
-            if not self.index:
-                await self.initialize()
-            
-            results = self.index.query(
+            index = await self.executor.run(self.connect)
+            results = await self.executor.run(
+                index.query,
                 vector=query_vector,
                 top_k=top_k,
                 include_metadata=True
             )
-            
+
             return results['matches']
-            
+
         except Exception as e:
             print(f"Error al consultar vectores: {str(e)}")
             raise
-    
+
     async def delete_vectors(self, ids: List[str]) -> None:
         """Eliminar vectores por IDs"""
         try:
-            if not self.index:
-                await self.initialize()
-            
-            self.index.delete(ids=ids)
+            index = await self.executor.run(self.connect)
+            await self.executor.run(index.delete, ids=ids)
             print(f"Eliminados {len(ids)} vectores de Pinecone")
-            
+
         except Exception as e:
             print(f"Error al eliminar vectores: {str(e)}")
             raise
-    
+
     async def get_index_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del índice"""
         try:
-            if not self.index:
-                await self.initialize()
-            
-            stats = self.index.describe_index_stats()
-            return stats
-            
+            index = await self.executor.run(self.connect)
+            return await self.executor.run(index.describe_index_stats)
+
         except Exception as e:
             print(f"Error al obtener estadísticas: {str(e)}")
             raise
+
+    def close(self) -> None:
+        """Cierra el pool de conexiones del índice"""
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        self.client = None
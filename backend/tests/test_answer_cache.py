@@ -0,0 +1,55 @@
+"""
+Tests para la caché de respuestas del chat
+"""
+from services.answer_cache import AnswerCache, normalize_question
+
+ANSWER = {"response": "Ana sabe Python", "sources": ["uuid-a"], "source_files": ["ana.pdf"], "confidence": 0.6}
+
+
+def test_normalized_question_hits_until_corpus_changes():
+    """Las variantes de mayúsculas, acentos y puntuación comparten respuesta mientras no cambie el corpus"""
+    cache = AnswerCache()
+    cache.put("¿Quién sabe Python?", 1, ANSWER)
+
+    assert normalize_question("  ¿QUIÉN sabe   Python? ") == "quien sabe python"
+    assert cache.get("quien sabe python", 1) == ANSWER
+    assert cache.get("quien sabe python", 2) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    """Las respuestas caducan por TTL y se descartan las menos usadas al superar el límite"""
+    now = [100.0]
+    monkeypatch.setattr("services.answer_cache.time.monotonic", lambda: now[0])
+    cache = AnswerCache(max_entries=2, ttl=10)
+
+    cache.put("a", 1, ANSWER)
+    cache.put("b", 1, ANSWER)
+    cache.get("a", 1)
+    cache.put("c", 1, ANSWER)
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == ANSWER
+
+    now[0] += 11
+    assert cache.get("a", 1) is None
+
+
+def test_similar_question_matches_above_threshold():
+    """Con umbral de similitud, una pregunta parecida reutiliza la respuesta"""
+    cache = AnswerCache(similarity_threshold=0.95)
+    cache.put("¿Quién sabe Python?", 1, ANSWER, vector=[1.0, 0.0])
+
+    assert cache.get("¿Qué candidatos conocen Python?", 1, vector=[0.99, 0.05]) == ANSWER
+    assert cache.get("¿Quién sabe Java?", 1, vector=[0.0, 1.0]) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_stale_answer_does_not_roll_back_the_corpus_version():
+    """Una respuesta generada antes de una ingesta no se guarda ni vacía las respuestas nuevas"""
+    cache = AnswerCache()
+    cache.put("¿Quién sabe Python?", 2, ANSWER)
+
+    cache.put("¿Quién sabe Java?", 1, ANSWER)
+    assert cache.get("quien sabe java", 1) is None
+    assert cache.get("quien sabe python", 2) == ANSWER
+    assert cache.stats()["corpus_version"] == 2 and cache.stats()["entries"] == 1
@@ -0,0 +1,114 @@
+"""
+Tests para los perfiles estructurados de candidatos y las consultas sin LLM
+"""
+import io
+
+import pytest
+
+from services.file_manager import FileManager
+from services.profile_extractor import extract_profile
+from services.profile_query import ProfileQueryRouter
+
+CV_ANA = """
+Ana García — Madrid, España
+Desarrolladora backend con 7 años de experiencia en Java, Spring Boot y PostgreSQL.
+Experiencia: Banco XYZ (2019 - actualidad), Consultora ABC (2016 - 2019)
+Formación: Máster en Ingeniería del Software. Grado en Ingeniería Informática.
+Idiomas: Español (nativo), Inglés (C1)
+"""
+
+CV_LUIS = """
+Luis Pérez, Barcelona
+Data engineer. Python, Pandas, Spark, AWS y Docker.
+Experiencia: StartUp (2021 – presente)
+Grado en Matemáticas. Idiomas: español, catalán, inglés.
+"""
+
+
+def test_extract_profile_reads_skills_years_location_and_education():
+    """El perfil recoge tecnologías, años, idiomas, ubicación y el nivel de estudios más alto"""
+    profile = extract_profile(CV_ANA)
+
+    assert {"java", "spring", "postgresql"} <= set(profile["skills"])
+    assert "javascript" not in profile["skills"]
+    assert profile["years_experience"] == 7.0
+    assert profile["location"] == "Madrid"
+    assert profile["education"] == "máster"
+    assert profile["languages"] == ["español", "inglés"]
+
+    luis = extract_profile(CV_LUIS)
+    assert luis["location"] == "Barcelona"
+    assert luis["years_experience"] is not None and luis["years_experience"] >= 3
+
+
+@pytest.fixture
+def file_manager(tmp_path):
+    manager = FileManager(data_dir=tmp_path)
+
+    async def add(filename, text, pool=""):
+        file_uuid = await manager.save_stream_with_metadata(filename, io.BytesIO(filename.encode()), pool)
+        await manager.update_file_metadata(file_uuid, {"status": "processed"})
+        manager.profile_store.put(file_uuid, filename, extract_profile(text), pool)
+        return file_uuid
+
+    manager.add = add
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_profile_store_filters_counts_and_aggregates(file_manager):
+    """Los filtros combinan todas las condiciones y el borrado del CV elimina su perfil"""
+    ana = await file_manager.add("ana.pdf", CV_ANA)
+    luis = await file_manager.add("luis.pdf", CV_LUIS)
+    store = file_manager.profile_store
+
+    profiles, total = store.query(skills=["java"], min_years=5)
+    assert total == 1 and profiles[0]["uuid"] == ana
+
+    _, total = store.query(languages=["inglés"])
+    assert total == 2
+    assert store.aggregate("location") == [
+        {"value": "Barcelona", "count": 1}, {"value": "Madrid", "count": 1}
+    ]
+
+    await file_manager.delete_file_and_metadata(luis)
+    assert store.get(luis) is None
+    assert store.query(languages=["inglés"])[1] == 1
+
+
+@pytest.mark.asyncio
+async def test_router_answers_structured_questions_and_defers_the_rest(file_manager):
+    """Recuentos y filtros se responden desde la tabla; lo que no entiende pasa al RAG"""
+    ana = await file_manager.add("ana.pdf", CV_ANA)
+    await file_manager.add("luis.pdf", CV_LUIS)
+    router = ProfileQueryRouter(file_manager)
+
+    files = await router.answer("¿Cuántos archivos hay procesados?")
+    assert files["response"] == "Hay 2 archivos procesados de 2 en total."
+
+    java = await router.answer("¿Quién tiene 5+ años de experiencia en Java?")
+    assert java["sources"] == [ana]
+    assert java["source_files"] == ["ana.pdf"]
+
+    madrid = await router.answer("¿Cuántos candidatos hay en Madrid?")
+    assert madrid["response"] == "Hay 1 candidato en Madrid."
+
+    assert await router.answer("¿Quién tiene experiencia liderando equipos en Java?") is None
+    assert await router.answer("Resume el perfil de Ana") is None
+
+
+@pytest.mark.asyncio
+async def test_router_answers_within_each_pool(file_manager):
+    """Los recuentos, filtros y agregados de una pool no incluyen los CVs de las demás"""
+    ana = await file_manager.add("ana.pdf", CV_ANA)
+    luis = await file_manager.add("luis.pdf", CV_LUIS, pool="data")
+    router = ProfileQueryRouter(file_manager)
+
+    assert (await router.answer("¿Cuántos archivos hay?"))["response"].startswith("Hay 1 archivos en total")
+    assert (await router.answer("¿Cuántos candidatos hablan inglés?"))["sources"] == [ana]
+    assert (await router.answer("¿Cuántos candidatos hablan inglés?", pool="data"))["sources"] == [luis]
+    assert await router.answer("¿Quién tiene experiencia en Java?", pool="data") == {
+        "response": "No hay candidatos con java.", "sources": [], "source_files": [], "confidence": 1.0
+    }
+    assert file_manager.profile_store.aggregate("location", pool="data") == [{"value": "Barcelona", "count": 1}]
+    assert file_manager.profile_store.query(languages=["inglés"])[1] == 2
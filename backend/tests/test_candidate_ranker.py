@@ -0,0 +1,123 @@
+"""
+Tests para el ranking de candidatos contra una descripción de trabajo
+"""
+import io
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from services.candidate_ranker import CandidateRanker
+from services.file_manager import FileManager
+from services.rag_pipeline import RAGPipeline
+from store.local_vector_store import LocalVectorStore
+
+
+class AxisEmbeddings:
+    """Embeddings falsos: cada palabra clave es un eje del espacio"""
+
+    keywords = ["python", "java", "aws", "react"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [float(text.count(keyword)) for keyword in self.keywords]
+
+
+class CountingChatModel(FakeListChatModel):
+    """LLM falso que cuenta las llamadas"""
+    calls: int = 0
+
+    async def ainvoke(self, *args, **kwargs):
+        self.calls += 1
+        return await super().ainvoke(*args, **kwargs)
+
+
+@pytest.fixture
+def ranker(tmp_path):
+    file_manager = FileManager(tmp_path / "files")
+    rag_pipeline = RAGPipeline(file_manager)
+    rag_pipeline.vector_store_backend = "local"
+    rag_pipeline.embeddings = AxisEmbeddings()
+    rag_pipeline.vectorstore = LocalVectorStore(rag_pipeline.embeddings, data_dir=tmp_path / "vectors")
+    yield CandidateRanker(rag_pipeline, file_manager, concurrency=1)
+    rag_pipeline.vectorstore.close()
+
+
+async def add_cv(ranker, filename, chunks, status="processed"):
+    file_manager = ranker.file_manager
+    file_uuid = await file_manager.save_stream_with_metadata(filename, io.BytesIO(filename.encode()))
+    await file_manager.update_file_metadata(file_uuid, {"status": status})
+    await file_manager.save_extracted_text(file_uuid, " ".join(chunks))
+    ranker.rag_pipeline.vectorstore.add_texts(
+        chunks,
+        metadatas=[{"uuid": file_uuid} for _ in chunks],
+        ids=[f"cv_{file_uuid}_chunk_{i}" for i in range(len(chunks))]
+    )
+    return file_uuid
+
+
+@pytest.mark.asyncio
+async def test_rank_scores_corpus_and_analyzes_only_shortlist(ranker):
+    """Se puntúa todo el corpus por similitud y solo los top_n pasan por el LLM"""
+    python_aws = await add_cv(ranker, "ana.pdf", ["Python", "AWS"])
+    python_only = await add_cv(ranker, "luis.pdf", ["Python y Java"])
+    await add_cv(ranker, "eva.pdf", ["React"])
+    await add_cv(ranker, "borrado.pdf", ["Python AWS"], status="error")
+
+    llm = CountingChatModel(responses=[
+        json.dumps({"score": 6, "match_percentage": 60, "strengths": ["Python"]}),
+        json.dumps({"score": 9, "match_percentage": 90, "strengths": ["Python", "Java"]}),
+    ])
+    ranker.rag_pipeline.llm = llm
+
+    result = await ranker.rank("Python", top_n=2)
+
+    assert result["total_scored"] == 4
+    assert llm.calls == 2
+    assert [candidate["uuid"] for candidate in result["candidates"]] == [python_only, python_aws]
+    assert result["candidates"][0]["analysis"]["score"] == 9.0
+
+
+@pytest.mark.asyncio
+async def test_rank_without_analysis_skips_llm(ranker):
+    """Con analyze=False se devuelve la preselección por similitud sin llamar al LLM"""
+    python_cv = await add_cv(ranker, "ana.pdf", ["Python"])
+    await add_cv(ranker, "eva.pdf", ["React"])
+
+    result = await ranker.rank("Python developer", top_n=1, analyze=False)
+
+    assert [candidate["uuid"] for candidate in result["candidates"]] == [python_cv]
+    assert result["candidates"][0]["analysis"] is None
+
+
+class TopKIndex:
+    """Índice falso de Pinecone que devuelve como máximo top_k chunks"""
+
+    def __init__(self, matches):
+        self.matches = matches
+
+    def query(self, vector, top_k, include_metadata, namespace=None):
+        return {"matches": self.matches[:top_k]}
+
+
+@pytest.mark.asyncio
+async def test_rank_reports_cvs_left_out_by_the_pinecone_limit(ranker):
+    """Con Pinecone, los CVs sin chunks dentro de rank_top_k se señalan en la respuesta"""
+    first = await add_cv(ranker, "ana.pdf", ["Python"])
+    second = await add_cv(ranker, "luis.pdf", ["Python"])
+    await add_cv(ranker, "eva.pdf", ["React"])
+    local_store = ranker.rag_pipeline.vectorstore
+    ranker.rag_pipeline.vectorstore = type("PineconeStore", (), {"close": local_store.close})()
+    ranker.rag_pipeline.vectorstore.index = TopKIndex([
+        {"id": f"cv_{first}_chunk_0", "score": 0.9},
+        {"id": f"cv_{second}_chunk_0", "score": 0.8},
+    ])
+    ranker.rag_pipeline.rank_top_k = 2
+
+    result = await ranker.rank("Python", top_n=5, analyze=False)
+
+    assert [candidate["uuid"] for candidate in result["candidates"]] == [first, second]
+    assert result["truncated"] and result["unscored"] == 1
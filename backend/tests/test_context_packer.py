@@ -0,0 +1,71 @@
+"""
+Tests para el empaquetado del contexto con presupuesto de tokens
+"""
+from langchain.schema import Document
+
+from services.context_packer import ContextPacker
+
+
+class WordTokenizer:
+    """Un token por palabra (sustituye a tiktoken en los tests)"""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def chunk(uuid, index, text):
+    return Document(page_content=text, metadata={"uuid": uuid, "chunk_index": index, "filename": f"{uuid}.pdf"})
+
+
+def test_merges_consecutive_chunks_without_repeating_the_overlap():
+    """Los chunks contiguos de un CV se unen en un bloque y el solapamiento aparece una sola vez"""
+    packer = ContextPacker(tokenizer=WordTokenizer(), token_budget=1000)
+    documents = [
+        chunk("a", 1, "lidera equipos de cinco personas con Python y AWS"),
+        chunk("b", 0, "Luis Pérez, data engineer en Barcelona"),
+        chunk("a", 0, "Ana García, backend en Madrid. Desde 2019 lidera equipos"),
+    ]
+
+    packed, stats = packer.pack(documents)
+
+    assert [document.metadata["uuid"] for document in packed] == ["a", "b"]
+    assert packed[0].page_content == (
+        "Ana García, backend en Madrid. Desde 2019 lidera equipos de cinco personas con Python y AWS"
+    )
+    assert packed[0].metadata["chunk_indexes"] == [0, 1]
+    assert stats["chunks"] == 3 and stats["blocks"] == 2
+    assert stats["tokens_saved"] == stats["tokens_before"] - stats["tokens_after"] == 2
+
+
+def test_drops_near_duplicates_and_truncates_to_budget():
+    """Los bloques casi iguales se descartan y el último que no cabe se recorta al presupuesto"""
+    text = " ".join(f"palabra{i}" for i in range(80))
+    packer = ContextPacker(tokenizer=WordTokenizer(), token_budget=130)
+    documents = [
+        chunk("a", 0, text),
+        chunk("b", 3, text + " final"),
+        chunk("c", 0, " ".join(f"otra{i}" for i in range(80))),
+    ]
+
+    packed, stats = packer.pack(documents)
+
+    assert [document.metadata["uuid"] for document in packed] == ["a", "c"]
+    assert packed[1].metadata["truncated"] is True
+    assert stats["tokens_after"] == 130
+    assert packer.stats()["tokens_saved"] == stats["tokens_saved"]
+
+
+def test_documents_without_chunk_index_are_kept_apart():
+    """Sin chunk_index no se puede saber si son contiguos: se mantienen por separado"""
+    packer = ContextPacker(token_budget=1000)
+    documents = [
+        Document(page_content="Experiencia en Python", metadata={"uuid": "a"}),
+        Document(page_content="Inglés C1 y francés B2", metadata={"uuid": "a"}),
+    ]
+
+    packed, _ = packer.pack(documents)
+
+    assert packed == documents
@@ -0,0 +1,72 @@
+"""
+Tests para la división de CVs por secciones y tokens
+"""
+import pytest
+
+from services.cv_chunker import CVChunker
+from services.file_manager import FileManager
+from services.rag_pipeline import RAGPipeline
+from store.local_vector_store import LocalVectorStore
+from tests.test_local_vector_store import AxisEmbeddings
+
+CV = """Ana García
+ana@example.com · Madrid
+PERFIL PROFESIONAL
+Desarrolladora backend orientada a producto.
+Experiencia
+Banco XYZ (2019 - actualidad): APIs en Java y AWS.
+Consultora ABC (2016 - 2019): microservicios en Java.
+Formación académica
+Grado en Ingeniería Informática.
+Habilidades técnicas: Python, React, Docker
+Idiomas: Español (nativo), Inglés (C1)"""
+
+
+class WordTokenizer:
+    """Un token por palabra (sustituye a tiktoken en los tests)"""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+def test_chunks_follow_sections_and_token_budget():
+    """Las secciones que caben comparten chunk, las largas se parten con solapamiento dentro de la sección"""
+    chunker = CVChunker(tokenizer=WordTokenizer(), chunk_tokens=25, overlap_tokens=8)
+
+    assert chunker.detect_section("HABILIDADES TÉCNICAS:") == "skills"
+    assert chunker.detect_section("Experiencia en Java durante cinco años en banca") is None
+    assert [section for section, _ in chunker.split_sections(CV)] == [
+        "header", "summary", "experience", "education", "skills", "languages"
+    ]
+    chunks = chunker.chunk(CV)
+    assert [sections for _, sections in chunks] == [
+        ["header", "summary"], ["experience"], ["education", "skills", "languages"]
+    ]
+    assert all(chunker.count_tokens(text) <= 25 for text, _ in chunks)
+
+    long_experience = "Experiencia\n" + "\n".join(f"Proyecto {i}: backend en Java y AWS." for i in range(20))
+    experience = chunker.chunk(long_experience)
+    assert len(experience) > 1 and all(sections == ["experience"] for _, sections in experience)
+    # La última línea de un chunk se repite al principio del siguiente
+    assert experience[1][0].splitlines()[0] == experience[0][0].splitlines()[-1]
+
+
+@pytest.mark.asyncio
+async def test_retrieval_can_be_limited_to_sections(tmp_path):
+    """Con sections, solo se recuperan chunks de esas secciones del CV"""
+    rag = RAGPipeline(FileManager(data_dir=tmp_path / "files"))
+    rag.embeddings = AxisEmbeddings()
+    rag.vectorstore = LocalVectorStore(rag.embeddings, data_dir=tmp_path / "vector_store")
+    rag.tokenizer = WordTokenizer()
+    rag.chunker = CVChunker(tokenizer=rag.tokenizer, chunk_tokens=20, overlap_tokens=0)
+    rag.two_stage_retrieval = False
+
+    chunks, ids = await rag._build_chunks("uuid-a", CV, "ana.pdf")
+    await rag._embed_and_upsert(chunks, ids)
+    assert chunks[0].metadata["section"] == "header"
+
+    documents = await rag._retrieve("python", sections=["skills"])
+    assert documents
+    assert all("skills" in document.metadata["sections"] for document in documents)
+    assert not await rag._retrieve("java", sections=["projects"])
+    rag.vectorstore.close()
@@ -6,12 +6,29 @@ from fastapi.testclient import TestClient
 from main import app
 
 @pytest.fixture
-def client():
-    return TestClient(app)
+def client(tmp_path):
+    """Cliente con un FileManager temporal (no escribe en el directorio data/ del proyecto)"""
+    from endpoints.dependencies import get_file_manager
+    from services.file_manager import FileManager
+
+    file_manager = FileManager(data_dir=tmp_path)
+    app.dependency_overrides[get_file_manager] = lambda: file_manager
+    yield TestClient(app)
+    app.dependency_overrides.clear()
 
 
 def test_analyze_cv(client):
     """Test para análisis de CV"""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from endpoints.dependencies import get_file_manager, get_rag_pipeline
+    from services.rag_pipeline import RAGPipeline
+
+    rag_pipeline = RAGPipeline(app.dependency_overrides[get_file_manager]())
+    rag_pipeline.llm = FakeListChatModel(responses=[
+        '```json\n{"score": 8, "match_percentage": 80, "strengths": ["Python"], "weaknesses": [], '
+        '"recommendations": ["Docker"], "detailed_analysis": {"technical_skills_match": 0.9}}\n```'
+    ])
+    app.dependency_overrides[get_rag_pipeline] = lambda: rag_pipeline
     test_data = {
         "job_description": "Desarrollador Python con experiencia en FastAPI",
         "cv_text": "Desarrollador con 5 años de experiencia en Python y FastAPI",
@@ -27,6 +44,8 @@ def test_analyze_cv(client):
     assert "weaknesses" in data
     assert "recommendations" in data
     assert "detailed_analysis" in data
+    assert data["score"] == 8 and data["strengths"] == ["Python"]
+    app.dependency_overrides.clear()
 
 def test_upload_cv_invalid_file(client):
     """Test para subida de archivo inválido"""
@@ -35,3 +54,90 @@ def test_upload_cv_invalid_file(client):
     response = client.post("/api/v1/screening/upload", files=files)
     assert response.status_code == 400
     assert "Solo se permiten archivos PDF" in response.json()["detail"]
+
+
+
+def test_bulk_upload_reads_zip_entries(client):
+    """Los PDFs de un ZIP se guardan y encolan; el resto de entradas se rechazan"""
+    import io
+    import zipfile
+    from endpoints.dependencies import get_ingestion_queue
+
+    class RecordingQueue:
+        def __init__(self):
+            self.enqueued = []
+
+        async def enqueue_many(self, file_uuids):
+            self.enqueued.extend(file_uuids)
+
+    queue = RecordingQueue()
+    app.dependency_overrides[get_ingestion_queue] = lambda: queue
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("cvs/ana.pdf", b"%PDF-1.4 ana")
+        archive.writestr("cvs/luis.pdf", b"%PDF-1.4 luis")
+        archive.writestr("notas.txt", b"texto")
+
+    response = client.post(
+        "/api/v1/screening/upload/bulk", files={"files": ("cvs.zip", buffer.getvalue(), "application/zip")}
+    )
+
+    data = response.json()
+    assert data["queued"] == 2 and data["rejected"] == 1
+    assert [result["filename"] for result in data["files"]] == ["ana.pdf", "luis.pdf", "notas.txt"]
+    assert len(queue.enqueued) == 2
+
+@pytest.fixture
+def listing_client(tmp_path):
+    """Cliente con un FileManager temporal con 5 CVs"""
+    import asyncio
+    import io
+    from endpoints.dependencies import get_file_manager
+    from services.file_manager import FileManager
+
+    file_manager = FileManager(data_dir=tmp_path)
+
+    async def populate():
+        for i in range(5):
+            file_uuid = await file_manager.save_stream_with_metadata(f"cv_{i}.pdf", io.BytesIO(b"%PDF " + bytes([i])))
+            await file_manager.update_file_metadata(file_uuid, {
+                "upload_date": f"2024-01-0{i + 1}T00:00:00Z",
+                "status": "processed" if i % 2 == 0 else "error"
+            })
+
+    asyncio.run(populate())
+    app.dependency_overrides[get_file_manager] = lambda: file_manager
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_list_cvs_cursor_pagination(listing_client):
+    """El listado se recorre por páginas con un cursor y respeta filtros y campos"""
+    first = listing_client.get("/api/v1/screening/upload", params={"limit": 2, "fields": "original_filename"}).json()
+    assert [f["original_filename"] for f in first["files"]] == ["cv_4.pdf", "cv_3.pdf"]
+    assert set(first["files"][0]) == {"uuid", "original_filename"}
+    assert first["total"] == 5
+
+    second = listing_client.get("/api/v1/screening/upload", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    third = listing_client.get("/api/v1/screening/upload", params={"limit": 2, "cursor": second["next_cursor"]}).json()
+    assert [f["original_filename"] for f in second["files"] + third["files"]] == ["cv_2.pdf", "cv_1.pdf", "cv_0.pdf"]
+    assert third["next_cursor"] is None
+
+    filtered = listing_client.get("/api/v1/screening/upload", params={
+        "status": "processed", "uploaded_from": "2024-01-02", "sort": "original_filename", "order": "asc"
+    }).json()
+    assert [f["original_filename"] for f in filtered["files"]] == ["cv_2.pdf", "cv_4.pdf"]
+
+    assert listing_client.get("/api/v1/screening/upload", params={"sort": "data"}).status_code == 400
+
+
+def test_list_cvs_etag_not_modified(listing_client):
+    """Una página sin cambios devuelve 304 con el mismo ETag"""
+    response = listing_client.get("/api/v1/screening/upload", params={"limit": 2})
+    etag = response.headers["etag"]
+
+    cached = listing_client.get("/api/v1/screening/upload", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    other_page = listing_client.get("/api/v1/screening/upload", params={"limit": 3}, headers={"If-None-Match": etag})
+    assert other_page.status_code == 200
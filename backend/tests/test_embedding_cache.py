@@ -0,0 +1,130 @@
+"""
+Tests para la caché persistente de embeddings
+"""
+import threading
+import time
+
+from services.embedding_cache import CachedEmbeddings, EmbeddingCache, SQLiteEmbeddingStore
+
+
+class CountingEmbeddings:
+    """Embeddings falsos que cuentan los textos enviados al proveedor"""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.documents = 0
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        self.documents += len(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [float(len(text)), 1.0]
+
+
+def test_query_embeddings_served_from_cache(tmp_path):
+    """Las preguntas repetidas no vuelven a llamar al proveedor"""
+    provider = CountingEmbeddings()
+    embeddings = CachedEmbeddings(provider, EmbeddingCache(SQLiteEmbeddingStore(tmp_path / "e.db")))
+
+    first = embeddings.embed_query("¿Quién sabe Python?")
+    second = embeddings.embed_query("¿Quién sabe Python?")
+
+    assert first == second
+    assert provider.queries == 1
+    stats = embeddings.cache.stats()
+    assert stats["memory_hits"] == 1 and stats["misses"] == 1
+
+
+def test_documents_persist_across_instances(tmp_path):
+    """Los embeddings guardados en disco se reutilizan tras reiniciar el proceso"""
+    db_path = tmp_path / "e.db"
+    provider = CountingEmbeddings()
+    CachedEmbeddings(provider, EmbeddingCache(SQLiteEmbeddingStore(db_path))).embed_documents(["Python", "AWS"])
+
+    cache = EmbeddingCache(SQLiteEmbeddingStore(db_path))
+    vectors = CachedEmbeddings(provider, cache).embed_documents(["AWS", "Python", "Go"])
+
+    assert vectors == [[3.0, 1.0], [6.0, 1.0], [2.0, 1.0]]
+    assert provider.documents == 3
+    assert cache.stats()["disk_hits"] == 2
+
+
+def test_size_based_eviction_drops_least_recently_used(tmp_path):
+    """Al superar el tamaño máximo se desalojan los embeddings menos usados"""
+    store = SQLiteEmbeddingStore(tmp_path / "e.db", max_bytes=8 * 10)
+    for i in range(10):
+        store.put_many("m", {f"h{i}": [float(i), 0.0]})
+    store.get_many("m", ["h0"])
+    store.put_many("m", {"h10": [10.0, 0.0]})
+
+    remaining = store.get_many("m", [f"h{i}" for i in range(11)])
+    assert "h0" in remaining and "h10" in remaining
+    assert "h1" not in remaining
+    assert store.stats()["disk_bytes"] <= 8 * 10
+
+
+def test_reads_do_not_write_and_repeated_puts_do_not_grow_the_size(tmp_path):
+    """Las lecturas solo anotan el acceso en memoria y guardar un embedding existente no suma tamaño"""
+    store = SQLiteEmbeddingStore(tmp_path / "e.db")
+    store.put_many("m", {"a": [1.0, 0.0], "b": [2.0, 0.0]})
+    changes = store._conn.total_changes
+
+    assert set(store.get_many("m", ["a", "b", "c"])) == {"a", "b"}
+    assert store._conn.total_changes == changes
+
+    store.put_many("m", {"a": [1.0, 0.0]})
+    store.put_many("m", {"a": [1.0, 0.0], "c": [3.0, 0.0]})
+    assert store.stats()["disk_bytes"] == 3 * 8
+    store.close()
+    assert SQLiteEmbeddingStore(tmp_path / "e.db").stats()["disk_bytes"] == 3 * 8
+
+
+def test_memory_lru_is_bounded(monkeypatch):
+    """El LRU en memoria no crece por encima de su tamaño"""
+    monkeypatch.setenv("EMBEDDING_CACHE_BACKEND", "none")
+    cache = EmbeddingCache(lru_size=2)
+    cache.put_many("m", {"a": [1.0], "b": [2.0], "c": [3.0]})
+
+    assert cache.get_many("m", ["a", "b", "c"]) == {"b": [2.0], "c": [3.0]}
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_concurrent_identical_texts_are_embedded_once(monkeypatch):
+    """Un texto que otro hilo está calculando no se vuelve a enviar al proveedor"""
+    monkeypatch.setenv("EMBEDDING_CACHE_BACKEND", "none")
+    entered = threading.Event()
+    release = threading.Event()
+
+    class BlockingEmbeddings(CountingEmbeddings):
+        def __init__(self):
+            super().__init__()
+            self.requests = []
+
+        def embed_documents(self, texts):
+            self.requests.append(list(texts))
+            if len(self.requests) == 1:
+                entered.set()
+                release.wait(5)
+            return super().embed_documents(texts)
+
+    provider = BlockingEmbeddings()
+    embeddings = CachedEmbeddings(provider, EmbeddingCache())
+    results = {}
+    first = threading.Thread(target=lambda: results.update(first=embeddings.embed_documents(["Python", "AWS"])))
+    first.start()
+    entered.wait(5)
+    second = threading.Thread(target=lambda: results.update(second=embeddings.embed_documents(["AWS", "Go"])))
+    second.start()
+    while embeddings.coalesced == 0:
+        time.sleep(0.01)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert provider.requests == [["Python", "AWS"], ["Go"]]
+    assert results["second"] == [[3.0, 1.0], [2.0, 1.0]]
+    assert embeddings.coalesced == 1
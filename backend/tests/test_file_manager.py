@@ -0,0 +1,190 @@
+"""
+Tests para el gestor de archivos y la caché de texto extraído
+"""
+import asyncio
+import hashlib
+import io
+import json
+import tracemalloc
+
+import pytest
+from fastapi import UploadFile
+
+from services.file_manager import FileManager, FileTooLargeError
+
+
+@pytest.fixture
+def file_manager(tmp_path):
+    return FileManager(data_dir=tmp_path)
+
+
+@pytest.mark.asyncio
+async def test_save_stream_records_content_hash(file_manager):
+    """Al guardar un PDF se registra el hash de su contenido"""
+    content = b"%PDF-1.4 contenido"
+    file_uuid = await file_manager.save_stream_with_metadata("cv.pdf", io.BytesIO(content))
+
+    metadata = await file_manager.get_file_metadata(file_uuid)
+    assert metadata["content_hash"] == hashlib.sha256(content).hexdigest()
+    assert metadata["file_size"] == len(content)
+
+
+@pytest.mark.asyncio
+async def test_extracted_text_cache_roundtrip(file_manager):
+    """El texto extraído se guarda comprimido y se recupera sin reparsear el PDF"""
+    file_uuid = await file_manager.save_stream_with_metadata("cv.pdf", io.BytesIO(b"%PDF-1.4 a"))
+
+    assert await file_manager.get_extracted_text(file_uuid) is None
+    assert await file_manager.save_extracted_text(file_uuid, "Experiencia en Python ñ")
+    assert await file_manager.get_extracted_text(file_uuid) == "Experiencia en Python ñ"
+    assert len(list(file_manager.json_dir.glob(f"{file_uuid}.*.txt.gz"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_extracted_text_cache_keyed_by_content_hash(file_manager):
+    """Si cambia el contenido del PDF la caché deja de ser válida"""
+    file_uuid = await file_manager.save_stream_with_metadata("cv.pdf", io.BytesIO(b"%PDF-1.4 a"))
+    await file_manager.save_extracted_text(file_uuid, "texto antiguo")
+
+    await file_manager.update_file_metadata(file_uuid, {"content_hash": hashlib.sha256(b"otro").hexdigest()})
+
+    assert await file_manager.get_extracted_text(file_uuid) is None
+
+
+@pytest.mark.asyncio
+async def test_delete_removes_text_cache(file_manager):
+    """Eliminar un archivo elimina también su texto en caché"""
+    file_uuid = await file_manager.save_stream_with_metadata("cv.pdf", io.BytesIO(b"%PDF-1.4 a"))
+    await file_manager.save_extracted_text(file_uuid, "texto")
+
+    assert await file_manager.delete_file_and_metadata(file_uuid)
+    assert list(file_manager.json_dir.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_maps_to_existing_uuid(file_manager):
+    """Subir el mismo PDF dos veces devuelve el UUID existente sin guardar una copia"""
+    first_uuid, first_duplicate = await file_manager.save_stream_deduplicated("cv.pdf", io.BytesIO(b"%PDF-1.4 a"))
+    second_uuid, second_duplicate = await file_manager.save_stream_deduplicated("copia.pdf", io.BytesIO(b"%PDF-1.4 a"))
+
+    assert not first_duplicate
+    assert second_duplicate
+    assert second_uuid == first_uuid
+    assert len(list(file_manager.cvs_dir.iterdir())) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_uploads_store_one_copy(file_manager):
+    """Subidas simultáneas del mismo PDF se resuelven al mismo UUID aunque el registro no esté bajo el lock"""
+    results = await asyncio.gather(*(
+        file_manager.save_stream_deduplicated(f"cv_{i}.pdf", io.BytesIO(b"%PDF-1.4 igual")) for i in range(5)
+    ))
+
+    assert len({file_uuid for file_uuid, _ in results}) == 1
+    assert sorted(duplicate for _, duplicate in results) == [False, True, True, True, True]
+    assert len(list(file_manager.cvs_dir.iterdir())) == 1
+    assert file_manager._pending_hashes == {}
+
+
+def test_dedup_lock_is_per_instance_and_event_loop(tmp_path):
+    """Cada FileManager tiene su propio lock: subidas concurrentes en otro event loop no fallan"""
+    async def upload_concurrently(file_manager):
+        return await asyncio.gather(*(
+            file_manager.save_stream_deduplicated(f"cv_{i}.pdf", io.BytesIO(b"%PDF " + bytes([i]))) for i in range(3)
+        ))
+
+    for run in range(2):
+        results = asyncio.run(upload_concurrently(FileManager(data_dir=tmp_path / str(run))))
+        assert [duplicate for _, duplicate in results] == [False, False, False]
+
+
+@pytest.mark.asyncio
+async def test_json_metadata_migrated_once(tmp_path):
+    """Los metadatos JSON antiguos se importan al índice SQLite en el primer uso"""
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    legacy = {"uuid": "legacy-1", "original_filename": "viejo.pdf", "upload_date": "2024-01-01T00:00:00Z",
+              "file_size": 10, "status": "processed", "chunks_count": 3}
+    (json_dir / "legacy-1.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    file_manager = FileManager(data_dir=tmp_path)
+
+    assert (await file_manager.get_file_metadata("legacy-1"))["chunks_count"] == 3
+    assert file_manager.get_stats()["by_status"] == {"processed": 1}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_do_not_lose_writes(file_manager):
+    """Las actualizaciones concurrentes de campos distintos se conservan todas"""
+    file_uuid = await file_manager.save_stream_with_metadata("cv.pdf", io.BytesIO(b"%PDF-1.4 a"))
+
+    await asyncio.gather(*(
+        file_manager.update_file_metadata(file_uuid, {f"campo_{i}": i}) for i in range(20)
+    ))
+
+    metadata = await file_manager.get_file_metadata(file_uuid)
+    assert all(metadata[f"campo_{i}"] == i for i in range(20))
+
+
+@pytest.mark.asyncio
+async def test_stats_and_status_filter_use_maintained_counters(file_manager):
+    """Los contadores agregados y la versión del corpus siguen altas, cambios de estado y bajas"""
+    first = await file_manager.save_stream_with_metadata("a.pdf", io.BytesIO(b"%PDF-1.4 a"))
+    second = await file_manager.save_stream_with_metadata("b.pdf", io.BytesIO(b"%PDF-1.4 bb"))
+    version = file_manager.get_corpus_version()
+
+    await file_manager.update_file_metadata(first, {"status": "processed", "chunks_count": 4})
+    assert file_manager.get_corpus_version() > version
+    assert [m["uuid"] for m in await file_manager.list_processed_files(status="processed")] == [first]
+
+    await file_manager.delete_file_and_metadata(second)
+    stats = file_manager.get_stats()
+    assert stats["total_files"] == 1
+    assert stats["total_size_bytes"] == len(b"%PDF-1.4 a")
+    assert stats["by_status"] == {"processed": 1}
+
+
+class GeneratedStream(io.RawIOBase):
+    """Stream de tamaño dado que genera los bytes al leer (no ocupa memoria)"""
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self.remaining)
+        buffer[:count] = b"x" * count
+        self.remaining -= count
+        return count
+
+
+@pytest.mark.asyncio
+async def test_large_upload_streams_with_bounded_memory(file_manager):
+    """Una subida de 100 MB se copia a disco por bloques sin superar unos pocos MB de memoria"""
+    size = 100 * 1024 * 1024
+    file_manager.max_upload_bytes = size
+    upload = UploadFile(file=io.BufferedReader(GeneratedStream(size)), filename="grande.pdf")
+
+    tracemalloc.start()
+    try:
+        file_uuid, duplicate = await file_manager.save_file_deduplicated(upload)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert not duplicate
+    assert (await file_manager.get_file_path(file_uuid)).stat().st_size == size
+    assert peak < 8 * 1024 * 1024
+
+
+@pytest.mark.asyncio
+async def test_upload_over_size_limit_is_rejected(file_manager):
+    """Un archivo mayor que el límite se rechaza sin dejar temporales"""
+    file_manager.max_upload_bytes = 1024
+
+    with pytest.raises(FileTooLargeError):
+        await file_manager.save_stream_deduplicated("cv.pdf", io.BytesIO(b"x" * 4096))
+
+    assert list(file_manager.cvs_dir.iterdir()) == []
@@ -32,3 +32,13 @@ def test_root_endpoint(client):
     data = response.json()
     assert "message" in data
     assert "version" in data
+
+def test_latency_metrics(client):
+    """Test del endpoint de latencias por etapa"""
+    client.get("/api/v1/health")
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    data = response.json()
+    assert "server-timing" in response.headers
+    assert data["tracing_enabled"] is True
+    assert "p95_ms" in data["stages"]["http.GET /api/v1/health"]
@@ -0,0 +1,138 @@
+"""
+Tests para la cola persistente de ingesta
+"""
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from services.ingestion_queue import IngestionQueue
+
+
+class FakeFileManager:
+    """FileManager en memoria"""
+
+    def __init__(self, tmp_path: Path):
+        self.tmp_path = tmp_path
+        self.metadata = {}
+
+    async def update_file_metadata(self, file_uuid, updates):
+        self.metadata.setdefault(file_uuid, {}).update(updates)
+        return True
+
+    async def get_file_metadata(self, file_uuid):
+        return self.metadata.get(file_uuid)
+
+    async def get_file_path(self, file_uuid):
+        return self.tmp_path / f"{file_uuid}.pdf"
+
+    async def file_exists(self, file_uuid):
+        return True
+
+
+class FakePipeline:
+    """Pipeline que devuelve una secuencia de resultados de chunks"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def process_pdfs_bulk(self, files):
+        self.calls += 1
+        return {file_uuid: self.results.pop(0) for file_uuid, _ in files}
+
+
+async def wait_for_status(file_manager, file_uuid, status, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while file_manager.metadata.get(file_uuid, {}).get("status") != status:
+        assert asyncio.get_running_loop().time() < deadline, file_manager.metadata
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_processes_in_background(tmp_path):
+    """Un archivo encolado pasa de queued a processed"""
+    file_manager = FakeFileManager(tmp_path)
+    queue = IngestionQueue(FakePipeline([3, 4]), file_manager, db_path=tmp_path / "queue.db", workers=2)
+    queue.poll_interval = 0.01
+    await queue.start()
+    try:
+        await queue.enqueue_many(["uuid-1", "uuid-2"])
+        await wait_for_status(file_manager, "uuid-1", "processed")
+        await wait_for_status(file_manager, "uuid-2", "processed")
+        assert file_manager.metadata["uuid-1"]["chunks_count"] == 3
+        assert file_manager.metadata["uuid-2"]["chunks_count"] == 4
+        assert (await queue.get_job("uuid-1"))["status"] == "processed"
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_retries_then_marks_error(tmp_path):
+    """Tras agotar los reintentos el archivo queda en error"""
+    file_manager = FakeFileManager(tmp_path)
+    pipeline = FakePipeline([0, 0])
+    queue = IngestionQueue(
+        pipeline, file_manager, db_path=tmp_path / "queue.db",
+        workers=1, max_retries=2, retry_delay=0.01
+    )
+    queue.poll_interval = 0.01
+    await queue.start()
+    try:
+        await queue.enqueue("uuid-1")
+        await wait_for_status(file_manager, "uuid-1", "error")
+        assert pipeline.calls == 2
+        assert (await queue.get_job("uuid-1"))["attempts"] == 2
+    finally:
+        await queue.stop()
+
+
+class FailingPipeline(FakePipeline):
+    """Pipeline que lanza una excepción en la primera llamada"""
+
+    async def process_pdfs_bulk(self, files):
+        if not self.calls:
+            self.calls += 1
+            raise RuntimeError("fallo de extracción")
+        return await super().process_pdfs_bulk(files)
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_goes_through_retries(tmp_path):
+    """Si la ingesta del lote lanza una excepción los trabajos se reintentan en vez de quedarse en processing"""
+    file_manager = FakeFileManager(tmp_path)
+    pipeline = FailingPipeline([2])
+    queue = IngestionQueue(
+        pipeline, file_manager, db_path=tmp_path / "queue.db",
+        workers=1, max_retries=2, retry_delay=0.01
+    )
+    queue.poll_interval = 0.01
+    await queue.start()
+    try:
+        await queue.enqueue("uuid-1")
+        await wait_for_status(file_manager, "uuid-1", "processed")
+        assert pipeline.calls == 2
+        assert (await queue.get_job("uuid-1"))["attempts"] == 2
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_jobs_survive_restart(tmp_path):
+    """Los trabajos en curso al cerrar se reprocesan al arrancar de nuevo"""
+    file_manager = FakeFileManager(tmp_path)
+    db_path = tmp_path / "queue.db"
+
+    first = IngestionQueue(FakePipeline([]), file_manager, db_path=db_path, workers=1)
+    await first.enqueue("uuid-1")
+    first._claim_batch(1)
+    await first.stop()
+
+    second = IngestionQueue(FakePipeline([5]), file_manager, db_path=db_path, workers=1)
+    second.poll_interval = 0.01
+    await second.start()
+    try:
+        await wait_for_status(file_manager, "uuid-1", "processed")
+        assert file_manager.metadata["uuid-1"]["chunks_count"] == 5
+    finally:
+        await second.stop()
@@ -0,0 +1,104 @@
+"""
+Tests para el índice léxico BM25 y la recuperación híbrida
+"""
+from typing import List
+
+import pytest
+from langchain_core.documents import Document
+
+from services.file_manager import FileManager
+from services.rag_pipeline import RAGPipeline
+from store.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from store.local_vector_store import LocalVectorStore
+from tests.test_cv_chunker import WordTokenizer
+from tests.test_local_vector_store import AxisEmbeddings
+
+
+def record(file_uuid, index, text, section="experience"):
+    metadata = {"uuid": file_uuid, "chunk_index": index, "filename": f"{file_uuid}.pdf", "sections": [section]}
+    return (f"cv_{file_uuid}_chunk_{index}", text, metadata)
+
+
+def test_bm25_search_persists_and_follows_deletes(tmp_path):
+    """Los términos exactos se encuentran sin acentos, el índice sobrevive a un reinicio y el borrado lo actualiza"""
+    index = LexicalIndex(tmp_path / "lexical.db")
+    index.add([
+        record("uuid-a", 0, "Despliegues en Kubernetes y Docker"),
+        record("uuid-a", 1, "Certificación PMP y gestión de proyectos", "certifications"),
+        record("uuid-b", 0, "Backend con Django y PostgreSQL"),
+    ])
+    index.close()
+
+    index = LexicalIndex(tmp_path / "lexical.db")
+    assert [document.metadata["uuid"] for document, _ in index.search("kubernetes")] == ["uuid-a"]
+    assert index.search("gestión PMP")[0][0].page_content.startswith("Certificación PMP")
+    assert index.search("PMP", filter={"sections": {"$in": ["experience"]}}) == []
+
+    # Reprocesar un CV reemplaza todos sus chunks anteriores
+    index.add([record("uuid-a", 0, "Solo Terraform")])
+    assert index.search("kubernetes") == [] and index.count() == 2
+
+    assert index.delete_uuids(["uuid-b"]) == 1
+    assert index.search("django") == [] and index.uuids() == {"uuid-a"}
+    index.close()
+
+
+def test_reciprocal_rank_fusion_rewards_documents_in_both_lists():
+    """Un chunk presente en las dos listas supera a los que solo están primeros en una"""
+    def chunk(name):
+        return Document(page_content=name, metadata={"uuid": name, "chunk_index": 0})
+
+    fused = reciprocal_rank_fusion([[chunk("a"), chunk("b")], [chunk("c"), chunk("b")]])
+
+    assert [document.page_content for document in fused][0] == "b"
+    assert {document.page_content for document in fused} == {"a", "b", "c"}
+
+
+class CountingEmbeddings(AxisEmbeddings):
+    def __init__(self):
+        self.queries: List[str] = []
+
+    def embed_documents(self, texts):
+        return [AxisEmbeddings.embed_query(self, text) for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return super().embed_query(text)
+
+
+@pytest.mark.asyncio
+async def test_keyword_queries_skip_the_embedding_and_questions_are_fused(tmp_path):
+    """Los términos sueltos se resuelven solo con BM25; las preguntas combinan vectores y BM25"""
+    rag = RAGPipeline(FileManager(data_dir=tmp_path / "files"))
+    rag.embeddings = CountingEmbeddings()
+    rag.vectorstore = LocalVectorStore(rag.embeddings, data_dir=tmp_path / "vector_store")
+    rag.retriever = rag.vectorstore.as_retriever(search_kwargs={"k": rag.retrieval_fetch_k})
+    rag.tokenizer = WordTokenizer()
+    rag.two_stage_retrieval = False
+    rag.lexical_ready = True
+
+    for file_uuid, chunk_texts in {
+        "uuid-a": ["Python y AWS en producción", "Orquestación con Kubernetes"],
+        "uuid-b": ["Python y Java", "React"],
+    }.items():
+        chunks, ids = rag._documents_from_chunks(file_uuid, chunk_texts, f"{file_uuid}.pdf")
+        await rag._embed_and_upsert(chunks, ids)
+
+    documents = await rag._retrieve("Kubernetes")
+    assert [document.page_content for document in documents] == ["Orquestación con Kubernetes"]
+    assert rag.embeddings.queries == []
+
+    documents = await rag._retrieve("¿Quién ha trabajado con Python y Kubernetes?")
+    assert rag.embeddings.queries == ["¿Quién ha trabajado con Python y Kubernetes?"]
+    assert "Orquestación con Kubernetes" in [document.page_content for document in documents]
+
+    # Preguntas sin "?" con stopwords: también combinan vectores y BM25
+    for question in ["quien sabe kubernetes", "candidatos con experiencia en Kubernetes"]:
+        assert not rag._is_keyword_query(question)
+        await rag._retrieve(question)
+        assert rag.embeddings.queries[-1] == question
+
+    await rag.delete_by_uuids(["uuid-a"])
+    assert rag.lexical_index.search("kubernetes") == []
+    rag.lexical_index.close()
+    rag.vectorstore.close()
@@ -0,0 +1,143 @@
+"""
+Tests para el vector store local con NumPy
+"""
+import numpy as np
+import pytest
+
+from services.file_manager import FileManager
+from services.rag_pipeline import RAGPipeline
+from store.local_vector_store import LocalVectorStore
+
+
+class AxisEmbeddings:
+    """Embeddings falsos: cada palabra clave es un eje del espacio"""
+
+    keywords = ["python", "java", "aws", "react"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [float(text.count(keyword)) for keyword in self.keywords]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalVectorStore(AxisEmbeddings(), data_dir=tmp_path, initial_capacity=2)
+    yield store
+    store.close()
+
+
+def test_similarity_search_ranks_by_cosine(store):
+    """La búsqueda devuelve los chunks más similares primero, con sus metadatos"""
+    store.add_texts(
+        ["Python y AWS", "Java", "Python Python", "React"],
+        metadatas=[{"uuid": "a"}, {"uuid": "b"}, {"uuid": "c"}, {"uuid": "d"}],
+        ids=["a0", "b0", "c0", "d0"]
+    )
+
+    results = store.similarity_search("python", k=2)
+
+    assert [doc.metadata["uuid"] for doc in results] == ["c", "a"]
+    assert results[0].page_content == "Python Python"
+
+
+def test_metadata_filter_and_delete_by_uuid(store):
+    """Los filtros restringen los candidatos y el borrado por UUID libera sus filas"""
+    store.add_texts(
+        ["Python", "Python AWS", "Python Java"],
+        metadatas=[{"uuid": "a"}, {"uuid": "a"}, {"uuid": "b"}],
+        ids=["a0", "a1", "b0"]
+    )
+
+    assert [doc.id for doc in store.similarity_search("python", k=5, filter={"uuid": "b"})] == ["b0"]
+    assert store.delete_by_uuid("a") == 2
+    assert [doc.id for doc in store.similarity_search("python", k=5)] == ["b0"]
+
+    store.add_texts(["React"], metadatas=[{"uuid": "c"}], ids=["c0"])
+    assert store.stats()["capacity"] == 4
+
+
+def test_filters_on_list_fields_and_after_changes(store):
+    """$eq/$in/$ne/$nin admiten campos con listas y los filtros ven las altas y bajas"""
+    store.add_texts(
+        ["Python", "Python AWS", "Python Java"],
+        metadatas=[
+            {"uuid": "a", "sections": ["experience", "skills"]},
+            {"uuid": "a", "sections": ["education"]},
+            {"uuid": "b", "sections": ["skills"]}
+        ],
+        ids=["a0", "a1", "b0"]
+    )
+
+    def ids(filter):
+        return sorted(doc.id for doc in store.similarity_search("python", k=5, filter=filter))
+
+    assert ids({"sections": "skills"}) == ["a0", "b0"]
+    assert ids({"sections": {"$in": ["education", "experience"]}}) == ["a0", "a1"]
+    assert ids({"sections": {"$ne": "skills"}}) == ["a1"]
+    assert ids({"sections": {"$nin": ["skills", "education"]}}) == []
+    assert ids({"uuid": "a", "sections": {"$eq": "skills"}}) == ["a0"]
+    assert ids({"uuid": {"$in": ["b", "z"]}}) == ["b0"]
+
+    store.delete(["b0"])
+    store.add_texts(["Python"], metadatas=[{"uuid": "c", "sections": ["skills"]}], ids=["c0"])
+    assert ids({"sections": "skills"}) == ["a0", "c0"]
+
+
+def test_persists_and_reloads(tmp_path):
+    """Los vectores y metadatos sobreviven a un reinicio"""
+    store = LocalVectorStore(AxisEmbeddings(), data_dir=tmp_path)
+    store.upsert([
+        {"id": f"v{i}", "values": [float(i), 1.0, 0.0, 0.0], "metadata": {"uuid": "a", "text": f"chunk {i}"}}
+        for i in range(10)
+    ])
+    store.delete(ids=["v9"])
+    store.close()
+
+    reloaded = LocalVectorStore(AxisEmbeddings(), data_dir=tmp_path)
+    results = reloaded.similarity_search_by_vector_with_score([1.0, 0.0, 0.0, 0.0], k=1)
+
+    assert reloaded.stats()["total_vector_count"] == 9
+    assert results[0][0].id == "v8"
+    assert np.isclose(results[0][1], 8 / np.sqrt(65))
+    reloaded.close()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_with_local_backend(tmp_path):
+    """El pipeline indexa, recupera, cuenta y elimina vectores con el backend local"""
+    rag = RAGPipeline(FileManager(data_dir=tmp_path / "files"))
+    rag.embeddings = AxisEmbeddings()
+    rag.vectorstore = LocalVectorStore(rag.embeddings, data_dir=tmp_path / "vector_store")
+    rag.retriever = rag.vectorstore.as_retriever(search_kwargs={"k": rag.retrieval_fetch_k})
+    rag.tokenizer = type("Tokenizer", (), {"encode": lambda self, text, **kwargs: text.split()})()
+
+    chunks, ids = rag._documents_from_chunks("uuid-a", ["Python", "AWS"], "a.pdf")
+    await rag._embed_and_upsert(chunks, ids)
+
+    documents = await rag._retrieve("aws")
+    assert documents[0].page_content == "AWS"
+    assert documents[0].metadata["uuid"] == "uuid-a"
+    assert (await rag.get_vector_stats())["total_vectors"] == 2
+    assert await rag.delete_by_uuid("uuid-a")
+    assert (await rag.get_vector_stats())["total_vectors"] == 0
+    rag.vectorstore.close()
+
+
+def test_max_scores_by_uuid_scores_every_cv(store):
+    """Cada CV recibe la similitud de su chunk más parecido, también tras borrar"""
+    store.add_texts(
+        ["Python", "Java", "AWS", "Python y React"],
+        metadatas=[{"uuid": "a"}, {"uuid": "a"}, {"uuid": "b"}, {"uuid": "c"}],
+        ids=["a0", "a1", "b0", "c0"]
+    )
+
+    scores = store.max_scores_by_uuid([1.0, 0.0, 0.0, 0.0])
+    assert scores["a"] == pytest.approx(1.0)
+    assert scores["b"] == pytest.approx(0.0)
+    assert scores["c"] == pytest.approx(1 / np.sqrt(2))
+
+    store.delete_by_uuid("a")
+    assert set(store.max_scores_by_uuid([1.0, 0.0, 0.0, 0.0])) == {"b", "c"}
@@ -0,0 +1,61 @@
+"""
+Tests para la extracción de texto de PDFs en el pool de procesos
+"""
+import pytest
+
+from benchmarks.pdf_corpus import write_text_pdf
+from services.pdf_extractor import PdfExtractionError, PdfExtractor
+from services.file_manager import FileManager
+from services.rag_pipeline import RAGPipeline
+
+
+@pytest.fixture
+def extractor():
+    extractor = PdfExtractor(max_workers=2, pages_per_task=2, max_pages=10)
+    yield extractor
+    extractor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_iter_pages_preserves_order(tmp_path, extractor):
+    """Las páginas se entregan en orden aunque se extraigan por rangos en paralelo"""
+    pdf_path = tmp_path / "cv.pdf"
+    write_text_pdf(pdf_path, [[f"Pagina {i}"] for i in range(5)])
+
+    pages = [page async for page in extractor.iter_pages(str(pdf_path))]
+
+    assert [page.strip() for page in pages] == [f"Pagina {i}" for i in range(5)]
+    assert await extractor.extract_text(str(pdf_path)) == "\n".join(pages).strip()
+
+
+@pytest.mark.asyncio
+async def test_page_limit(tmp_path, extractor):
+    """Un PDF con más páginas que el límite se rechaza"""
+    pdf_path = tmp_path / "huge.pdf"
+    write_text_pdf(pdf_path, [["x"] for _ in range(11)])
+
+    with pytest.raises(PdfExtractionError):
+        await extractor.extract_text(str(pdf_path))
+
+
+@pytest.mark.asyncio
+async def test_chunk_pages_streams_without_losing_text(tmp_path):
+    """El chunking incremental cubre todo el texto con chunks del tamaño configurado y sus secciones"""
+    rag = RAGPipeline(FileManager(data_dir=tmp_path))
+    source_pages = [" ".join(f"p{page}w{word}" for word in range(300)) for page in range(6)]
+    source_pages[2] = "Experiencia profesional\n" + source_pages[2]
+    source_pages[4] = "Idiomas: inglés C1\n" + source_pages[4]
+
+    async def pages():
+        for page in source_pages:
+            yield page
+
+    text, chunked = await rag._chunk_pages(pages())
+    chunk_texts = [chunk for chunk, _ in chunked]
+
+    assert text == "\n".join(source_pages)
+    assert all(rag.chunker.count_tokens(chunk) <= rag.chunker.chunk_tokens for chunk in chunk_texts)
+    assert [sections for chunk, sections in chunked if "p3w0" in chunk] == [["experience"]]
+    assert chunked[-1][1] == ["languages"]
+    words = set(text.split())
+    assert set(word for chunk in chunk_texts for word in chunk.split()) == words
@@ -0,0 +1,107 @@
+"""
+Tests para las pools de CVs (particiones por oferta o cliente)
+"""
+import io
+import sqlite3
+
+import pytest
+
+from services.file_manager import FileManager
+from services.metadata_store import MetadataStore
+from services.pools import normalize_pool, pool_namespace
+from services.rag_pipeline import RAGPipeline
+from store.local_vector_store import LocalVectorStore
+from tests.test_cv_chunker import WordTokenizer
+from tests.test_local_vector_store import AxisEmbeddings
+
+
+@pytest.mark.asyncio
+async def test_pools_partition_metadata_and_deduplication(tmp_path):
+    """El mismo PDF puede estar en dos pools; listados, estadísticas y borrado son por pool"""
+    assert normalize_pool(None) == normalize_pool("default") == ""
+    assert normalize_pool(" Oferta-42 ") == "oferta-42" and pool_namespace("oferta-42") == "pool-oferta-42"
+    with pytest.raises(ValueError):
+        normalize_pool("../otra")
+
+    file_manager = FileManager(data_dir=tmp_path)
+    default_uuid, _ = await file_manager.save_stream_deduplicated("ana.pdf", io.BytesIO(b"%PDF-1.4 ana"))
+    pool_uuid, duplicate = await file_manager.save_stream_deduplicated("ana.pdf", io.BytesIO(b"%PDF-1.4 ana"), "oferta-42")
+    assert not duplicate and pool_uuid != default_uuid
+    assert (await file_manager.save_stream_deduplicated("copia.pdf", io.BytesIO(b"%PDF-1.4 ana"), "oferta-42")) == (pool_uuid, True)
+
+    assert [m["uuid"] for m in await file_manager.list_processed_files(pool="oferta-42")] == [pool_uuid]
+    assert [m["uuid"] for m in (await file_manager.query_files(pool=""))["files"]] == [default_uuid]
+    assert file_manager.get_pool_stats()["oferta-42"]["total_files"] == 1
+
+    assert await file_manager.delete_pool("oferta-42") == [pool_uuid]
+    assert not await file_manager.file_exists(pool_uuid) and await file_manager.file_exists(default_uuid)
+    assert file_manager.get_stats()["total_files"] == 1
+
+
+def test_metadata_without_pool_column_is_migrated(tmp_path):
+    """Las bases de datos anteriores a las pools ganan la columna y sus CVs quedan en la pool por defecto"""
+    conn = sqlite3.connect(str(tmp_path / "metadata.db"))
+    conn.execute(
+        "CREATE TABLE files (uuid TEXT PRIMARY KEY, original_filename TEXT NOT NULL DEFAULT '', "
+        "upload_date TEXT NOT NULL DEFAULT '', file_size INTEGER NOT NULL DEFAULT 0, content_hash TEXT, "
+        "status TEXT NOT NULL DEFAULT 'uploaded', chunks_count INTEGER NOT NULL DEFAULT 0, data TEXT NOT NULL)"
+    )
+    conn.execute("INSERT INTO files (uuid, content_hash, data) VALUES ('uuid-a', 'h', '{\"uuid\": \"uuid-a\"}')")
+    conn.commit()
+    conn.close()
+
+    store = MetadataStore(tmp_path / "metadata.db")
+    assert store.find_by_content_hash("h") == "uuid-a"
+    assert [m["uuid"] for m in store.list(pool="")] == ["uuid-a"]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_retrieval_ranking_and_deletion_stay_inside_the_pool(tmp_path):
+    """Chat, ranking y borrado de una pool no ven ni tocan los CVs de las demás"""
+    rag = RAGPipeline(FileManager(data_dir=tmp_path / "files"))
+    rag.embeddings = AxisEmbeddings()
+    rag.vectorstore = LocalVectorStore(rag.embeddings, data_dir=tmp_path / "vector_store")
+    rag.retriever = rag.vectorstore.as_retriever(search_kwargs={"k": rag.retrieval_fetch_k})
+    rag.tokenizer = WordTokenizer()
+    rag.two_stage_retrieval = False
+    rag.lexical_ready = True
+
+    for file_uuid, pool, chunk_texts in [
+        ("uuid-a", "", ["Python y AWS en producción"]),
+        ("uuid-b", "oferta-42", ["Python y Django"]),
+        ("uuid-c", "oferta-42", ["React y TypeScript"]),
+    ]:
+        chunks, ids = rag._documents_from_chunks(file_uuid, chunk_texts, f"{file_uuid}.pdf", pool=pool)
+        await rag._embed_and_upsert(chunks, ids)
+
+    assert {d.metadata["uuid"] for d in await rag._retrieve("¿Quién sabe Python?", pool="oferta-42")} <= {"uuid-b", "uuid-c"}
+    assert [d.metadata["uuid"] for d in await rag._retrieve("Python", pool="oferta-42")] == ["uuid-b"]
+    assert {d.metadata["uuid"] for d in await rag._retrieve("¿Quién sabe Python?")} == {"uuid-a"}
+    scores, complete = await rag.score_cvs(rag.embeddings.embed_query("python"), "oferta-42")
+    assert set(scores) == {"uuid-b", "uuid-c"} and complete
+    assert (await rag.get_vector_stats())["pools"] == {"": 1, "oferta-42": 2}
+
+    assert await rag.delete_pool("oferta-42")
+    assert not (tmp_path / "vector_pools" / "oferta-42").exists()
+    assert await rag._retrieve("Python", pool="oferta-42") == []
+    assert (await rag.get_vector_stats())["pools"] == {"": 1}
+    rag.lexical_index.close()
+    for store in [rag.vectorstore, *rag._pool_stores.values()]:
+        store.close()
+
+
+def test_pool_counters_follow_inserts_updates_and_deletes(tmp_path):
+    """Los contadores por pool se mantienen con triggers y coinciden con una agregación de la tabla"""
+    store = MetadataStore(tmp_path / "metadata.db")
+    for file_uuid, pool, size in [("a", "", 10), ("b", "oferta-42", 20), ("c", "oferta-42", 30)]:
+        store.put({"uuid": file_uuid, "pool": pool, "file_size": size, "status": "uploaded"})
+    store.update("b", {"status": "processed"})
+    store.delete("c")
+    store.update("a", {"pool": "oferta-42"})
+
+    assert store.pool_stats() == {
+        "oferta-42": {"total_files": 2, "total_size_bytes": 30, "by_status": {"uploaded": 1, "processed": 1}}
+    }
+    assert store.pool_stats("") == {}
+    store.close()
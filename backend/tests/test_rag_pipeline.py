@@ -0,0 +1,346 @@
+"""
+Tests para el pipeline RAG (sin dependencias externas)
+"""
+import asyncio
+import io
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from langchain.chains import RetrievalQA
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.retrievers import BaseRetriever
+
+from services.embedding_cache import CachedEmbeddings, EmbeddingCache, SQLiteEmbeddingStore
+from services.file_manager import FileManager
+from services.rag_pipeline import RAGPipeline
+from store.local_vector_store import LocalVectorStore
+from tests.test_local_vector_store import AxisEmbeddings
+
+
+class CountingRetriever(BaseRetriever):
+    """Retriever falso que cuenta cuántas veces se consulta"""
+    documents: List[Document]
+    calls: int = 0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        self.calls += 1
+        return self.documents
+
+
+class FakeEmbeddings:
+    """Embeddings falsos que registran el tamaño de cada petición"""
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+
+def cached_embeddings(tmp_path):
+    return CachedEmbeddings(FakeEmbeddings(), EmbeddingCache(SQLiteEmbeddingStore(tmp_path / "embeddings.db")))
+
+
+class FakeIndex:
+    """Índice falso que acumula los upserts y los borrados"""
+
+    def __init__(self, stored_ids=()):
+        self.upserts = []
+        self.deletes = []
+        self.stored_ids = list(stored_ids)
+
+    def upsert(self, vectors, namespace=None):
+        self.upserts.append(vectors)
+
+    def delete(self, ids=None, filter=None, namespace=None):
+        self.deletes.append(ids)
+
+    def list(self, prefix, namespace=None):
+        matching = [vector_id for vector_id in self.stored_ids if vector_id.startswith(prefix)]
+        for start in range(0, len(matching), 100):
+            yield matching[start:start + 100]
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.index = FakeIndex()
+
+
+class WordTokenizer:
+    """Tokenizer simple por palabras"""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    documents = [
+        Document(page_content="Python y FastAPI", metadata={"uuid": "uuid-a", "filename": "uuid-a.pdf"}),
+        Document(page_content="Django y AWS", metadata={"uuid": "uuid-b", "filename": "uuid-b.pdf"}),
+        Document(page_content="Kubernetes", metadata={"uuid": "uuid-a", "filename": "uuid-a.pdf"}),
+        Document(page_content="Python y FastAPI", metadata={"uuid": "uuid-c", "filename": "uuid-c.pdf"}),
+    ]
+    rag = RAGPipeline(FileManager(str(tmp_path)))
+    rag.retriever = CountingRetriever(documents=documents)
+    rag.qa_chain = RetrievalQA.from_chain_type(
+        llm=FakeListLLM(responses=["Respuesta de prueba"]),
+        chain_type="stuff",
+        retriever=rag.retriever
+    )
+    return rag
+
+
+@pytest.mark.asyncio
+async def test_query_with_sources_retrieves_once(pipeline):
+    """La consulta con fuentes solo debe recuperar documentos una vez"""
+    result = await pipeline.query_with_sources("¿Quién sabe Python?")
+
+    assert pipeline.retriever.calls == 1
+    assert result["response"] == "Respuesta de prueba"
+    assert result["sources"] == ["uuid-a", "uuid-b"]
+    assert result["source_files"] == ["uuid-a.pdf", "uuid-b.pdf", "uuid-a.pdf"]
+    assert result["cached"] is False
+
+
+@pytest.mark.asyncio
+async def test_count_question_answered_without_llm(pipeline):
+    """Las preguntas de recuento se responden desde los metadatos sin recuperar ni llamar al LLM"""
+    result = await pipeline.query_with_sources("¿Cuántos archivos hay procesados?")
+
+    assert result["response"] == "Hay 0 archivos procesados de 0 en total."
+    assert result["confidence"] == 1.0
+    assert pipeline.retriever.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_served_from_answer_cache(pipeline):
+    """Una pregunta repetida no vuelve a recuperar ni a llamar al LLM hasta que cambia el corpus"""
+    await pipeline.query_with_sources("¿Quién sabe Python?")
+    repeated = await pipeline.query_with_sources("quien sabe  python")
+
+    assert repeated["cached"] is True
+    assert repeated["response"] == "Respuesta de prueba"
+    assert pipeline.retriever.calls == 1
+
+    await pipeline.file_manager.save_stream_deduplicated("nuevo.pdf", io.BytesIO(b"%PDF nuevo"))
+    refreshed = await pipeline.query_with_sources("¿Quién sabe Python?")
+
+    assert refreshed["cached"] is False
+    assert pipeline.retriever.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_questions_share_one_call(pipeline):
+    """Preguntas idénticas simultáneas comparten la recuperación y la llamada al LLM"""
+    results = await asyncio.gather(*(pipeline.query_with_sources("¿Quién sabe Python?") for _ in range(5)))
+
+    assert pipeline.retriever.calls == 1
+    assert all(result["response"] == "Respuesta de prueba" for result in results)
+
+
+@pytest.mark.asyncio
+async def test_process_pdfs_bulk_packs_chunks_across_cvs(tmp_path):
+    """Los chunks de varios CVs se agrupan en lotes de embeddings y upserts compartidos"""
+    texts = {
+        "a.pdf": " ".join(f"python{i}" for i in range(300)),
+        "b.pdf": " ".join(f"django{i}" for i in range(300)),
+        "c.pdf": "",
+    }
+    rag = RAGPipeline(FileManager(data_dir=tmp_path))
+    rag.embeddings = cached_embeddings(tmp_path)
+    rag.vectorstore = FakeVectorStore()
+    rag.tokenizer = WordTokenizer()
+    rag.embedding_batch_size = 4
+    rag.upsert_batch_size = 100
+
+    async def fake_extract(file_path):
+        return texts[file_path].strip()
+
+    rag._extract_text_from_pdf = fake_extract
+
+    results = await rag.process_pdfs_bulk([("uuid-a", "a.pdf"), ("uuid-b", "b.pdf"), ("uuid-c", "c.pdf")])
+
+    assert results["uuid-a"] > 1 and results["uuid-b"] > 1
+    assert results["uuid-c"] == 0
+    total_chunks = results["uuid-a"] + results["uuid-b"]
+    assert sum(rag.embeddings.embeddings.batches) == total_chunks
+    assert max(rag.embeddings.embeddings.batches) == 4
+    assert len(rag.vectorstore.index.upserts) == 1
+    upserted_ids = [record["id"] for record in rag.vectorstore.index.upserts[0]]
+    assert "cv_uuid-a_chunk_0" in upserted_ids and "cv_uuid-b_chunk_0" in upserted_ids
+    assert rag.vectorstore.index.upserts[0][0]["metadata"]["text"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_chunks_reuse_stored_vectors(tmp_path):
+    """Los chunks idénticos se embeben una sola vez y se reutilizan en ingestas posteriores"""
+    rag = RAGPipeline(FileManager(data_dir=tmp_path))
+    rag.embeddings = cached_embeddings(tmp_path)
+    rag.vectorstore = FakeVectorStore()
+    rag.tokenizer = WordTokenizer()
+
+    chunks, ids = rag._documents_from_chunks("uuid-a", ["Python", "AWS", "Python"], "a.pdf")
+    await rag._embed_and_upsert(chunks, ids)
+    assert rag.embeddings.embeddings.batches == [2]
+
+    chunks, ids = rag._documents_from_chunks("uuid-b", ["AWS", "Python"], "b.pdf")
+    await rag._embed_and_upsert(chunks, ids)
+    assert rag.embeddings.embeddings.batches == [2]
+
+    upserted = [record for batch in rag.vectorstore.index.upserts for record in batch]
+    assert len(upserted) == 5
+    assert upserted[0]["values"] == upserted[2]["values"]
+
+
+@pytest.mark.asyncio
+async def test_delete_by_uuids_uses_recorded_chunk_ids(tmp_path):
+    """El borrado reconstruye los IDs desde chunks_count y lista por prefijo los CVs sin recuento"""
+    rag = RAGPipeline(FileManager(data_dir=tmp_path))
+    rag.vectorstore = FakeVectorStore()
+    rag.vectorstore.index = FakeIndex(stored_ids=[f"cv_uuid-b_chunk_{i}" for i in range(250)])
+
+    assert await rag.delete_by_uuids(["uuid-a", "uuid-b"], {"uuid-a": 1500})
+
+    deleted = [vector_id for batch in rag.vectorstore.index.deletes for vector_id in batch]
+    assert [len(batch) for batch in rag.vectorstore.index.deletes] == [1000, 750]
+    assert len(set(deleted)) == 1750
+    assert "cv_uuid-a_chunk_1499" in deleted and "cv_uuid-b_chunk_249" in deleted
+
+
+@pytest.mark.asyncio
+async def test_two_stage_retrieval_spreads_sources_across_cvs(tmp_path):
+    """Con vectores por CV, un CV largo no acapara los chunks recuperados y el borrado los elimina"""
+    rag = RAGPipeline(FileManager(data_dir=tmp_path / "files"))
+    rag.embeddings = AxisEmbeddings()
+    rag.vectorstore = LocalVectorStore(rag.embeddings, data_dir=tmp_path / "vector_store")
+    rag.tokenizer = WordTokenizer()
+    rag.cv_index = await rag._open_cv_index()
+
+    for file_uuid, chunk_texts in {
+        "uuid-a": [f"Python proyecto {i}" for i in range(6)],
+        "uuid-b": ["Python y AWS", "AWS"],
+        "uuid-c": ["Python y React", "React"],
+    }.items():
+        chunks, ids = rag._documents_from_chunks(file_uuid, chunk_texts, f"{file_uuid}.pdf")
+        await rag._embed_and_upsert(chunks, ids)
+
+    assert rag.cv_index_ready
+    documents = await rag._retrieve("python")
+    sources = [document.metadata["uuid"] for document in documents]
+    assert len(documents) == 5
+    assert sources.count("uuid-a") == 2
+    assert {"uuid-b", "uuid-c"} <= set(sources)
+
+    await rag.delete_by_uuids(["uuid-a"])
+    assert {file_uuid for file_uuid, _ in rag.cv_index.search([1.0, 0.0, 0.0, 0.0], 5)} == {"uuid-b", "uuid-c"}
+    rag.cv_index.close()
+    rag.vectorstore.close()
+
+
+@pytest.mark.asyncio
+async def test_backfill_rebuilds_missing_cv_vectors(tmp_path):
+    """Los CVs ya indexados antes de existir el índice por CV se completan desde sus chunks"""
+    file_manager = FileManager(data_dir=tmp_path / "files")
+    file_uuid = await file_manager.save_stream_with_metadata("ana.pdf", io.BytesIO(b"%PDF ana"))
+    await file_manager.update_file_metadata(file_uuid, {"status": "processed"})
+    rag = RAGPipeline(file_manager)
+    rag.embeddings = AxisEmbeddings()
+    rag.vectorstore = LocalVectorStore(rag.embeddings, data_dir=tmp_path / "vector_store")
+    rag.vectorstore.add_texts(["Python", "Java"], metadatas=[{"uuid": file_uuid}] * 2, ids=["c0", "c1"])
+
+    rag.cv_index = await rag._open_cv_index()
+    assert not rag.cv_index_ready
+
+    assert await rag.backfill_cv_index() == 1
+    assert rag.cv_index_ready
+    [(found, score)] = rag.cv_index.search([1.0, 1.0, 0.0, 0.0], 1)
+    assert found == file_uuid and score == pytest.approx(1.0)
+    rag.cv_index.close()
+    rag.vectorstore.close()
+
+
+class FetchIndex(FakeIndex):
+    """Índice falso de Pinecone con vectores de chunks y un namespace para los vectores de CV"""
+
+    def __init__(self, chunk_vectors):
+        super().__init__(stored_ids=list(chunk_vectors))
+        self.chunk_vectors = chunk_vectors
+        self.cv_vectors = {}
+
+    def upsert(self, vectors, namespace=None):
+        super().upsert(vectors, namespace)
+        if namespace == "cv-summaries":
+            self.cv_vectors.update({record["id"]: record["values"] for record in vectors})
+
+    def list(self, prefix="", namespace=None):
+        if namespace == "cv-summaries":
+            yield [vector_id for vector_id in self.cv_vectors if vector_id.startswith(prefix)]
+        else:
+            yield from super().list(prefix, namespace)
+
+    def fetch(self, ids, namespace=None):
+        return SimpleNamespace(vectors={i: SimpleNamespace(values=self.chunk_vectors[i]) for i in ids})
+
+    def describe_index_stats(self):
+        return {"namespaces": {"cv-summaries": {"vector_count": len(self.cv_vectors)}}}
+
+
+@pytest.mark.asyncio
+async def test_backfill_computes_pinecone_cv_vectors_and_enables_two_stage(tmp_path):
+    """Con Pinecone los CVs anteriores al índice por CV se completan leyendo sus chunks"""
+    file_manager = FileManager(data_dir=tmp_path / "files")
+    file_uuid = await file_manager.save_stream_with_metadata("ana.pdf", io.BytesIO(b"%PDF ana"))
+    await file_manager.update_file_metadata(file_uuid, {"status": "processed", "chunks_count": 2})
+    rag = RAGPipeline(file_manager)
+    rag.vectorstore = FakeVectorStore()
+    rag.vectorstore.index = FetchIndex({
+        f"cv_{file_uuid}_chunk_0": [1.0, 0.0],
+        f"cv_{file_uuid}_chunk_1": [0.0, 1.0],
+    })
+
+    rag.cv_index = await rag._open_cv_index()
+    assert not rag.cv_index_ready
+
+    assert await rag.backfill_cv_index() == 1
+    assert rag.cv_index_ready
+    assert rag.vectorstore.index.cv_vectors[file_uuid] == pytest.approx([2 ** -0.5, 2 ** -0.5])
+
+
+@pytest.mark.asyncio
+async def test_stream_with_sources_emits_sources_then_tokens(pipeline):
+    """El streaming entrega las fuentes antes que los tokens y termina con confianza y tiempos"""
+    pipeline.llm = FakeListChatModel(responses=["Ana sabe Python"])
+    pipeline.qa_chain = RetrievalQA.from_chain_type(llm=pipeline.llm, chain_type="stuff", retriever=pipeline.retriever)
+
+    events = [event async for event in pipeline.stream_with_sources("¿Quién sabe Python?")]
+
+    assert events[0] == {"event": "sources", "data": {"sources": ["uuid-a", "uuid-b"]}}
+    assert "".join(event["data"]["text"] for event in events if event["event"] == "token") == "Ana sabe Python"
+    assert events[-1]["event"] == "done"
+    assert events[-1]["data"]["confidence"] == 0.7
+    assert events[-1]["data"]["timing"]["first_token_ms"] is not None
+    assert pipeline.retriever.calls == 1
+
+
+def test_prompt_messages_match_stuff_chain(pipeline):
+    """El prompt del streaming incluye el contexto con el formato de la QA chain"""
+    pipeline.llm = FakeListChatModel(responses=["x"])
+    pipeline.qa_chain = RetrievalQA.from_chain_type(llm=pipeline.llm, chain_type="stuff", retriever=pipeline.retriever)
+    documents = [Document(page_content="Python y FastAPI"), Document(page_content="Django y AWS")]
+
+    messages = pipeline._prompt_messages("¿Quién sabe Python?", documents)
+
+    text = "\n".join(message.content for message in messages)
+    assert "Python y FastAPI\n\nDjango y AWS" in text
+    assert "¿Quién sabe Python?" in text
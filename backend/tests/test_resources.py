@@ -0,0 +1,115 @@
+"""
+Tests para el contenedor de recursos y las dependencias de los endpoints
+"""
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services.file_manager import FileManager
+from services.ingestion_queue import IngestionQueue
+from services.rag_pipeline import RAGPipeline
+from services.resources import AppResources
+from store.pinecone_client import PineconeClient
+
+
+class ClosableIndex:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_endpoints_without_lifespan():
+    """Sin lifespan las dependencias devuelven None y los endpoints responden sin fallar"""
+    client = TestClient(app)
+
+    response = client.get("/api/v1/chat/stats")
+    assert response.status_code == 500
+    assert "no disponible" in response.json()["detail"]
+
+    response = client.get("/api/v1/screening/upload/no-existe/status")
+    assert response.status_code == 500
+    assert "Gestor de archivos no disponible" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_cleanup_closes_shared_connection_pools(tmp_path):
+    """cleanup() cierra los pools HTTP y el índice de Pinecone compartidos"""
+    http_client, http_async_client = httpx.Client(), httpx.AsyncClient()
+    pinecone_client = PineconeClient(api_key="test")
+    index = ClosableIndex()
+    pinecone_client.index = index
+
+    rag = RAGPipeline(
+        FileManager(data_dir=tmp_path),
+        http_client=http_client,
+        http_async_client=http_async_client,
+        pinecone_client=pinecone_client
+    )
+    await rag.cleanup()
+
+    assert http_client.is_closed and http_async_client.is_closed
+    assert index.closed and pinecone_client.index is None
+
+
+@pytest.mark.asyncio
+async def test_blocking_work_shares_one_executor(tmp_path):
+    """El gestor de archivos, el pipeline y la cola usan el mismo pool de hilos, que sobrevive a cleanup()"""
+    file_manager = FileManager(data_dir=tmp_path)
+    rag = RAGPipeline(file_manager)
+    queue = IngestionQueue(rag, file_manager, db_path=tmp_path / "queue.db", executor=rag.executor)
+
+    assert rag.executor is file_manager.executor is queue.executor is rag.pinecone_client.executor
+    await rag.cleanup()
+    assert await file_manager.get_file_metadata("no-existe") is None
+
+
+@pytest.mark.asyncio
+async def test_pipeline_databases_live_in_the_file_manager_data_dir(tmp_path, monkeypatch):
+    """La caché de embeddings y el índice léxico se guardan junto a los datos del gestor de archivos"""
+    monkeypatch.setenv("EMBEDDING_CACHE_BACKEND", "sqlite")
+    rag = RAGPipeline(FileManager(data_dir=tmp_path))
+
+    assert rag.embedding_cache.store.db_path == tmp_path / "embeddings.db"
+    assert rag.lexical_index.db_path == tmp_path / "lexical_index.db"
+    await rag.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_close_closes_file_manager_stores(tmp_path):
+    """close() cierra las conexiones de metadata.db y profiles.db"""
+    resources = AppResources(FileManager(data_dir=tmp_path))
+    file_manager = resources.file_manager
+    file_manager.get_stats()
+    file_manager.profile_store.count()
+
+    await resources.close()
+
+    assert file_manager.metadata_store._conn is None and file_manager.profile_store._conn is None
+
+
+def test_chat_stream_sse(tmp_path):
+    """El endpoint de streaming emite eventos SSE sources, token y done"""
+    from endpoints.dependencies import get_file_manager, get_rag_pipeline
+
+    class StreamingPipeline:
+        async def stream_with_sources(self, question, sections=None, pool=""):
+            yield {"event": "sources", "data": {"sources": []}}
+            for token in ["Hola", " mundo"]:
+                yield {"event": "token", "data": {"text": token}}
+            yield {"event": "done", "data": {"confidence": 0.5, "timing": {}}}
+
+    file_manager = FileManager(data_dir=tmp_path)
+    app.dependency_overrides[get_rag_pipeline] = lambda: StreamingPipeline()
+    app.dependency_overrides[get_file_manager] = lambda: file_manager
+    try:
+        response = TestClient(app).post("/api/v1/chat/stream", json={"message": "hola"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events == ["event: sources", "event: token", "event: token", "event: done"]
+    assert '"source_files": []' in response.text
@@ -0,0 +1,83 @@
+"""
+Tests para las trazas de latencia por etapa y la cabecera Server-Timing
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.tracing import LatencyHistogram, ServerTimingMiddleware, Tracer, _request_timings
+
+
+def test_histogram_percentiles_and_disabled_tracer():
+    """Los percentiles caen en la cubeta correcta y sin trazas no se mide nada"""
+    histogram = LatencyHistogram()
+    for duration_ms in range(1, 101):
+        histogram.observe(float(duration_ms))
+
+    summary = histogram.summary()
+    assert summary["count"] == 100 and summary["max_ms"] == 100.0
+    # Cubetas geométricas de factor 1.2: error relativo inferior al 20 %
+    assert 40 <= summary["p50_ms"] <= 60
+    assert 80 <= summary["p95_ms"] <= 100 and summary["p95_ms"] <= summary["p99_ms"] <= 100
+    assert LatencyHistogram().percentile(0.5) == 0.0
+
+    tracer = Tracer(enabled=False)
+    with tracer.span("embed"):
+        pass
+    assert tracer.stats() == {}
+
+
+def test_server_timing_header_and_route_histograms():
+    """Los spans de la petición llegan a Server-Timing y la ruta se registra por su plantilla"""
+    tracer = Tracer(enabled=True)
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware, tracer=tracer)
+
+    @app.get("/cvs/{file_uuid}")
+    async def get_cv(file_uuid: str):
+        with tracer.span("metadata"):
+            pass
+        with tracer.span("metadata"):
+            pass
+        with tracer.span("llm"):
+            pass
+        return {"uuid": file_uuid}
+
+    client = TestClient(app)
+    for file_uuid in ["uuid-a", "uuid-b"]:
+        response = client.get(f"/cvs/{file_uuid}")
+        assert response.status_code == 200
+
+    header = response.headers["server-timing"]
+    assert 'metadata;dur=' in header and 'desc="2 spans"' in header
+    assert "llm;dur=" in header and "total;dur=" in header
+
+    stats = tracer.stats()
+    assert stats["metadata"]["count"] == 4 and stats["llm"]["count"] == 2
+    assert stats["http.GET /cvs/{file_uuid}"]["count"] == 2
+    # Los spans fuera de una petición solo van al histograma
+    with tracer.span("ingest_batch"):
+        pass
+    assert tracer.stats()["ingest_batch"]["count"] == 1
+
+
+def test_concurrent_spans_of_one_request_are_all_counted():
+    """Los spans que terminan a la vez en varios hilos de la misma petición no pierden actualizaciones"""
+    tracer = Tracer(enabled=True)
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        def record_many():
+            for _ in range(2000):
+                tracer.record("retrieve", 0.5)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, record_many) for _ in range(8)]
+            for future in futures:
+                future.result()
+    finally:
+        _request_timings.reset(token)
+
+    assert timings["retrieve"] == [8000.0, 16000]
@@ -97,6 +97,7 @@ export default function UploadCVs() {
     switch (status) {
       case 'processed':
         return <CheckCircle className="h-5 w-5 text-green-500" aria-label="File processed successfully" />
+      case 'queued':
       case 'processing':
         return <RefreshCw className="h-5 w-5 text-yellow-500 animate-spin" aria-label="File processing" />
       case 'error':
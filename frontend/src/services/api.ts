@@ -6,9 +6,21 @@ import {
   FileMetadata,
   ChatResponse,
   ChatRequest,
+  ChatStreamHandlers,
   DeleteResponse,
+  BulkDeleteResponse,
   FileListResponse,
-  ChatStats
+  FileListParams,
+  RankRequest,
+  RankResponse,
+  ProfileQueryParams,
+  ProfileListResponse,
+  ProfileAggregateResponse,
+  ChatStats,
+  CVStatusResponse,
+  PoolListResponse,
+  PoolDeleteResponse,
+  LatencyMetricsResponse
 } from '../types'
 import { getApiConfig, API_ENDPOINTS, DEFAULT_HEADERS, UPLOAD_HEADERS, ERROR_MESSAGES } from '../config/api'
 
@@ -95,10 +107,28 @@ export const cvScreenerAPI = {
     return response.data
   },
 
+  // Filtrar candidatos por su perfil estructurado (sin LLM)
+  async listProfiles(params: ProfileQueryParams = {}): Promise<ProfileListResponse> {
+    const response = await api.get('/screening/profiles', { params, paramsSerializer: { indexes: null } })
+    return response.data
+  },
+
+  async aggregateProfiles(field: ProfileAggregateResponse['field'], limit = 20): Promise<ProfileAggregateResponse> {
+    const response = await api.get('/screening/profiles/aggregate', { params: { field, limit } })
+    return response.data
+  },
+
+  // Ranking de todos los CVs contra una descripción de trabajo
+  async rankCandidates(request: RankRequest): Promise<RankResponse> {
+    const response = await api.post('/screening/rank', request)
+    return response.data
+  },
+
   // Subir archivo CV (actualizado para UUID)
-  async uploadCV(file: File): Promise<UploadResponse> {
+  async uploadCV(file: File, pool?: string): Promise<UploadResponse> {
     const formData = new FormData()
     formData.append('file', file)
+    if (pool) formData.append('pool', pool)
     
     const response = await api.post(API_ENDPOINTS.UPLOAD_CV, formData, {
       headers: UPLOAD_HEADERS,
@@ -113,28 +143,96 @@ export const cvScreenerAPI = {
     return response.data
   },
 
+  // Latencias por etapa (p50/p95/p99) desde el arranque del backend
+  async getLatencyMetrics(): Promise<LatencyMetricsResponse> {
+    const response = await api.get('/metrics')
+    return response.data
+  },
+
   // === NUEVAS FUNCIONES PARA SISTEMA UUID ===
 
   // Chat con RAG
-  async sendChatMessage(message: string): Promise<ChatResponse> {
-    const request: ChatRequest = { message }
+  async sendChatMessage(message: string, pool?: string): Promise<ChatResponse> {
+    const request: ChatRequest = { message, pool }
     const response = await api.post('/chat', request)
     return response.data
   },
 
+  // Chat en streaming (server-sent events); abortar la señal cancela la generación
+  async streamChatMessage(
+    message: string,
+    handlers: ChatStreamHandlers,
+    signal?: AbortSignal,
+    pool?: string
+  ): Promise<void> {
+    const request: ChatRequest = { message, pool }
+    const response = await fetch(`${config.baseUrl}/chat/stream`, {
+      method: 'POST',
+      headers: { ...DEFAULT_HEADERS, Accept: 'text/event-stream' },
+      body: JSON.stringify(request),
+      signal,
+    })
+    if (!response.ok || !response.body) {
+      throw new Error(`Error ${response.status} en el chat en streaming`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    for (;;) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      let boundary = buffer.indexOf('\n\n')
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+        boundary = buffer.indexOf('\n\n')
+
+        const event = block.match(/^event: (.*)$/m)?.[1]
+        const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? '{}')
+        if (event === 'sources') handlers.onSources?.(data.sources, data.source_files)
+        else if (event === 'token') handlers.onToken?.(data.text)
+        else if (event === 'done') handlers.onDone?.(data)
+        else if (event === 'error') handlers.onError?.(data.detail)
+      }
+    }
+  },
+
   // Gestión de archivos con UUID
   async deleteCV(uuid: string): Promise<DeleteResponse> {
     const response = await api.delete(`/screening/upload/${uuid}`)
     return response.data
   },
 
+  async deleteCVs(uuids: string[]): Promise<BulkDeleteResponse> {
+    const response = await api.post('/screening/upload/delete', { uuids })
+    return response.data
+  },
+
   async getFileMetadata(uuid: string): Promise<FileMetadata> {
     const response = await api.get(`/screening/upload/${uuid}`)
     return response.data
   },
 
-  async listCVs(): Promise<FileListResponse> {
-    const response = await api.get('/screening/upload')
+  async getCVStatus(uuid: string): Promise<CVStatusResponse> {
+    const response = await api.get(`/screening/upload/${uuid}/status`)
+    return response.data
+  },
+
+  async listCVs(params: FileListParams = {}): Promise<FileListResponse> {
+    const response = await api.get('/screening/upload', { params })
+    return response.data
+  },
+
+  // Pools de CVs (ofertas o clientes)
+  async listPools(): Promise<PoolListResponse> {
+    const response = await api.get('/screening/pools')
+    return response.data
+  },
+
+  async deletePool(pool: string): Promise<PoolDeleteResponse> {
+    const response = await api.delete(`/screening/pools/${encodeURIComponent(pool)}`)
     return response.data
   },
 
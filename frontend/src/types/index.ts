@@ -15,15 +15,109 @@ export interface CVScreeningResponse {
   detailed_analysis: Record<string, number>
 }
 
+export interface CandidateProfile {
+  uuid: string
+  filename: string
+  skills: string[]
+  years_experience: number | null
+  languages: string[]
+  location: string | null
+  education: string | null
+}
+
+export interface ProfileQueryParams {
+  skill?: string[]
+  language?: string[]
+  min_years?: number
+  location?: string
+  education?: string
+  limit?: number
+  offset?: number
+}
+
+export interface ProfileListResponse {
+  profiles: CandidateProfile[]
+  total: number
+  limit: number
+  offset: number
+}
+
+export interface ProfileAggregateResponse {
+  field: 'skill' | 'language' | 'location' | 'education'
+  values: { value: string; count: number }[]
+}
+
+export interface RankRequest {
+  job_description: string
+  top_n?: number
+  analyze?: boolean  // false: similarity shortlist only, no LLM calls
+  pool?: string  // CV pool (job opening or tenant) to rank; omitted: default pool
+}
+
+export interface RankedCandidate {
+  uuid: string
+  filename: string
+  similarity: number
+  analysis: CVScreeningResponse | null
+  error?: string
+}
+
+export interface RankResponse {
+  candidates: RankedCandidate[]
+  total_scored: number
+  truncated: boolean  // true: some processed CVs had no chunk within the vector query limit
+  unscored: number
+  timing: {
+    scoring_ms: number
+    total_ms: number
+  }
+}
+
 
 export interface UploadResponse {
   message: string
   uuid: string
   filename: string
-  status: 'uploaded' | 'processing' | 'processed' | 'error'
+  pool?: string  // "" is the default pool
+  status: 'uploaded' | 'queued' | 'processing' | 'processed' | 'error'
   chunks_count?: number
 }
 
+export interface PoolSummary {
+  pool: string  // "" is the default pool
+  total_files: number
+  total_size_bytes: number
+  by_status: Record<string, number>
+  vectors: number | null
+}
+
+export interface PoolListResponse {
+  pools: PoolSummary[]
+  total: number
+}
+
+export interface StageLatency {
+  count: number
+  mean_ms: number
+  p50_ms: number
+  p95_ms: number
+  p99_ms: number
+  max_ms: number
+}
+
+export interface LatencyMetricsResponse {
+  status: string
+  tracing_enabled: boolean
+  stages: Record<string, StageLatency>  // e.g. "embed", "llm", "http.POST /api/v1/chat"
+}
+
+export interface PoolDeleteResponse {
+  message: string
+  pool: string
+  deleted: number
+  status: string
+}
+
 export interface ChatMessage {
   id: string
   content: string
@@ -39,7 +133,7 @@ export interface CVFile {
   id: string
   filename: string
   uploadDate: Date
-  status: 'uploaded' | 'processing' | 'processed' | 'error'
+  status: 'uploaded' | 'queued' | 'processing' | 'processed' | 'error'
   analysis?: CVScreeningResponse
 }
 
@@ -49,7 +143,8 @@ export interface FileMetadata {
   original_filename: string
   upload_date: string
   file_size: number
-  status: 'uploaded' | 'processing' | 'processed' | 'error'
+  pool?: string
+  status: 'uploaded' | 'queued' | 'processing' | 'processed' | 'error'
   chunks_count?: number
   processing_errors?: string[]
 }
@@ -59,10 +154,51 @@ export interface ChatResponse {
   sources: string[]  // File UUIDs
   source_files: string[]  // Original names
   confidence: number
+  cached?: boolean  // Served from the answer cache
+  context?: ContextStats
 }
 
+export interface ContextStats {
+  chunks: number
+  blocks: number
+  tokens_before: number
+  tokens_after: number
+  tokens_saved: number
+}
+
+export interface ChatStreamDone {
+  confidence: number
+  cached?: boolean
+  context?: ContextStats
+  timing: {
+    retrieval_ms: number
+    first_token_ms: number | null
+    total_ms: number
+  }
+}
+
+export interface ChatStreamHandlers {
+  onSources?: (sources: string[], sourceFiles: string[]) => void
+  onToken?: (text: string) => void
+  onDone?: (done: ChatStreamDone) => void
+  onError?: (detail: string) => void
+}
+
+export type CVSection =
+  | 'header'
+  | 'summary'
+  | 'experience'
+  | 'education'
+  | 'skills'
+  | 'languages'
+  | 'projects'
+  | 'certifications'
+  | 'other'
+
 export interface ChatRequest {
   message: string
+  sections?: CVSection[]  // Restrict retrieval to these CV sections
+  pool?: string  // Search only this CV pool; omitted: default pool
 }
 
 export interface DeleteResponse {
@@ -71,14 +207,48 @@ export interface DeleteResponse {
   status: string
 }
 
+export interface BulkDeleteResponse {
+  message: string
+  deleted: string[]
+  not_found: string[]
+  failed: string[]
+  status: string
+}
+
+export interface CVStatusResponse {
+  uuid: string
+  filename: string
+  status: 'uploaded' | 'queued' | 'processing' | 'processed' | 'error'
+  chunks_count: number
+  processing_errors: string[]
+  attempts: number
+}
+
 export interface FileListResponse {
   files: FileMetadata[]
   stats: {
-    total_cv_files: number
-    total_metadata_files: number
-    data_directory: string
+    total_files: number
+    metadata_files: number
+    total_size_bytes: number
+    total_size_mb: number
+    by_status: Record<string, number>
   }
-  total: number
+  total: number | null
+  next_cursor: string | null
+  limit: number
+}
+
+export interface FileListParams {
+  status?: string
+  uploaded_from?: string
+  uploaded_to?: string
+  filename?: string
+  sort?: 'upload_date' | 'original_filename' | 'file_size' | 'chunks_count' | 'status'
+  order?: 'asc' | 'desc'
+  limit?: number
+  cursor?: string
+  fields?: string
+  pool?: string  // omitted: all pools; 'default': default pool
 }
 
 export interface ChatStats {